@@ -0,0 +1,73 @@
+"""
+Parity and speed of the (incremental) tracker scores in `server.pipelines.tasks.tracker`.
+
+BUSCAR scores of `score_labels()` are compared with `retrospective_h0()` of nacsos_data on seeded label sequences,
+both from scratch and when extending the scores of a shorter prefix (as the tracker task does after new annotations).
+
+    python -m benchmarks.buscar [--labels 20000] [--batch-size 100]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from server.pipelines.tasks.tracker import score_labels
+
+# (recall_target, bias, confidence_level)
+PARAMS = [
+    (0.95, 1.0, 0.95),
+    (0.95, 1.0, 0.99),
+    (0.9, 1.0, 0.9),
+    (0.95, 2.0, 0.95),
+]
+
+
+def make_labels(n_labels: int) -> np.ndarray:
+    # includes get rarer the further the screening got, as with prioritised screening
+    rng = np.random.default_rng(42)
+    return (rng.random(n_labels) < np.linspace(0.4, 0.01, n_labels)).astype(np.int8)
+
+
+def check_parity(labels: np.ndarray, n_docs: int, batch_size: int) -> None:
+    from nacsos_data.util.annotations.evaluation.buscar import retrospective_h0
+
+    for recall_target, bias, confidence_level in PARAMS:
+        kwargs = {'n_docs': n_docs, 'recall_target': recall_target, 'bias': bias, 'batch_size': batch_size, 'confidence_level': confidence_level}
+
+        start = time.perf_counter()
+        expected = list(zip(*retrospective_h0(labels_=labels.tolist(), **kwargs), strict=True))
+        time_upstream = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, full, _ = score_labels(labels, **kwargs)
+        time_full = time.perf_counter() - start
+        assert full == expected, f'Full recompute differs from `retrospective_h0()` for {kwargs}'
+
+        # a prefix that ends in a partial batch, only its full batches are reused (see `read_previous_scores()`)
+        prefix = labels[: (labels.shape[0] * 2) // 3 + batch_size // 2]
+        _, partial, _ = score_labels(prefix, **kwargs)
+        previous = [(pos, p) for pos, p in partial if pos % batch_size == 0]
+        start = time.perf_counter()
+        _, extended, _ = score_labels(labels, previous=previous, **kwargs)
+        time_extended = time.perf_counter() - start
+        assert extended == expected, f'Extended scores differ from `retrospective_h0()` for {kwargs}'
+
+        print(
+            f'recall_target={recall_target}, bias={bias}, confidence_level={confidence_level}: {len(expected):,} scores match '
+            f'({time_upstream * 1000:.1f}ms upstream, {time_full * 1000:.1f}ms full, {time_extended * 1000:.1f}ms extending 1/3)'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--labels', type=int, default=20_000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    labels = make_labels(args.labels)
+    check_parity(labels, n_docs=args.labels * 5, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Evaluation of inclusion rules on large wide export frames.
+
+Compares `server.util.inclusion` (rule compiled once, evaluated as NumPy boolean ops) with `DataFrame.eval()`
+of the equivalent pandas expression and, if nacsos_data is installed, the reference `get_inclusion_mask()`.
+
+    python -m benchmarks.inclusion [--rows 1000000] [--runs 5]
+"""
+
+import argparse
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from server.util.inclusion import compile_rule
+
+RULES = [
+    'incl:1',
+    'incl:1 & !excl:1',
+    '(incl:1 | rel:2) & !(excl:1 | topic:3) & (method:1 | method:2 | method:4)',
+]
+
+LABEL_COLS = ['incl:1', 'excl:1', 'rel:2', 'topic:3', 'method:1', 'method:2', 'method:4']
+
+
+def make_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({col: rng.choice([0.0, 1.0, np.nan], size=n_rows, p=[0.6, 0.3, 0.1]) for col in LABEL_COLS})
+    df['item_id'] = np.arange(n_rows)
+    return df
+
+
+def as_pandas_expression(rule: str) -> str:
+    expression = rule.replace('!', '~')
+    for col in sorted(LABEL_COLS, key=len, reverse=True):
+        expression = expression.replace(col, f'(`{col}` == 1)')
+    return expression
+
+
+def best_of(runs: int, fn: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        from nacsos_data.util.priority.mask import get_inclusion_mask
+    except ImportError:
+        get_inclusion_mask = None
+
+    df = make_frame(args.rows)
+    print(f'{args.rows:,} rows, best of {args.runs}')
+    for rule in RULES:
+        compiled = compile_rule(rule)
+        expected = df.eval(as_pandas_expression(rule)).to_numpy()
+        assert (compiled.mask(df, LABEL_COLS) == expected).all(), f'Mismatch for `{rule}`'
+
+        print(f'  {rule}')
+        print(f'{"compile (cold)":>22}: {best_of(args.runs, lambda: compile_rule.__wrapped__(rule)) * 1e6:9.1f}µs')  # noqa: B023
+        print(f'{"compiled mask":>22}: {best_of(args.runs, lambda: compiled.mask(df, LABEL_COLS)) * 1000:9.1f}ms')  # noqa: B023
+        print(f'{"DataFrame.eval":>22}: {best_of(args.runs, lambda: df.eval(as_pandas_expression(rule))) * 1000:9.1f}ms')  # noqa: B023
+        if get_inclusion_mask is not None:
+            print(f'{"get_inclusion_mask":>22}: {best_of(args.runs, lambda: get_inclusion_mask(rule=rule, df=df, label_cols=LABEL_COLS)) * 1000:9.1f}ms')  # noqa: B023
+
+
+if __name__ == '__main__':
+    main()
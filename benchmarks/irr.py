@@ -0,0 +1,155 @@
+"""
+Parity and speed of the inter-rater reliability scores in `server.util.irr`.
+
+Without arguments, pairwise correlations and their p-values are checked against `scipy.stats` on seeded labels
+and `irr_scores()` is timed on a larger scope.
+With `--scope-id`, the scores of a real assignment scope (and resolution) are compared with the reference implementation
+of nacsos_data (`compute_irr_scores()`), which needs a configured database.
+
+    python -m benchmarks.irr [--annotators 5] [--items 5000]
+    python -m benchmarks.irr --scope-id <assignment_scope_id> [--resolution-id <bot_annotation_metadata_id>]
+"""
+
+import argparse
+import asyncio
+import math
+import time
+import warnings
+from typing import Any
+
+import numpy as np
+
+from server.util.irr import irr_scores
+
+# Not computed by either implementation, but derived from the scope
+IGNORED_FIELDS = {'annotation_quality_id', 'project_id', 'assignment_scope_id', 'bot_annotation_metadata_id', 'time_created', 'time_updated'}
+
+
+def make_rows(n_annotators: int, n_items: int) -> list[tuple[str, str, str, int]]:
+    rng = np.random.default_rng(42)
+    truth = rng.random(n_items) < 0.3
+    rows = []
+    for annotator in range(n_annotators):
+        labelled = rng.random(n_items) < 0.8
+        noisy = truth ^ (rng.random(n_items) < 0.1 * (annotator + 1))
+        rows += [(f'u{annotator}', f'i{item}', 'incl', int(noisy[item])) for item in np.flatnonzero(labelled)]
+        rows += [(f'u{annotator}', f'i{item}', 'topic', int(rng.integers(0, 3))) for item in np.flatnonzero(labelled & truth)]
+    return rows
+
+
+def check_correlations(rows: list[tuple[str, str, str, int]]) -> None:
+    from scipy import stats
+
+    labels = {(annotator, item, key): value for annotator, item, key, value in rows}
+    n_checked = 0
+    for score in irr_scores(rows):
+        if 'user_base' not in score:
+            continue
+        items = sorted({item for _, item, key, _ in rows if key == score['label_key']})
+        pairs = [
+            (labels[(score['user_base'], item, score['label_key'])], labels[(score['user_target'], item, score['label_key'])])
+            for item in items
+            if (score['user_base'], item, score['label_key']) in labels and (score['user_target'], item, score['label_key']) in labels
+        ]
+        base, target = (np.array(values) == score['label_value'] for values in zip(*pairs, strict=True))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = {
+                'pearson': stats.pearsonr(base, target).statistic,
+                'kendall': (kendall := stats.kendalltau(base, target)).statistic,
+                'kendall_p': kendall.pvalue,
+                'spearman': (spearman := stats.spearmanr(base, target)).statistic,
+                'spearman_p': spearman.pvalue,
+            }
+        for metric, value in expected.items():
+            assert equal(score[metric], value), f'{metric} of {score}: expected {value}'
+        n_checked += 1
+    print(f'Correlations of {n_checked} annotator pairs match scipy')
+
+
+def time_scores(rows: list[tuple[str, str, str, int]]) -> None:
+    start = time.perf_counter()
+    scores = irr_scores(rows)
+    print(f'{len(rows):,} labels: {len(scores):,} scores in {(time.perf_counter() - start) * 1000:.1f}ms')
+
+
+def equal(value: Any, expected: Any) -> bool:
+    if value is None or expected is None or (isinstance(expected, float) and math.isnan(expected)):
+        return (value is None or math.isnan(value)) and (expected is None or math.isnan(expected))
+    if isinstance(expected, float):
+        return math.isclose(value, expected, rel_tol=1e-6, abs_tol=1e-9)
+    return bool(value == expected)
+
+
+def score_key(score: dict[str, Any]) -> tuple[Any, ...]:
+    return score['label_key'], score['label_value'], str(score.get('user_base')), str(score.get('user_target'))
+
+
+async def compare_upstream(scope_id: str, resolution_id: str | None) -> None:
+    from nacsos_data.db.schemas import AnnotationScheme, AssignmentScope
+    from nacsos_data.util.annotations.evaluation.irr import compute_irr_scores
+    from sqlalchemy import select
+
+    from server.data import db_engine
+    from server.data.labels import read_label_rows
+    from server.pipelines.tasks.quality import RESOLUTION
+
+    async with db_engine.session() as session:
+        project_id = (
+            await session.execute(
+                select(AnnotationScheme.project_id)
+                .join(AssignmentScope, AssignmentScope.annotation_scheme_id == AnnotationScheme.annotation_scheme_id)
+                .where(AssignmentScope.assignment_scope_id == scope_id)
+            )
+        ).scalar_one()
+
+        start = time.perf_counter()
+        upstream = [
+            metric.model_dump()
+            for metric in await compute_irr_scores(session=session, assignment_scope_id=scope_id, resolution_id=resolution_id, project_id=project_id)
+        ]
+        time_upstream = time.perf_counter() - start
+
+        start = time.perf_counter()
+        source_ids = [scope_id] + ([resolution_id] if resolution_id else [])
+        rows = [(annotator, item_id, key, value) for _, item_id, annotator, key, value in await read_label_rows(session=session, source_ids=source_ids)]
+        scores = irr_scores(rows, pairwise_only=[RESOLUTION])
+        time_scores = time.perf_counter() - start
+        await session.rollback()
+
+    for score in scores:
+        for user_field in ['user_base', 'user_target']:
+            if score.get(user_field) == RESOLUTION:
+                score[user_field] = None
+
+    print(f'{len(upstream):,} scores upstream in {time_upstream * 1000:.1f}ms, {len(scores):,} via `irr_scores()` in {time_scores * 1000:.1f}ms')
+    ours = {score_key(score): score for score in scores}
+    for expected in upstream:
+        score = ours.get(score_key(expected))
+        assert score is not None, f'No score for {score_key(expected)}'
+        for field, value in expected.items():
+            if field in IGNORED_FIELDS:
+                continue
+            assert field in score, f'`{field}` is not computed (upstream: {value})'
+            assert equal(score[field], value), f'`{field}` of {score_key(expected)}: expected {value}, got {score[field]}'
+    print(f'All {len(upstream):,} upstream scores match, {len(ours) - len(upstream):,} additional (multi-rater) scores')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--annotators', type=int, default=5)
+    parser.add_argument('--items', type=int, default=5_000)
+    parser.add_argument('--scope-id', default=None)
+    parser.add_argument('--resolution-id', default=None)
+    args = parser.parse_args()
+
+    if args.scope_id:
+        asyncio.run(compare_upstream(args.scope_id, args.resolution_id))
+        return
+
+    check_correlations(make_rows(4, 200))
+    time_scores(make_rows(args.annotators, args.items))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Parity and speed of the tracker label sequences in `server.data.labels`.
+
+Without arguments, `label_sequences()` is checked against hand-computed sequences for a fixed set of label rows
+(repeated labels, multi-labels, majority ties, resolutions, sources without labels) and timed on synthetic rows.
+With `--source-ids`, the sequences of real assignment scopes/resolutions are compared with the reference implementation
+of nacsos_data (`get_annotations()` + `annotations_to_sequence()`), which needs a configured database.
+
+    python -m benchmarks.labels [--rows 1000000] [--runs 3]
+    python -m benchmarks.labels --source-ids <scope_id> [<resolution_id> ...] --rule 'incl:1' [--rule ...]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from server.data.labels import label_sequences
+
+# (source_id, item_id, annotator, key, value), ordered as `read_label_rows()` returns them
+ROWS = [
+    ('S1', 'i1', 'u1', 'incl', 1),
+    ('S1', 'i1', 'u2', 'incl', 1),
+    ('S1', 'i2', 'u1', 'incl', 1),
+    ('S1', 'i2', 'u2', 'incl', 0),
+    ('S1', 'i3', 'u1', 'incl', 0),
+    ('S1', 'i3', 'u1', 'incl', 0),
+    ('S1', 'i4', 'u1', 'incl', 1),
+    ('S1', 'i4', 'u2', 'incl', 1),
+    ('S1', 'i4', 'u3', 'incl', 0),
+    ('S1', 'i5', 'u1', 'topic', 2),
+    ('S1', 'i5', 'u1', 'topic', 3),
+    ('S1', 'i5', 'u1', 'incl', 1),
+    ('R1', 'i1', 'resolution', 'incl', 0),
+    ('R1', 'i2', 'resolution', 'incl', 1),
+]
+SOURCES = ['S1', 'S2', 'R1']
+
+# (rule, majority) -> expected sequences (S2 has no labels and is skipped)
+EXPECTED = {
+    ('incl:1', False): [[1, 1, 0, 1, 1], [0, 1]],
+    ('incl:1', True): [[1, 0, 0, 1, 1], [0, 1]],
+    ('incl:1 & !topic:3', False): [[1, 1, 0, 1, 0], [0, 1]],
+    ('incl:1 & !topic:3', True): [[1, 0, 0, 1, 0], [0, 1]],
+    ('incl:0 | topic:2', False): [[0, 1, 1, 1, 1], [1, 0]],
+    ('incl:0 | topic:2', True): [[0, 0, 1, 0, 1], [1, 0]],
+}
+
+
+def check_fixed_rows() -> None:
+    for (rule, majority), expected in EXPECTED.items():
+        result = label_sequences(ROWS, source_ids=SOURCES, rule=rule, majority=majority)
+        assert result == expected, f'`{rule}` (majority={majority}): expected {expected}, got {result}'
+    print(f'{len(EXPECTED)} fixed cases match')
+
+
+def make_rows(n_rows: int) -> list[tuple[str, str, str, str, int]]:
+    rng = np.random.default_rng(42)
+    n_items = n_rows // 3
+    items = np.sort(rng.integers(0, n_items, size=n_rows))
+    return [
+        ('S1', f'i{item}', f'u{annotator}', key, int(value))
+        for item, annotator, key, value in zip(
+            items,
+            rng.integers(0, 5, size=n_rows),
+            rng.choice(['incl', 'excl', 'topic'], size=n_rows),
+            rng.integers(0, 3, size=n_rows),
+            strict=True,
+        )
+    ]
+
+
+def time_synthetic(n_rows: int, runs: int) -> None:
+    rows = make_rows(n_rows)
+    for majority in [False, True]:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            label_sequences(rows, source_ids=['S1'], rule='incl:1 & !(excl:1 | topic:2)', majority=majority)
+            timings.append(time.perf_counter() - start)
+        print(f'{n_rows:,} rows, majority={majority}: {min(timings) * 1000:.1f}ms')
+
+
+async def compare_upstream(source_ids: list[str], rules: list[str]) -> None:
+    from nacsos_data.util.annotations.label_transform import annotations_to_sequence, get_annotations
+
+    from server.data import db_engine
+    from server.data.labels import read_label_rows
+
+    async with db_engine.session() as session:
+        start = time.perf_counter()
+        batched_annotations = [await get_annotations(session=session, source_ids=[sid]) for sid in source_ids]
+        time_upstream = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = await read_label_rows(session=session, source_ids=source_ids)
+        time_rows = time.perf_counter() - start
+
+    print(f'Reading labels: {time_upstream * 1000:.1f}ms upstream, {time_rows * 1000:.1f}ms `read_label_rows()`')
+    for rule in rules:
+        for majority in [False, True]:
+            expected = [annotations_to_sequence(rule, annotations=annotations, majority=majority) for annotations in batched_annotations if len(annotations) > 0]
+            result = label_sequences(rows, source_ids=source_ids, rule=rule, majority=majority)
+            assert result == expected, f'Mismatch for `{rule}` (majority={majority})'
+            print(f'  `{rule}` (majority={majority}): {sum(len(seq) for seq in result):,} labels match')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--source-ids', nargs='+', default=None)
+    parser.add_argument('--rule', action='append', default=None)
+    args = parser.parse_args()
+
+    if args.source_ids:
+        asyncio.run(compare_upstream(args.source_ids, args.rule or ['incl:1']))
+        return
+
+    check_fixed_rows()
+    time_synthetic(args.rows, args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Per-request overhead and streaming throughput of the middleware stack.
+
+Compares the previous `BaseHTTPMiddleware`-based implementations (kept below for reference)
+with the pure ASGI middlewares in `server.util.middlewares`. Requests are driven directly
+through the ASGI interface, so the numbers exclude any network or server overhead.
+
+    python -m benchmarks.middlewares [--requests 5000] [--chunks 2000]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse, PlainTextResponse
+
+from server.util.middlewares import TimingMiddleware, ErrorHandlingMiddleware
+
+
+class LegacyTimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        start_time = time.time()
+        start_cpu_time = TimingMiddleware._get_cpu_time()
+        response = await call_next(request)
+        response.headers['X-CPU-Time'] = f'{TimingMiddleware._get_cpu_time() - start_cpu_time:.8f}s'
+        response.headers['X-WallTime'] = f'{time.time() - start_time:.8f}s'
+        return response
+
+
+class LegacyErrorHandlingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        try:
+            return await call_next(request)
+        except (Exception, Warning) as ew:
+            return PlainTextResponse(str(ew), status_code=400)
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/ping')
+    async def ping() -> dict[str, str]:
+        return {'ping': 'pong'}
+
+    @app.get('/stream')
+    async def stream(chunks: int = 1000, size: int = 16384) -> StreamingResponse:
+        payload = b'x' * size
+
+        async def gen() -> AsyncIterator[bytes]:
+            for _ in range(chunks):
+                yield payload
+
+        return StreamingResponse(gen(), media_type='application/octet-stream')
+
+    app.add_middleware(LegacyErrorHandlingMiddleware if legacy else ErrorHandlingMiddleware)
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.add_middleware(LegacyTimingMiddleware if legacy else TimingMiddleware)
+    return app
+
+
+async def request(app: FastAPI, path: str, query: str = '') -> int:
+    scope: dict[str, Any] = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'bench'), (b'accept-encoding', b'identity')],
+        'client': ('127.0.0.1', 1234),
+        'server': ('bench', 80),
+    }
+    received = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive() -> dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await response_done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal received
+        if message['type'] == 'http.response.body':
+            received += len(message.get('body', b''))
+            if not message.get('more_body', False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return received
+
+
+async def run(n_requests: int, n_chunks: int) -> None:
+    for legacy in [True, False]:
+        app = build_app(legacy=legacy)
+        label = 'BaseHTTPMiddleware' if legacy else 'pure ASGI'
+
+        await request(app, '/ping')  # warm-up
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            await request(app, '/ping')
+        per_request = (time.perf_counter() - start) / n_requests
+
+        start = time.perf_counter()
+        n_bytes = await request(app, '/stream', f'chunks={n_chunks}&size=16384')
+        throughput = n_bytes / (time.perf_counter() - start) / 1024**2
+
+        print(f'{label:>20}: {per_request * 1e6:8.1f} µs/request | streaming {throughput:8.1f} MiB/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--chunks', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.chunks))
@@ -0,0 +1,97 @@
+"""
+Serialisation cost of large list responses.
+
+Compares the default FastAPI path (return models, `response_model` dumps them to dicts, validates them again,
+and encodes the result) with `server.util.fastjson.models_response` (one bulk dump of the models) and
+`server.util.fastjson.rows_response` (plain row mappings, no models at all).
+Requests are driven directly through the ASGI interface, so the numbers exclude any network or server overhead.
+
+    python -m benchmarks.serialization [--rows 100000] [--runs 3]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from server.util import fastjson
+from server.util.fastjson import models_response, rows_response
+from benchmarks.middlewares import request
+
+
+class Row(BaseModel):
+    item_id: str | uuid.UUID | None = None
+    project_id: str | uuid.UUID | None = None
+    text: str | None = None
+    title: str | None = None
+    doi: str | None = None
+    publication_year: int | None = None
+    time_created: datetime | None = None
+    meta: dict[str, Any] | None = None
+
+
+def make_rows(n: int) -> list[dict[str, Any]]:
+    project_id = uuid.uuid4()
+    now = datetime.now(tz=timezone.utc)
+    return [
+        {
+            'item_id': uuid.uuid4(),
+            'project_id': project_id,
+            'text': f'Abstract number {i} ' * 20,
+            'title': f'Title {i}',
+            'doi': f'10.1234/{i}',
+            'publication_year': 1990 + i % 35,
+            'time_created': now,
+            'meta': {'source': 'bench', 'rank': i},
+        }
+        for i in range(n)
+    ]
+
+
+def build_app(rows: list[dict[str, Any]]) -> FastAPI:
+    app = FastAPI()
+    models = [Row.model_validate(row) for row in rows]
+
+    @app.get('/default', response_model=list[Row])
+    async def default() -> list[Row]:
+        return models
+
+    @app.get('/models')
+    async def models_() -> Response:
+        return models_response(Row, models)
+
+    @app.get('/rows')
+    async def rows_() -> Response:
+        return rows_response(Row, rows)
+
+    return app
+
+
+async def run(n_rows: int, n_runs: int) -> None:
+    rows = make_rows(n_rows)
+    app = build_app(rows)
+    print(f'{n_rows:,} rows, best of {n_runs} ({"orjson" if fastjson.orjson is not None else "pydantic-core"} for plain rows)')
+
+    for path, label in [('/default', 'response_model'), ('/models', 'models_response'), ('/rows', 'rows_response')]:
+        timings = []
+        n_bytes = 0
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            n_bytes = await request(app, path)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f'{label:>16}: {best * 1000:9.1f}ms | {n_rows / best:>12,.0f} rows/s | {n_bytes / 1024**2:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.runs))
@@ -0,0 +1,81 @@
+"""
+Cold-start import time of API and dramatiq workers.
+
+Each target is imported in a fresh interpreter with `python -X importtime`, so nothing is cached between runs.
+Reports the total import time and the packages that take longest to import (summing the own time of their modules),
+and fails if a target exceeds its budget.
+
+    python -m benchmarks.startup [--runs 3] [--top 15] [--budget-api 1500] [--budget-worker 2500]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+TARGETS = {
+    # what an API worker imports before it can serve `/ping`
+    'api': 'import server.__main__',
+    # what `dramatiq server.pipelines.tasks` imports before it consumes messages
+    'worker': 'import server.pipelines.tasks',
+}
+
+# import time: self [us] | cumulative | imported package
+RE_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def measure(statement: str) -> tuple[float, dict[str, float]]:
+    """
+    :return: total import time in ms and import time per package in ms
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'Failed to run `{statement}`:\n{proc.stderr[-2000:]}')
+
+    total = 0.0
+    packages: dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = RE_LINE.match(line)
+        if not match:
+            continue
+        self_us, _cumulative_us, _indent, module = match.groups()
+        total += int(self_us) / 1000
+        packages[module.split('.')[0]] += int(self_us) / 1000
+    return total, packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per target (best run is reported)')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest packages to list')
+    parser.add_argument('--budget-api', type=float, default=1500, help='Import time budget of the API in ms')
+    parser.add_argument('--budget-worker', type=float, default=2500, help='Import time budget of the worker in ms')
+    parser.add_argument('targets', nargs='*', default=list(TARGETS.keys()), choices=list(TARGETS.keys()))
+    args = parser.parse_args()
+
+    budgets = {'api': args.budget_api, 'worker': args.budget_worker}
+    over_budget = []
+    for target in args.targets:
+        runs = [measure(TARGETS[target]) for _ in range(args.runs)]
+        total, packages = min(runs, key=lambda run: run[0])
+
+        print(f'{target}: {total:,.0f}ms (budget {budgets[target]:,.0f}ms, best of {args.runs})')
+        for package, ms in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+            print(f'  {ms:>9,.1f}ms  {package}')
+        if total > budgets[target]:
+            over_budget.append(target)
+
+    if over_budget:
+        print(f'Over budget: {", ".join(over_budget)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,13 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
-from .util.middlewares import TimingMiddleware, ErrorHandlingMiddleware
+from .util.middlewares import TimingMiddleware, ErrorHandlingMiddleware, ProfilingMiddleware, CompressionMiddleware
 from .util.config import settings
-from .util.security import auth_helper
+from .util.security import auth_helper, cache_invalidations
+from .util.metrics import metrics
 from .data import db_engine
 from .util.logging import get_logger
 from .api import router as api_router
@@ -28,10 +28,14 @@ async def lifespan(app: FastAPI):  # type: ignore[no-untyped-def]
     # Following code executed on startup
     await db_engine.startup()
     await auth_helper
+    cache_invalidations.start()
+    metrics.start()
 
     yield  # running server
 
     # Following code executed after shutdown
+    await cache_invalidations.stop()
+    await metrics.stop()
 
 
 app = FastAPI(
@@ -46,6 +50,7 @@ logger.debug('Setting up server and middlewares')
 mimetypes.add_type('application/javascript', '.js')
 
 app.add_middleware(ErrorHandlingMiddleware)
+app.add_middleware(ProfilingMiddleware)
 if settings.SERVER.HEADER_TRUSTED_HOST:
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.SERVER.CORS_ORIGINS)
     logger.info(f'TrustedHostMiddleware allows the following hosts: {settings.SERVER.CORS_ORIGINS}')
@@ -58,7 +63,7 @@ if settings.SERVER.HEADER_CORS:
         allow_credentials=True,
     )
     logger.info(f'CORSMiddleware will accept the following origins: {settings.SERVER.CORS_ORIGINS}')
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(TimingMiddleware)
 
 logger.debug('Setup routers')
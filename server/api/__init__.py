@@ -16,6 +16,7 @@ from .routes import mailing
 from .routes import pipelines
 from .routes import item
 from .routes import priority
+from .routes import metrics
 
 # this router proxies all /api endpoints
 router = APIRouter()
@@ -70,3 +71,6 @@ router.include_router(item.router, prefix='/item', tags=['item'])
 
 # route for viewing and editing item details
 router.include_router(priority.router, prefix='/prio', tags=['prio'])
+
+# route for request metrics (Prometheus format)
+router.include_router(metrics.router, prefix='/metrics', tags=['metrics'])
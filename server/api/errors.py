@@ -41,6 +41,14 @@ class AssignmentScopeNotFoundError(Exception):
     pass
 
 
+class TaskStillRunningError(Exception):
+    status = http_status.HTTP_409_CONFLICT
+
+
+class TaskNotFoundError(Exception):
+    status = http_status.HTTP_404_NOT_FOUND
+
+
 class SaveFailedError(Exception):
     pass
 
@@ -9,6 +9,7 @@ from sqlalchemy import select, func as F, distinct, text
 from sqlalchemy.orm import load_only
 from sqlalchemy.dialects import postgresql as psa
 from fastapi import APIRouter, Depends, HTTPException, status as http_status, Query
+from fastapi.responses import Response
 
 from nacsos_data.db.schemas import BotAnnotationMetaData, AssignmentScope, User, Annotation, BotAnnotation, Assignment
 from nacsos_data.models.annotations import AnnotationSchemeModel, AssignmentScopeModel, AssignmentModel, AssignmentStatus, AnnotationSchemeModelFlat
@@ -24,7 +25,6 @@ from nacsos_data.models.bot_annotations import (
 from nacsos_data.models.users import UserModel
 from nacsos_data.models.items import AnyItemModel
 from nacsos_data.db.crud.items import read_any_item_by_item_id
-from nacsos_data.db.crud.projects import read_project_by_id
 from nacsos_data.db.crud.annotations import (
     read_assignment,
     read_assignments_for_scope,
@@ -65,7 +65,10 @@ from server.api.errors import (
     RemainingDependencyWarning,
 )
 from server.util.security import UserPermissionChecker
+from server.util.fastjson import models_response
 from server.data import db_engine
+from server.data.projects import read_project_type
+from server.data.response_cache import response_cache
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession  # noqa F401
@@ -111,6 +114,7 @@ async def put_annotation_scheme(
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_edit')),
 ) -> str:
     key = await upsert_annotation_scheme(annotation_scheme=annotation_scheme, db_engine=db_engine)
+    await response_cache.bump(permissions.permissions.project_id, 'schemes')
     return str(key)
 
 
@@ -120,9 +124,11 @@ async def remove_annotation_scheme(
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_edit')),
 ) -> None:
     await delete_annotation_scheme(annotation_scheme_id=annotation_scheme_id, db_engine=db_engine, use_commit=True)
+    await response_cache.bump(permissions.permissions.project_id, 'schemes', 'annotations')
 
 
 @router.get('/schemes/list', response_model=list[AnnotationSchemeModel])
+@response_cache.cached('annotations.schemes', tags=('schemes',))
 async def get_scheme_definitions_for_project(
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
 ) -> list[AnnotationSchemeModel]:
@@ -177,11 +183,11 @@ async def _construct_annotation_item(assignment: AssignmentModel, project_id: st
     annotations = await read_annotations_for_assignment(assignment_id=assignment.assignment_id, db_engine=db_engine)
     merged_scheme = merge_scheme_and_annotations(annotation_scheme=scheme, annotations=annotations)
 
-    project = await read_project_by_id(project_id=project_id, engine=db_engine)
-    if project is None:
+    item_type = await read_project_type(project_id)
+    if item_type is None:
         raise ProjectNotFoundError(f'No project found in DB for id {project_id}')
 
-    item = await read_any_item_by_item_id(item_id=assignment.item_id, item_type=project.type, engine=db_engine)
+    item = await read_any_item_by_item_id(item_id=assignment.item_id, item_type=item_type, engine=db_engine)
     if item is None:
         raise MissingInformationError(f'No item found in DB for id {assignment.item_id}')
 
@@ -244,6 +250,7 @@ async def get_assignment(
 
 
 @router.get('/assignments/scopes/{project_id}', response_model=list[UserProjectAssignmentScope])
+@response_cache.cached('annotations.scopes.user', tags=('schemes', 'annotations'), per_user=True)
 async def get_assignment_scopes_for_user(
     project_id: str,
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
@@ -253,6 +260,7 @@ async def get_assignment_scopes_for_user(
 
 
 @router.get('/assignments/scopes/', response_model=list[AssignmentScopeModel])
+@response_cache.cached('annotations.scopes.project', tags=('schemes',))
 async def get_assignment_scopes_for_project(
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
 ) -> list[AssignmentScopeModel]:
@@ -287,6 +295,7 @@ async def put_assignment_scope(
             )
         )
         await session.commit()
+    await response_cache.bump(permissions.permissions.project_id, 'schemes')
 
 
 @router.delete('/annotate/scope/{assignment_scope_id}')
@@ -298,6 +307,7 @@ async def remove_assignment_scope(
         await delete_assignment_scope(assignment_scope_id=assignment_scope_id, db_engine=db_engine, use_commit=True)
     except ValueError as e:
         raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await response_cache.bump(permissions.permissions.project_id, 'schemes', 'annotations')
 
 
 @router.get('/annotate/scope/counts/{assignment_scope_id}', response_model=AssignmentCounts)
@@ -322,17 +332,18 @@ async def get_assignments(
 async def get_assignment_indicators_for_scope(
     assignment_scope_id: str,
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
-) -> list[AssignmentScopeEntry]:
-    return await read_assignment_overview_for_scope(assignment_scope_id=assignment_scope_id, connection=db_engine)
+) -> Response:
+    entries = await read_assignment_overview_for_scope(assignment_scope_id=assignment_scope_id, connection=db_engine)
+    return models_response(AssignmentScopeEntry, entries)
 
 
 @router.get('/annotate/assignments/scope/{assignment_scope_id}', response_model=list[AssignmentModel])
 async def get_assignments_for_scope(
     assignment_scope_id: str,
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
-) -> list[AssignmentModel]:
+) -> Response:
     assignments = await read_assignments_for_scope(assignment_scope_id=assignment_scope_id, db_engine=db_engine)
-    return assignments
+    return models_response(AssignmentModel, assignments)
 
 
 @router.get('/annotate/annotations/{assignment_scope_id}', response_model=list[AssignmentModel])
@@ -366,6 +377,7 @@ async def save_annotation(
     ):
         annotations = annotated_scheme_to_annotations(annotated_item.scheme)
         status = await upsert_annotations(annotations=annotations, assignment_id=annotated_item.assignment.assignment_id, db_engine=db_engine)
+        await response_cache.bump(permissions.permissions.project_id, 'annotations')
         if status is not None:
             return status
         raise SaveFailedError('Failed to save annotation!')
@@ -379,9 +391,9 @@ async def save_annotation(
 @router.get('/config/items/', response_model=list[ItemWithCount])
 async def get_items_with_count(
     permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
-) -> list[ItemWithCount]:
+) -> Response:
     items = await read_item_ids_with_assignment_count_for_project(project_id=permissions.permissions.project_id, db_engine=db_engine)
-    return items
+    return models_response(ItemWithCount, items)
 
 
 @router.put('/config/assignments/{assignment_scope_id}')
@@ -391,6 +403,7 @@ async def make_assignments(
 ) -> None:
     async with db_engine.session() as session:  # type: AsyncSession
         await create_assignments(session=session, assignment_scope_id=assignment_scope_id, project_id=permissions.permissions.project_id)
+    await response_cache.bump(permissions.permissions.project_id, 'schemes')
 
 
 @router.post('/config/scopes/clear/{scheme_id}')
@@ -428,6 +441,7 @@ async def clear_empty_assignments(
         );""")
         await session.execute(stmt, {'scope_id': scope_id, 'user_id': user_id})
         await session.commit()
+    await response_cache.bump(permissions.permissions.project_id, 'schemes')
     return None
 
 
@@ -469,6 +483,7 @@ async def bulk_add_assignment(
             ]
         )
         await session.commit()
+    await response_cache.bump(permissions.permissions.project_id, 'schemes')
     return None
 
 
@@ -514,6 +529,7 @@ async def edit_assignment(
             if n_annotations == 0:
                 await session.delete(assignment)
                 await session.commit()
+                await response_cache.bump(permissions.permissions.project_id, 'schemes')
                 return model
 
             raise RemainingDependencyWarning("Assignment has annotations, won't delete!")
@@ -531,10 +547,12 @@ async def edit_assignment(
         session.add(assignment)
         model = AssignmentModel.model_validate(assignment.__dict__)
         await session.commit()
+        await response_cache.bump(permissions.permissions.project_id, 'schemes')
         return model
 
 
 @router.get('/config/scopes/{scheme_id}', response_model=list[AssignmentScopeModel])
+@response_cache.cached('annotations.scopes.scheme', tags=('schemes',))
 async def get_assignment_scopes_for_scheme(
     scheme_id: str,
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
@@ -646,6 +664,7 @@ async def save_resolved_annotations(
         ignore_repeat=settings.ignore_repeat,
         matrix=matrix,
     )
+    await response_cache.bump(permissions.permissions.project_id, 'annotations')
     return meta_id
 
 
@@ -658,6 +677,7 @@ async def update_resolved_annotations(
 ) -> None:
     # TODO: allow update of filters and settings?
     await update_resolved_bot_annotations(bot_annotation_metadata_id=bot_annotation_metadata_id, name=name, matrix=matrix, db_engine=db_engine, use_commit=True)
+    await response_cache.bump(permissions.permissions.project_id, 'annotations')
 
 
 @router.get('/config/resolved-list/', response_model=list[BotAnnotationMetaDataBaseModel])
@@ -703,6 +723,7 @@ async def delete_saved_resolved_annotations(
         if meta is not None:
             await session.delete(meta)
             await session.commit()
+            await response_cache.bump(permissions.permissions.project_id, 'annotations')
         # TODO: do we need to commit?
         # TODO: ensure bot_annotations are deleted via cascade
 
@@ -8,8 +8,10 @@ from nacsos_data.db.schemas.users import AuthToken
 from nacsos_data.models.users import UserModel, AuthTokenModel
 
 from server.api.errors import NoDataForKeyError
-from server.util.security import get_current_active_user, auth_helper, InvalidCredentialsError, NotAuthenticated
+from server.util.security import get_current_active_user, auth_helper, InvalidCredentialsError, NotAuthenticated, invalidate_token, invalidate_user
 from server.util.logging import get_logger
+from server.util.config import settings
+from server.util.tokens import create_signed_token, decode_signed_token, is_signed_token, revocation_list
 from server.data import db_engine
 
 if TYPE_CHECKING:
@@ -25,6 +27,8 @@ logger.info('Setting up login route')
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()) -> AuthTokenModel:
     try:
         user = await auth_helper.check_password(username=form_data.username, plain_password=form_data.password)
+        if settings.SERVER.SIGNED_TOKENS:
+            return create_signed_token(user)
         token = await auth_helper.refresh_or_create_token(username=user.username)
         return token
     except InvalidCredentialsError as e:
@@ -34,6 +38,11 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @router.put('/token/{token_id}', response_model=AuthTokenModel)
 async def refresh_token(token_id: str, current_user: UserModel = Depends(get_current_active_user)) -> AuthTokenModel:
     try:
+        if settings.SERVER.SIGNED_TOKENS and is_signed_token(token_id):
+            claims = decode_signed_token(token_id)
+            if claims.name != current_user.username:
+                raise InvalidCredentialsError('Token does not belong to this user.')
+            return create_signed_token(current_user)
         token = await auth_helper.refresh_or_create_token(token_id=token_id, verify_username=current_user.username)
         return token
     except (InvalidCredentialsError, AssertionError) as e:
@@ -42,7 +51,15 @@ async def refresh_token(token_id: str, current_user: UserModel = Depends(get_cur
 
 @router.delete('/token/{token_id}')
 async def revoke_token(token_id: str, current_user: UserModel = Depends(get_current_active_user)) -> None:
+    if settings.SERVER.SIGNED_TOKENS and is_signed_token(token_id):
+        claims = decode_signed_token(token_id)
+        if claims.name != current_user.username:
+            raise NotAuthenticated('Token does not belong to this user.')
+        await revocation_list.revoke_token(claims)
+        await invalidate_token(token_id)
+        return
     await auth_helper.clear_token_by_id(token_id=token_id, verify_username=current_user.username)
+    await invalidate_token(token_id)
 
 
 @router.get('/my-tokens', response_model=list[AuthTokenModel])
@@ -68,6 +85,9 @@ async def logout(current_user: UserModel = Depends(get_current_active_user)) ->
         raise NotAuthenticated('RuntimeError(empty username)')
 
     await auth_helper.clear_tokens_by_user(username=username)
+    if settings.SERVER.SIGNED_TOKENS and current_user.user_id is not None:
+        await revocation_list.revoke_user(current_user.user_id)
+    await invalidate_user(username=username)
 
 
 # TODO forgot password route
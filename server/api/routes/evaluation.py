@@ -1,20 +1,20 @@
 import uuid
 from typing import Literal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query
 from nacsos_data.db.crud import upsert_orm
-from nacsos_data.db.schemas import AnnotationTracker, AssignmentScope, AnnotationScheme, BotAnnotationMetaData, AnnotationQuality
+from nacsos_data.db.schemas import Task, AnnotationTracker, AssignmentScope, AnnotationScheme, BotAnnotationMetaData, AnnotationQuality
 from nacsos_data.models.annotation_quality import AnnotationQualityModel
 from nacsos_data.models.annotation_tracker import AnnotationTrackerModel, DehydratedAnnotationTracker
 from nacsos_data.models.bot_annotations import BotAnnotationMetaDataBaseModel
-from nacsos_data.util.annotations.evaluation.buscar import compute_recall, retrospective_h0, recall_frontier
-from nacsos_data.util.annotations.evaluation.irr import compute_irr_scores
-from nacsos_data.util.annotations.label_transform import annotations_to_sequence, get_annotations
+from nacsos_data.models.pipeline import TaskStatus
 from nacsos_data.util.auth import UserPermissions
 from pydantic import BaseModel
-from sqlalchemy import select, String, literal, delete
+from sqlalchemy import select, String, literal
 
 from server.data import db_engine
+from server.data.redis_client import get_redis
+from server.data.response_cache import response_cache
 from server.api.errors import DataNotFoundWarning
 from server.util.logging import get_logger
 from server.util.security import UserPermissionChecker
@@ -34,6 +34,7 @@ class LabelScope(BaseModel):
 
 
 @router.get('/tracking/scopes', response_model=list[LabelScope])
+@response_cache.cached('evaluation.scopes', tags=('schemes', 'annotations'))
 async def get_project_scopes(permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read'))) -> list[LabelScope]:
     async with db_engine.session() as session:  # type: AsyncSession
         stmt = (
@@ -109,28 +110,35 @@ async def save_tracker(tracker: AnnotationTrackerModel, permissions: UserPermiss
     return str(pkey)
 
 
+def _tracker_task_key(tracker_id: str) -> str:
+    return f'nacsos:tracker:{tracker_id}:task'
+
+
 @router.post('/tracking/refresh', response_model=AnnotationTrackerModel)
 async def update_tracker(
     tracker_id: str,
-    background_tasks: BackgroundTasks,
     reset: bool = Body(default=True, deprecated='Not used anymore, just here for compatibility!'),
+    incremental: bool = Query(default=True),
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_edit')),
 ) -> AnnotationTrackerModel:
-    async with db_engine.session() as session:  # type: AsyncSession
-        tracker = await read_tracker(tracker_id=tracker_id, session=session, project_id=permissions.permissions.project_id)
+    """
+    Updates the label sequence of the tracker and queues the (CPU-heavy) scoring in a pipeline worker;
+    poll `/tracking/tracker/{tracker_id}/status` to know when the new scores are ready.
 
-        batched_annotations = [await get_annotations(session=session, source_ids=[sid]) for sid in tracker.source_ids]
+    With `incremental`, previous scores are kept until then and the worker only computes BUSCAR scores for new labels
+    (as long as previous labels and tracker parameters did not change). Otherwise, scores are reset and computed from scratch.
+    """
+    async with db_engine.session() as session:  # type: AsyncSession
+        # numpy-backed, only imported on first use to keep startup fast
+        from server.data.labels import tracker_sequences
 
-        batched_sequence = [
-            annotations_to_sequence(tracker.inclusion_rule, annotations=annotations, majority=tracker.majority)
-            for annotations in batched_annotations
-            if len(annotations) > 0
-        ]
+        tracker = await read_tracker(tracker_id=tracker_id, session=session, project_id=permissions.permissions.project_id)
+        batched_sequence = await tracker_sequences(session=session, source_ids=tracker.source_ids, rule=tracker.inclusion_rule, majority=tracker.majority)
 
-        # reset scores
-        tracker.recall = None
-        tracker.buscar = None
-        tracker.buscar_frontier = None
+        if not incremental:
+            tracker.recall = None
+            tracker.buscar = None
+            tracker.buscar_frontier = None
 
         # Update labels
         tracker.labels = batched_sequence
@@ -138,41 +146,54 @@ async def update_tracker(
         model = AnnotationTrackerModel.model_validate(tracker.__dict__)
         await session.commit()
 
-        # We are not handing over the existing tracker ORM, because the session is not persistent
-        background_tasks.add_task(bg_populate_tracker, tracker_id, batched_sequence)
-
-        return model
-
+    if len(batched_sequence) > 0:
+        # the broker (and all actors) are only set up once the first task is sent
+        from server.pipelines import tasks
 
-async def bg_populate_tracker(tracker_id: str, labels: list[list[int]] | None = None) -> None:
-    async with db_engine.session() as session:  # type: AsyncSession
-        tracker = await read_tracker(tracker_id=tracker_id, session=session)
-
-        if labels is None or len(labels) == 0:
-            labels = tracker.labels
+        message = tasks.tracker.populate_tracker_task.send(
+            project_id=str(permissions.permissions.project_id),  # type: ignore[call-arg]
+            user_id=str(permissions.user.user_id),
+            comment=f'Scores for tracker "{model.name}" ({tracker_id})',
+            tracker_id=tracker_id,
+            incremental=incremental,
+        )
+        await get_redis().set(_tracker_task_key(tracker_id), message.options['nacsos_task_id'], ex=7 * 24 * 60 * 60)
 
-        if labels is not None:
-            flat_labels = [lab for batch in labels for lab in batch]
+    return model
 
-            recall = compute_recall(labels_=flat_labels)
-            tracker.recall = recall
 
-            scores = retrospective_h0(
-                labels_=flat_labels,
-                n_docs=tracker.n_items_total,
-                recall_target=tracker.recall_target,
-                bias=tracker.bias,
-                batch_size=tracker.batch_size,
-                confidence_level=tracker.confidence_level,
-            )
-            # retrospective_h0() -> tuple[list[int], list[float | None]]
-            # tracker.buscar: list[tuple[int, float | None]]
+class TrackerStatus(BaseModel):
+    tracker_id: str
+    # Task that computes the scores (if any was queued recently)
+    task_id: str | None = None
+    status: TaskStatus | None = None
+    # True once `recall`, `buscar`, and `buscar_frontier` of the tracker are up-to-date
+    scores_ready: bool
+    # True if the tracker holds scores of an earlier label sequence (while new ones are computed, or after that failed)
+    stale: bool = False
 
-            frontier = recall_frontier(labels_=flat_labels, n_docs=tracker.n_items_total, bias=tracker.bias)
 
-            tracker.buscar = list(zip(*scores, strict=False))
-            tracker.buscar_frontier = list(zip(*frontier, strict=False))
-            await session.commit()
+@router.get('/tracking/tracker/{tracker_id}/status', response_model=TrackerStatus)
+async def get_tracker_status(tracker_id: str, permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read'))) -> TrackerStatus:
+    task_id = await get_redis().get(_tracker_task_key(tracker_id))
+    async with db_engine.session() as session:  # type: AsyncSession
+        tracker = await read_tracker(tracker_id=tracker_id, session=session, project_id=permissions.permissions.project_id)
+        has_scores = tracker.recall is not None
+        if task_id is None:
+            return TrackerStatus(tracker_id=tracker_id, scores_ready=has_scores)
+
+        task_id = task_id.decode()
+        task = await session.get(Task, task_id)
+        status = None if task is None else TaskStatus(task.status)
+        # scores only caught up with the labels once the last task completed (pending, running, failed, or cancelled ones did not)
+        outdated = status is not None and status != TaskStatus.COMPLETED
+        return TrackerStatus(
+            tracker_id=tracker_id,
+            task_id=task_id,
+            status=status,
+            scores_ready=has_scores and not outdated,
+            stale=has_scores and outdated,
+        )
 
 
 @router.get('/quality/load/{assignment_scope_id}', response_model=list[AnnotationQualityModel])
@@ -186,22 +207,62 @@ async def get_irr(
         return [AnnotationQualityModel(**r.__dict__) for r in results]
 
 
-@router.get('/quality/compute', response_model=list[AnnotationQualityModel])
+def _irr_task_key(assignment_scope_id: str) -> str:
+    return f'nacsos:irr:{assignment_scope_id}:task'
+
+
+@router.post('/quality/compute', response_model=list[AnnotationQualityModel], response_description='Scores of the previous computation (not the queued one)')
+@router.get(
+    '/quality/compute',
+    response_model=list[AnnotationQualityModel],
+    response_description='Scores of the previous computation (not the queued one)',
+    deprecated=True,  # kept for existing clients, use POST
+)
 async def recompute_irr(
     assignment_scope_id: str,
     bot_annotation_metadata_id: str | None = None,
+    force: bool = False,
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
 ) -> list[AnnotationQualityModel]:
-    async with db_engine.session() as session:  # type: AsyncSession
-        # Delete existing metrics
-        await session.execute(delete(AnnotationQuality).where(AnnotationQuality.assignment_scope_id == assignment_scope_id))
-        # Compute new metrics
-        metrics = await compute_irr_scores(
-            session=session, assignment_scope_id=assignment_scope_id, resolution_id=bot_annotation_metadata_id, project_id=permissions.permissions.project_id
-        )
-
-        metrics_orm = [AnnotationQuality(**metric.model_dump()) for metric in metrics]
-        session.add_all(metrics_orm)
-        await session.commit()
+    """
+    Queues the computation of inter-rater reliability scores in a pipeline worker and returns the previous scores,
+    which are empty if none were computed yet and do not reflect the queued computation.
+    Scopes whose labels did not change since the last computation are skipped, unless `force` is set;
+    poll `/quality/status/{assignment_scope_id}` to know when the new scores are ready and read them via `/quality/load/{assignment_scope_id}`.
+    """
+    # the broker (and all actors) are only set up once the first task is sent
+    from server.pipelines import tasks
+
+    message = tasks.quality.compute_irr_task.send(
+        project_id=str(permissions.permissions.project_id),  # type: ignore[call-arg]
+        user_id=str(permissions.user.user_id),
+        comment=f'IRR scores for scope {assignment_scope_id}',
+        assignment_scope_id=assignment_scope_id,
+        bot_annotation_metadata_id=bot_annotation_metadata_id,
+        force=force,
+    )
+    await get_redis().set(_irr_task_key(assignment_scope_id), message.options['nacsos_task_id'], ex=7 * 24 * 60 * 60)
 
     return await get_irr(assignment_scope_id, permissions)
+
+
+class QualityStatus(BaseModel):
+    assignment_scope_id: str
+    # Task that computes the scores (if any was queued recently)
+    task_id: str | None = None
+    status: TaskStatus | None = None
+
+
+@router.get('/quality/status/{assignment_scope_id}', response_model=QualityStatus)
+async def get_irr_status(assignment_scope_id: str, permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read'))) -> QualityStatus:
+    task_id = await get_redis().get(_irr_task_key(assignment_scope_id))
+    if task_id is None:
+        return QualityStatus(assignment_scope_id=assignment_scope_id)
+
+    async with db_engine.session() as session:  # type: AsyncSession
+        task = await session.get(Task, task_id.decode())
+        return QualityStatus(
+            assignment_scope_id=assignment_scope_id,
+            task_id=task_id.decode(),
+            status=None if task is None else TaskStatus(task.status),
+        )
@@ -4,8 +4,6 @@ import tempfile
 import uuid
 from typing import TYPE_CHECKING
 
-from nacsos_data.db.crud.projects import read_project_by_id
-
 from fastapi import APIRouter, Depends
 from nacsos_data.models.nql import NQLFilter
 from nacsos_data.util.annotations.export import (
@@ -25,6 +23,8 @@ from server.util.security import UserPermissionChecker
 from nacsos_data.util.auth import UserPermissions
 
 from server.data import db_engine
+from server.data.projects import read_project_cached
+from server.data.response_cache import response_cache
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession  # noqa F401
@@ -95,6 +95,7 @@ class ProjectBaseInfo(BaseModel):
 
 
 @router.get('/project/baseinfo', response_model=ProjectBaseInfo)
+@response_cache.cached('export.baseinfo', tags=('project', 'schemes', 'annotations'))
 async def get_export_baseinfo(
     permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read')),
 ) -> ProjectBaseInfo:
@@ -102,7 +103,7 @@ async def get_export_baseinfo(
     project_scopes = await get_project_scopes(project_id=permissions.permissions.project_id, db_engine=db_engine)
     project_bot_scopes = await get_project_bot_scopes(project_id=permissions.permissions.project_id, db_engine=db_engine)
     project_labels = await get_project_labels(project_id=permissions.permissions.project_id, db_engine=db_engine)
-    project = await read_project_by_id(project_id=permissions.permissions.project_id, engine=db_engine)
+    project = await read_project_cached(project_id=permissions.permissions.project_id)
 
     if project is None:
         raise RuntimeError('Invalid state!')
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 
 from server.data import db_engine
+from server.data.response_cache import response_cache
 from server.api.errors import NoDataForKeyError
 from server.util.security import UserPermissionChecker, InsufficientPermissions
 
@@ -18,6 +19,7 @@ router = APIRouter()
 
 
 @router.get('/project', response_model=list[HighlighterModel])
+@response_cache.cached('highlighters.project', tags=('highlighters',))
 async def get_project_highlighters(permissions: UserPermissions = Depends(UserPermissionChecker('annotations_read'))) -> list[HighlighterModel]:
     async with db_engine.session() as session:  # type: AsyncSession
         stmt = select(Highlighter).where(Highlighter.project_id == permissions.permissions.project_id)
@@ -43,6 +45,7 @@ async def upsert_highlighter(highlighter: HighlighterModel, permissions: UserPer
             session.add(new_highlighter)
 
         await session.commit()
+        await response_cache.bump(permissions.permissions.project_id, 'highlighters')
 
         return str(highlighter.highlighter_id)
 
@@ -4,11 +4,14 @@ from nacsos_data.db.schemas import Task
 from nacsos_data.db.schemas.imports import ImportRevision, Import
 from nacsos_data.models.imports import ImportModel, ImportRevisionModel
 from nacsos_data.db.crud.imports import read_import, upsert_import, delete_import, read_item_count_for_import
-from nacsos_data.models.pipeline import TaskModel
+from nacsos_data.models.pipeline import TaskModel, TaskStatus
 from sqlalchemy.ext.asyncio import AsyncSession  # noqa F401
 
-from server.pipelines import tasks
+from server.api.errors import TaskStillRunningError
 from server.data import db_engine
+from server.data.redis_client import get_redis
+from server.data.response_cache import response_cache
+from server.pipelines.checkpoints import ImportCheckpoint, drop_checkpoint, read_checkpoint
 from server.util.security import UserPermissionChecker, UserPermissions, InsufficientPermissions
 from server.util.logging import get_logger
 
@@ -27,6 +30,26 @@ class ImportRevisionDetails(ImportRevisionModel):
     task: TaskModel | None = None
 
 
+def _import_task_key(import_id: str) -> str:
+    return f'nacsos:imports:{import_id}:task'
+
+
+async def _ensure_not_running(import_id: str) -> None:
+    """
+    Raise if the last task of this import is still pending or running, two tasks must never write the same checkpoint.
+    """
+    task_id = await get_redis().get(_import_task_key(import_id))
+    checkpoint = read_checkpoint(import_id)
+    task_id = task_id.decode() if task_id is not None else (checkpoint.task_id if checkpoint is not None else None)
+    if task_id is None:
+        return
+    async with db_engine.session() as session:  # type: AsyncSession
+        task = await session.get(Task, task_id)
+    status = None if task is None else TaskStatus(task.status)
+    if status in {TaskStatus.PENDING, TaskStatus.RUNNING}:
+        raise TaskStillRunningError(f'Task {task_id} of this import is still {status.value.lower()}, wait for it to finish before starting it again.')  # type: ignore[union-attr]
+
+
 class ImportDetails(ImportModel):
     revisions: list[ImportRevisionModel]
 
@@ -126,6 +149,7 @@ async def put_import_details(
     if str(import_details.project_id) == str(permissions.permissions.project_id):
         logger.debug(import_details)
         key = await upsert_import(import_model=import_details, engine=db_engine, use_commit=True)
+        await response_cache.bump(permissions.permissions.project_id, 'imports')
         return str(key)
 
     raise InsufficientPermissions('You do not have permission to edit this data import.')
@@ -138,12 +162,60 @@ async def trigger_import(
 ) -> None:
     import_details = await read_import(import_id=import_id, engine=db_engine)
     if import_details is not None and str(import_details.project_id) == str(permissions.permissions.project_id):
-        tasks.imports.import_task.send(
+        await _ensure_not_running(import_id)
+
+        # the broker (and all actors) are only set up once the first task is sent
+        from server.pipelines import tasks
+
+        message = tasks.imports.import_task.send(
             project_id=str(import_details.project_id),  # type: ignore[call-arg]
             user_id=str(permissions.user.user_id),
             comment=f'Import for "{import_details.name}" ({import_id})',
             import_id=import_id,
         )
+        await get_redis().set(_import_task_key(import_id), message.options['nacsos_task_id'], ex=7 * 24 * 60 * 60)
+    else:
+        raise InsufficientPermissions('You do not have permission to edit this data import.')
+
+
+@router.get('/import/{import_id}/checkpoint', response_model=ImportCheckpoint | None)
+async def get_import_checkpoint(
+    import_id: str,
+    permissions: UserPermissions = Depends(UserPermissionChecker('imports_read')),
+) -> ImportCheckpoint | None:
+    """
+    Progress of the last unfinished (OpenAlex Solr) import, if there is one to resume.
+    """
+    import_details = await read_import(import_id=import_id, engine=db_engine)
+    if import_details is not None and str(import_details.project_id) == str(permissions.permissions.project_id):
+        return read_checkpoint(import_id)
+    raise InsufficientPermissions('You do not have permission to read this data import.')
+
+
+@router.post('/import/{import_id}/resume')
+async def resume_import(
+    import_id: str,
+    permissions: UserPermissions = Depends(UserPermissionChecker('imports_edit')),
+) -> None:
+    """
+    Run the import again, continuing from its last checkpoint (if any) instead of starting from the beginning.
+    Rejected while the last task of this import is still pending or running (as is `trigger_import()`).
+    """
+    import_details = await read_import(import_id=import_id, engine=db_engine)
+    if import_details is not None and str(import_details.project_id) == str(permissions.permissions.project_id):
+        await _ensure_not_running(import_id)
+
+        # the broker (and all actors) are only set up once the first task is sent
+        from server.pipelines import tasks
+
+        message = tasks.imports.import_task.send(
+            project_id=str(import_details.project_id),  # type: ignore[call-arg]
+            user_id=str(permissions.user.user_id),
+            comment=f'Resumed import for "{import_details.name}" ({import_id})',
+            import_id=import_id,
+            resume=True,
+        )
+        await get_redis().set(_import_task_key(import_id), message.options['nacsos_task_id'], ex=7 * 24 * 60 * 60)
     else:
         raise InsufficientPermissions('You do not have permission to edit this data import.')
 
@@ -158,6 +230,8 @@ async def delete_import_details(
     # First, make sure the user trying to delete this import is actually authorised to delete this specific import
     if import_details is not None and str(import_details.project_id) == str(permissions.permissions.project_id):
         await delete_import(import_id=import_id, engine=db_engine, use_commit=True)
+        drop_checkpoint(import_id)
+        await response_cache.bump(permissions.permissions.project_id, 'imports', 'items', 'annotations')
         return str(import_id)
 
     raise InsufficientPermissions('You do not have permission to delete this data import.')
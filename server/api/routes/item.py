@@ -16,6 +16,7 @@ from server.models import ImportM2M
 from server.util.security import UserPermissionChecker
 from server.util.logging import get_logger
 from server.data import db_engine
+from server.data.response_cache import response_cache
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession  # noqa F401
@@ -79,3 +80,4 @@ async def update_item_info(item: AcademicItemModel, permissions: UserPermissions
         orm.time_edited = datetime.datetime.now()
 
         await session.commit()
+    await response_cache.bump(permissions.permissions.project_id, 'items')
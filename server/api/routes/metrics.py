@@ -0,0 +1,54 @@
+import hmac
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse, FileResponse
+from nacsos_data.models.users import UserModel
+
+from server.util.files import MissingFileError
+from server.util.config import settings
+from server.util.metrics import metrics
+from server.util.security import get_current_active_superuser, get_current_active_user, get_current_user, oauth2_scheme
+from server.util.logging import get_logger
+
+logger = get_logger('nacsos.api.route.metrics')
+router = APIRouter()
+
+logger.debug('Setup nacsos.api.route.metrics router')
+
+
+async def metrics_access(token: str | None = Depends(oauth2_scheme)) -> None:
+    """
+    Scrapers authenticate with `SERVER.METRICS_TOKEN` as bearer token, everyone else has to be a superuser.
+    """
+    if token and settings.SERVER.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.SERVER.METRICS_TOKEN.encode()):
+        return
+    get_current_active_superuser(await get_current_active_user(await get_current_user(token)))  # type: ignore[arg-type]
+
+
+@router.get('', response_class=PlainTextResponse, dependencies=[Depends(metrics_access)])
+async def get_metrics() -> PlainTextResponse:
+    """
+    Per-route request metrics of all worker processes (`worker` label) in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(metrics.render(await metrics.collect()), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@router.get('/profiles', response_model=list[str])
+def list_profiles(superuser: UserModel = Depends(get_current_active_superuser)) -> list[str]:
+    """
+    Request profiles recorded via the `X-Profile` header or `_profile` query flag, most recent first.
+    """
+    if not settings.PIPES.profiles_dir.exists():
+        return []
+    return sorted((file.name for file in settings.PIPES.profiles_dir.glob('profile_*.collapsed')), reverse=True)
+
+
+@router.get('/profiles/{filename}', response_class=FileResponse)
+def get_profile(filename: str, superuser: UserModel = Depends(get_current_active_superuser)) -> FileResponse:
+    """
+    Collapsed stacks of a recorded profile, e.g. to be rendered with flamegraph.pl or speedscope.
+    """
+    path = (settings.PIPES.profiles_dir / filename).resolve()
+    if path.parent != settings.PIPES.profiles_dir or not path.is_file():
+        raise MissingFileError(f'No profile named {filename}')
+    return FileResponse(path, media_type='text/plain')
@@ -4,7 +4,6 @@ from fastapi.responses import PlainTextResponse
 from sqlalchemy import select, func as F
 from nacsos_data.db.schemas.projects import Project
 
-from server.pipelines import tasks
 from server.util.logging import get_logger
 from server.util.security import InsufficientPermissions
 from server.data import db_engine
@@ -17,6 +16,8 @@ logger.debug('Setup nacsos.api.route.ping router')
 
 @router.get('/tracked-sleep-task')
 async def tracked_task(sleep_time: int = 10) -> None:
+    from server.pipelines import tasks
+
     tasks.sleepy.tracked_sleep_task.send(
         sleep_time=sleep_time,  # type: ignore[call-arg]
         project_id='86a4d535-0311-41f7-a934-e4ab0a465a68',
@@ -26,6 +27,8 @@ async def tracked_task(sleep_time: int = 10) -> None:
 
 @router.get('/sleep-task')
 async def task(sleep_time: int = 10) -> None:
+    from server.pipelines import tasks
+
     tasks.sleepy.sleep_task.send(sleep_time=sleep_time)
 
 
@@ -2,16 +2,16 @@ import re
 import unicodedata
 from shutil import rmtree
 from typing import AsyncGenerator, Annotated
-from uuid import uuid4
+from uuid import uuid4, UUID
 from pathlib import Path
 
 from nacsos_data.db.crud.pipeline import query_tasks
+from nacsos_data.db.schemas import Task
 from nacsos_data.models.pipeline import TaskModel, TaskStatus
 from nacsos_data.models.users import UserModel
 from typing_extensions import TypedDict
 
 import aiofiles
-from dramatiq_abort import abort
 from fastapi import APIRouter, UploadFile, Depends, Query
 from fastapi.responses import FileResponse
 from starlette.responses import StreamingResponse
@@ -19,10 +19,12 @@ from nacsos_data.util.auth import UserPermissions
 from pydantic import StringConstraints
 from tempfile import TemporaryDirectory
 
-from server.util.files import delete_directory, zip_folder, get_outputs_flat
+from server.api.errors import TaskNotFoundError
+from server.util.files import PREVIEW_MAX_ROWS, TablePreview, delete_directory, zip_folder, get_outputs_flat, read_table_preview, resolve_file
 from server.util.security import UserPermissionChecker, get_current_active_superuser
 from server.util.logging import get_logger
 from server.util.config import settings
+from server.util.profiling import request_task_profile
 from server.data import db_engine
 
 from server.pipelines.security import UserTaskPermissionChecker, UserTaskProjectPermissions
@@ -76,7 +78,26 @@ def get_file(
     filename: str,
     permissions: UserTaskProjectPermissions = Depends(UserTaskPermissionChecker('artefacts_read')),
 ) -> FileResponse:
-    return FileResponse(settings.PIPES.target_dir / filename)
+    """
+    Raw artefact; `Range` (and `If-Range`) requests are answered with partial content,
+    so large files can be fetched in chunks or resumed.
+    """
+    root = settings.PIPES.target_dir / str(permissions.task.task_id)
+    return FileResponse(resolve_file(root, filename, base=settings.PIPES.target_dir))
+
+
+@router.get('/artefacts/preview', response_model=TablePreview)
+def get_file_preview(
+    filename: str,
+    limit: int = Query(20, ge=1, le=PREVIEW_MAX_ROWS),
+    columns: list[str] | None = Query(None),
+    permissions: UserTaskProjectPermissions = Depends(UserTaskPermissionChecker('artefacts_read')),
+) -> TablePreview:
+    """
+    First rows (and optionally only some columns) of a CSV or Parquet artefact, read without loading the full file.
+    """
+    root = settings.PIPES.target_dir / str(permissions.task.task_id)
+    return read_table_preview(resolve_file(root, filename, base=settings.PIPES.target_dir), limit=limit, columns=columns)
 
 
 async def tmp_path() -> AsyncGenerator[Path, None]:
@@ -197,9 +218,30 @@ async def terminate_task(
     message_id: str = Query(),
     superuser: UserModel = Depends(get_current_active_superuser),
 ) -> None:
+    from dramatiq_abort import abort
+
     abort(message_id)
 
 
+@router.post('/dramatiq/task/profile')
+async def profile_task(
+    task_id: UUID = Query(),
+    seconds: float | None = Query(default=None, gt=0),
+    superuser: UserModel = Depends(get_current_active_superuser),
+) -> None:
+    """
+    Attach the sampling profiler to a running (or pending) task.
+    The collapsed stacks end up as `profile_*.collapsed` in the artefacts of the task.
+
+    :param task_id: task to profile
+    :param seconds: how long to profile for; until the task finishes if not set
+    """
+    async with db_engine.session() as session:
+        if await session.get(Task, str(task_id)) is None:
+            raise TaskNotFoundError(f'No task found for id {task_id}')
+    request_task_profile(task_id=task_id, seconds=seconds)
+
+
 # @router.get('/dramatiq/workers')
 # async def get_d_workers() -> list[Any]:
 #     from server.pipelines.tasks import broker
@@ -1,23 +1,24 @@
+import json
+import hashlib
 from typing import Any, TYPE_CHECKING, TypedDict
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select, delete, text
 from sqlalchemy.dialects import postgresql as psa
-import numpy as np
 
 from nacsos_data.db.schemas.priority import Priority
 from nacsos_data.models.priority import PriorityModel, DehydratedPriorityModel
-from nacsos_data.util.annotations.export import wide_export_table
-from nacsos_data.util.priority.mask import get_inclusion_mask
 
 from fastapi.responses import FileResponse
 
 from nacsos_data.util.nql import NQLFilter
+from server.util.cache import TTLCache
 from server.util.config import settings
-from server.util.files import get_outputs_flat
+from server.util.files import PREVIEW_MAX_ROWS, TablePreview, get_outputs_flat, read_table_preview, resolve_file
 from server.util.security import UserPermissionChecker, UserPermissions, UserPriorityPermissions, UserPriorityPermissionChecker
 from server.util.logging import get_logger
 from server.data import db_engine
+from server.data.response_cache import response_cache
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession  # noqa: F401
@@ -37,16 +38,50 @@ class PrioTableParams(BaseModel):
     limit: int = 20
 
 
+# Wide export frames of recent previews, so that changing the inclusion rule only re-evaluates the mask
+frame_cache: TTLCache[str, tuple[list[str], 'pd.DataFrame']] = TTLCache(
+    ttl=settings.SERVER.PRIORITY_FRAME_CACHE_TTL,
+    maxsize=settings.SERVER.PRIORITY_FRAME_CACHE_SIZE,
+)
+
+
+async def _frame_key(project_id: str, scope_ids: list[str], query: NQLFilter | None, limit: int | None) -> str | None:
+    """
+    Cache key of a wide export frame; it includes the data version of the project, so new items or labels lead to a fresh frame.
+    """
+    try:
+        versions = await response_cache.get_versions(project_id, ('items', 'annotations'))
+    except Exception as e:
+        logger.warning(f'Data version unavailable, not caching export frame: {e}')
+        return None
+    params = {'scope_ids': scope_ids, 'query': None if query is None else query.model_dump(mode='json'), 'limit': limit, 'versions': versions}
+    return f'{project_id}:{hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()}'
+
+
+async def _get_frame(project_id: str, scope_ids: list[str], query: NQLFilter | None = None, limit: int | None = 20) -> tuple[list[str], 'pd.DataFrame']:
+    # pandas-backed, only imported on first use to keep startup fast
+    from nacsos_data.util.annotations.export import wide_export_table
+
+    key = await _frame_key(project_id=project_id, scope_ids=scope_ids, query=query, limit=limit)
+    if key is not None and (cached := frame_cache.get(key)) is not None:
+        return cached
+
+    async with db_engine.session() as session:  # type: AsyncSession
+        base_cols, label_cols, df = await wide_export_table(session=session, project_id=project_id, nql_filter=query, scope_ids=scope_ids, limit=limit)
+    if key is not None:
+        frame_cache.set(key, (label_cols, df))
+    return label_cols, df
+
+
 async def _get_df(
     project_id: str, scope_ids: list[str], incl: str, query: NQLFilter | None = None, limit: int | None = 20
 ) -> tuple[int, int, int, 'pd.DataFrame']:
-    async with db_engine.session() as session:  # type: AsyncSession
-        base_cols, label_cols, df = await wide_export_table(session=session, project_id=project_id, nql_filter=query, scope_ids=scope_ids, limit=limit)
-        try:
-            df['incl'] = get_inclusion_mask(rule=incl, df=df, label_cols=label_cols)
-        except KeyError:
-            df['incl'] = 'ERROR'
-        return df.shape[0], (df['incl'] == True).sum(), (df['incl'] == False).sum(), df  # noqa: E712
+    from server.util.inclusion import inclusion_mask
+
+    label_cols, df = await _get_frame(project_id=project_id, scope_ids=scope_ids, query=query, limit=limit)
+    # the cached frame is shared, so never add columns to it in place
+    df = df.assign(incl=inclusion_mask(rule=incl, df=df, label_cols=label_cols))
+    return df.shape[0], (df['incl'] == True).sum(), (df['incl'] == False).sum(), df  # noqa: E712
 
 
 @router.post('/table/peek/html', response_model=str)
@@ -54,6 +89,8 @@ async def get_table_sample_html(params: PrioTableParams, permissions: UserPermis
     _, _, _, df = await _get_df(
         project_id=str(permissions.permissions.project_id), scope_ids=params.scope_ids, incl=params.incl, query=params.query, limit=min(params.limit, 500)
     )
+    import numpy as np
+
     return df.drop(columns=['text']).replace({np.nan: None}).replace({None: np.nan}).to_html(na_rep='')
 
 
@@ -138,4 +175,64 @@ def get_artefacts(permissions: UserPriorityPermissions = Depends(UserPriorityPer
 
 @router.get('/artefacts/file', response_class=FileResponse)
 def get_file(filename: str, permissions: UserPriorityPermissions = Depends(UserPriorityPermissionChecker('artefacts_read'))) -> FileResponse:
-    return FileResponse(settings.PIPES.priority_dir / filename)
+    """
+    Raw artefact; `Range` (and `If-Range`) requests are answered with partial content,
+    so large files can be fetched in chunks or resumed.
+    """
+    root = settings.PIPES.priority_dir / str(permissions.priority.priority_id)
+    return FileResponse(resolve_file(root, filename, base=settings.PIPES.priority_dir))
+
+
+@router.get('/artefacts/preview', response_model=TablePreview)
+def get_file_preview(
+    filename: str,
+    limit: int = Query(20, ge=1, le=PREVIEW_MAX_ROWS),
+    columns: list[str] | None = Query(None),
+    permissions: UserPriorityPermissions = Depends(UserPriorityPermissionChecker('artefacts_read')),
+) -> TablePreview:
+    """
+    First rows (and optionally only some columns) of a CSV or Parquet artefact, read without loading the full file.
+    """
+    root = settings.PIPES.priority_dir / str(permissions.priority.priority_id)
+    return read_table_preview(resolve_file(root, filename, base=settings.PIPES.priority_dir), limit=limit, columns=columns)
+
+
+class PriorityTrainingParams(BaseModel):
+    scope_ids: list[str]
+
+    incl: str = 'incl:1'
+    # Items to rank (unlabelled ones only), all items of the project if not set
+    query: NQLFilter | None = None
+
+    n_predictions: int = 1000
+
+
+@router.post('/train', response_model=str)
+async def train_priority_model(
+    params: PriorityTrainingParams,
+    permissions: UserPriorityPermissions = Depends(UserPriorityPermissionChecker('annotations_prio')),
+) -> str:
+    """
+    Queues the training of a prioritisation model in a pipeline worker and returns the task id.
+    Once done, `prioritised_ids` of the setup are updated and model, metrics, and scores are listed as artefacts.
+    """
+    from server.util.inclusion import compile_rule
+
+    # fail early on rules that can never be evaluated
+    compile_rule(params.incl)
+
+    # the broker (and all actors) are only set up once the first task is sent
+    from server.pipelines import tasks
+
+    priority_id = str(permissions.priority.priority_id)
+    message = tasks.priority.train_priority_task.send(
+        project_id=str(permissions.permissions.project_id),  # type: ignore[call-arg]
+        user_id=str(permissions.user.user_id),
+        comment=f'Prioritisation model for "{permissions.priority.name}" ({priority_id})',
+        priority_id=priority_id,
+        scope_ids=params.scope_ids,
+        incl=params.incl,
+        query=None if params.query is None else params.query.model_dump(mode='json'),
+        n_predictions=params.n_predictions,
+    )
+    return str(message.options['nacsos_task_id'])
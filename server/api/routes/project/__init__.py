@@ -10,6 +10,8 @@ from nacsos_data.db.crud.projects import read_project_by_id
 from nacsos_data.util.auth import UserPermissions
 
 from server.data import db_engine
+from server.data.projects import invalidate_project
+from server.data.response_cache import response_cache
 from server.util.security import UserPermissionChecker
 from server.util.logging import get_logger
 
@@ -43,6 +45,8 @@ async def save_project(
     pkey = await upsert_orm(
         upsert_model=project_info, Schema=Project, primary_key='project_id', skip_update=['project_id'], db_engine=db_engine, use_commit=True
     )
+    invalidate_project(pkey)
+    await response_cache.bump(pkey, 'project')
     return str(pkey)
 
 
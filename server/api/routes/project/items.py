@@ -1,9 +1,16 @@
+import uuid
+import zlib
+from typing import AsyncGenerator, Any
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pydantic import BaseModel, Field
+from starlette.responses import StreamingResponse
 from nacsos_data.db.crud.items.lexis_nexis import read_lexis_paged_for_project
-from nacsos_data.db.schemas import Project, ItemTypeLiteral, GenericItem, AcademicItem, ItemType, Item, LexisNexisItem
-from nacsos_data.models.items import AnyItemModel, GenericItemModel, AcademicItemModel, AnyItemModelList, LexisNexisItemModel
+from nacsos_data.db.schemas import ItemTypeLiteral, GenericItem, AcademicItem, ItemType, Item, LexisNexisItem, LexisNexisItemSource, TwitterItem
+from nacsos_data.models.items import AnyItemModel, GenericItemModel, AcademicItemModel, AnyItemModelList, LexisNexisItemModel, FullLexisNexisItemModel
+from nacsos_data.models.items.lexis_nexis import LexisNexisItemSourceModel
 from nacsos_data.models.items.twitter import TwitterItemModel
-from nacsos_data.db.crud.items import read_item_count_for_project, read_all_for_project, read_paged_for_project, read_any_item_by_item_id
+from nacsos_data.db.crud.items import read_item_count_for_project, read_paged_for_project, read_any_item_by_item_id
 from nacsos_data.db.crud.items.twitter import (
     read_all_twitter_items_for_project,
     read_all_twitter_items_for_project_paged,
@@ -11,11 +18,15 @@ from nacsos_data.db.crud.items.twitter import (
     import_tweet,
 )
 from nacsos_data.util.auth import UserPermissions
-from sqlalchemy import select
+from sqlalchemy import select, any_, bindparam, inspect
+from sqlalchemy.dialects import postgresql as psa
 
-from server.api.errors import ItemNotFoundError
+from server.api.errors import ItemNotFoundError, ProjectNotFoundError
 from server.data import db_engine
+from server.data.projects import read_project_type
+from server.data.response_cache import response_cache
 from server.util.security import UserPermissionChecker
+from server.util.fastjson import rows_response
 from server.util.logging import get_logger
 
 logger = get_logger('nacsos.api.route.data')
@@ -23,24 +34,118 @@ router = APIRouter()
 
 logger.info('Setting up data route')
 
+# Maximum number of items that can be requested in one batch
+MAX_BATCH_SIZE = 500
+
+
+async def get_project_type(project_id: str) -> ItemType:
+    item_type = await read_project_type(project_id)
+    if item_type is None:
+        raise ProjectNotFoundError(f'No project found in the database for id {project_id}')
+    return item_type
+
+
+def ids_param(item_ids: list[str] | list[uuid.UUID]) -> Any:
+    # single array parameter (`= ANY(:item_ids)`) instead of an expanding `IN (...)` list
+    return any_(bindparam('item_ids', value=[str(item_id) for item_id in item_ids], type_=psa.ARRAY(psa.UUID(as_uuid=False))))
+
+
+# Item types whose models map 1:1 onto their table columns, so rows can be serialised without building models
+FLAT_ITEM_SCHEMAS: dict[str, tuple[Any, Any]] = {
+    'generic': (GenericItemModel, GenericItem),
+    'academic': (AcademicItemModel, AcademicItem),
+    'lexis': (LexisNexisItemModel, LexisNexisItem),
+}
+
+
+async def read_item_rows(Schema: Any, project_id: str) -> list[Any]:
+    """
+    Read all items of a project as plain row mappings (keyed by attribute name) instead of ORM instances.
+    """
+    columns = [getattr(Schema, attr.key) for attr in inspect(Schema).column_attrs]
+    async with db_engine.session() as session:
+        result = await session.execute(select(*columns).where(Schema.project_id == project_id))
+        return list(result.mappings().all())
+
 
 @router.get('/{item_type}/list', response_model=AnyItemModelList)
 async def list_project_data(
     item_type: ItemTypeLiteral,
     permission: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
-) -> AnyItemModelList:
+) -> Any:
+    """
+    Rows of generic, academic, and lexis projects are serialised straight from the database result,
+    skipping model construction and FastAPI's re-validation of the `response_model`.
+    """
     project_id = permission.permissions.project_id
-    if item_type == 'generic':
-        return await read_all_for_project(Model=GenericItemModel, Schema=GenericItem, project_id=project_id, engine=db_engine)
-    if item_type == 'academic':
-        return await read_all_for_project(Model=AcademicItemModel, Schema=AcademicItem, project_id=project_id, engine=db_engine)
-    if item_type == 'lexis':
-        return await read_all_for_project(Model=LexisNexisItemModel, Schema=LexisNexisItem, project_id=project_id, engine=db_engine)
+    if item_type in FLAT_ITEM_SCHEMAS:
+        Model, Schema = FLAT_ITEM_SCHEMAS[item_type]
+        return rows_response(Model, await read_item_rows(Schema=Schema, project_id=str(project_id)))
     if item_type == 'twitter':
         return await read_all_twitter_items_for_project(project_id=project_id, engine=db_engine)
     raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f'Data listing for {item_type} not implemented (yet).')
 
 
+# Item types that can be read row-by-row as (Model, Schema)
+ITEM_SCHEMAS: dict[str, tuple[Any, Any]] = {
+    'generic': (GenericItemModel, GenericItem),
+    'academic': (AcademicItemModel, AcademicItem),
+    'lexis': (LexisNexisItemModel, LexisNexisItem),
+    'twitter': (TwitterItemModel, TwitterItem),
+}
+
+
+async def stream_items_ndjson(item_type: str, project_id: str, batch_size: int = 2000) -> AsyncGenerator[bytes, None]:
+    """
+    Stream all items of a project as newline-delimited JSON.
+    Rows are fetched through a server-side cursor (`yield_per`) and serialised one partition at a time,
+    so memory usage stays flat regardless of the size of the project.
+    """
+    Model, Schema = ITEM_SCHEMAS[item_type]
+    stmt = select(Schema).where(Schema.project_id == project_id).execution_options(yield_per=batch_size)
+
+    async with db_engine.session() as session:
+        result = await session.stream_scalars(stmt)
+        async for partition in result.partitions():
+            yield ''.join(Model.model_validate(row.__dict__).model_dump_json() + '\n' for row in partition).encode()
+            # release ORM instances of this batch
+            session.expunge_all()
+
+
+async def gzip_chunks(chunks: AsyncGenerator[bytes, None], level: int = 6) -> AsyncGenerator[bytes, None]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get('/{item_type}/stream', response_class=StreamingResponse)
+async def stream_project_data(
+    item_type: ItemTypeLiteral,
+    gzip: bool = Query(default=False),
+    batch_size: int = Query(default=2000, ge=1, le=20000),
+    permission: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
+) -> StreamingResponse:
+    """
+    Memory-friendly alternative to `/{item_type}/list` for large projects.
+    Returns one JSON-encoded item per line (NDJSON); set `gzip` to receive a gzip-compressed `.ndjson.gz` file instead.
+    """
+    if item_type not in ITEM_SCHEMAS:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f'Data streaming for {item_type} not implemented (yet).')
+
+    project_id = str(permission.permissions.project_id)
+    chunks = stream_items_ndjson(item_type=item_type, project_id=project_id, batch_size=batch_size)
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename="{project_id}_{item_type}.ndjson.gz"'},
+        )
+    return StreamingResponse(chunks, media_type='application/x-ndjson', headers={'X-Content-Type-Options': 'nosniff'})
+
+
 @router.get('/{item_type}/list/{page}/{page_size}', response_model=AnyItemModelList)
 async def list_project_data_paged(
     item_type: ItemTypeLiteral,
@@ -69,10 +174,7 @@ async def get_detail_for_item(
     permission: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
 ) -> AnyItemModel:
     if item_type is None:
-        async with db_engine.session() as session:
-            project: Project | None = await session.get(Project, permission.permissions.project_id)
-            assert project is not None
-            item_type = project.type
+        item_type = await get_project_type(str(permission.permissions.project_id))
 
     result: AnyItemModel | None = None
     if item_type == 'generic':
@@ -104,6 +206,83 @@ async def get_text_for_item(
         return text
 
 
+async def read_lexis_items(item_ids: list[str] | list[uuid.UUID], project_id: str) -> dict[str, AnyItemModel]:
+    """
+    Lexis items with all their sources, in one query (items joined with sources) instead of one per item.
+    """
+    async with db_engine.session() as session:
+        stmt = (
+            select(LexisNexisItem, LexisNexisItemSource)
+            .outerjoin(LexisNexisItemSource, LexisNexisItemSource.item_id == LexisNexisItem.item_id)
+            .where(LexisNexisItem.item_id == ids_param(item_ids), LexisNexisItem.project_id == project_id)
+        )
+        items: dict[str, tuple[Any, list[LexisNexisItemSourceModel]]] = {}
+        for item, source in (await session.execute(stmt)).tuples():
+            _, sources = items.setdefault(str(item.item_id), (item, []))
+            if source is not None:
+                sources.append(LexisNexisItemSourceModel.model_validate(source.__dict__))
+        return {
+            item_id: FullLexisNexisItemModel(**LexisNexisItemModel.model_validate(item.__dict__).model_dump(), sources=sources)
+            for item_id, (item, sources) in items.items()
+        }
+
+
+class ItemBatchRequest(BaseModel):
+    item_ids: list[uuid.UUID] = Field(max_length=MAX_BATCH_SIZE)
+    item_type: ItemTypeLiteral | None = None
+
+
+@router.post('/detail-batch', response_model=dict[str, AnyItemModel])
+async def get_details_for_items(
+    batch: ItemBatchRequest,
+    permission: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
+) -> dict[str, AnyItemModel]:
+    """
+    Batched version of `/detail/{item_id}`.
+    Items that do not exist (or are not part of this project) are omitted from the result.
+
+    :return: dictionary of item details keyed by `item_id`
+    """
+    project_id = str(permission.permissions.project_id)
+    item_type = batch.item_type
+    if item_type is None:
+        item_type = await get_project_type(project_id)
+
+    if len(batch.item_ids) == 0:
+        return {}
+
+    if item_type == 'lexis':
+        return await read_lexis_items(item_ids=batch.item_ids, project_id=project_id)
+
+    if item_type not in ITEM_SCHEMAS:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f'Batch detail getter for {item_type} not implemented (yet).')
+
+    Model, Schema = ITEM_SCHEMAS[item_type]
+    async with db_engine.session() as session:
+        stmt = select(Schema).where(Schema.item_id == ids_param(batch.item_ids), Schema.project_id == project_id)
+        rslt = (await session.scalars(stmt)).all()
+        return {str(row.item_id): Model.model_validate(row.__dict__) for row in rslt}
+
+
+@router.post('/text-batch', response_model=dict[str, str | None])
+async def get_texts_for_items(
+    batch: ItemBatchRequest,
+    permission: UserPermissions = Depends(UserPermissionChecker('dataset_read')),
+) -> dict[str, str | None]:
+    """
+    Batched version of `/text/{item_id}`.
+
+    :return: dictionary of item texts keyed by `item_id`
+    """
+    if len(batch.item_ids) == 0:
+        return {}
+
+    async with db_engine.session() as session:
+        stmt = select(Item.item_id, Item.text).where(Item.item_id == ids_param(batch.item_ids), Item.project_id == permission.permissions.project_id)
+        rslt = (await session.execute(stmt)).mappings().all()
+        return {str(row['item_id']): row['text'] for row in rslt}
+
+
 @router.get('/count', response_model=int)
 async def count_project_items(permission: UserPermissions = Depends(UserPermissionChecker('dataset_read'))) -> int:
     tweets = await read_item_count_for_project(project_id=permission.permissions.project_id, engine=db_engine)
@@ -116,4 +295,6 @@ async def add_tweet(
     import_id: str | None = None,
     permission: UserPermissions = Depends(UserPermissionChecker('dataset_edit')),
 ) -> TwitterItemModel:
-    return await import_tweet(tweet=tweet, project_id=permission.permissions.project_id, import_id=import_id, engine=db_engine)
+    result = await import_tweet(tweet=tweet, project_id=permission.permissions.project_id, import_id=import_id, engine=db_engine)
+    await response_cache.bump(permission.permissions.project_id, 'items')
+    return result
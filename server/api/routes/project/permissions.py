@@ -8,7 +8,8 @@ from nacsos_data.models.projects import ProjectPermissionsModel
 from nacsos_data.db.schemas import ProjectPermissions
 from nacsos_data.db.crud.projects import read_project_permissions_for_project, read_project_permissions_by_id, delete_project_permissions
 from server.data import db_engine
-from server.util.security import UserPermissionChecker, UserPermissions, InsufficientPermissions
+from server.data.response_cache import response_cache
+from server.util.security import UserPermissionChecker, UserPermissions, InsufficientPermissions, invalidate_project_permissions
 from server.util.logging import get_logger
 
 logger = get_logger('nacsos.api.route.project')
@@ -85,6 +86,8 @@ async def save_project_permission(
 
                 # Save
                 await session.commit()
+                await invalidate_project_permissions(existing_perms.project_id)
+                await response_cache.bump(existing_perms.project_id, 'project')
                 return str(project_permission.project_permission_id)
 
         # Create new permission
@@ -99,6 +102,8 @@ async def save_project_permission(
         pp_orm = ProjectPermissions(**project_permission.model_dump())
         session.add(pp_orm)
         await session.commit()
+        await invalidate_project_permissions(project_permission.project_id)
+        await response_cache.bump(project_permission.project_id, 'project')
 
         new_id = str(project_permission.project_permission_id)
 
@@ -111,6 +116,8 @@ async def remove_project_permission(
     permission: UserPermissions = Depends(UserPermissionChecker('owner')),
 ) -> None:
     await delete_project_permissions(project_permission_id=project_permission_id, engine=db_engine)
+    await invalidate_project_permissions(permission.permissions.project_id)
+    await response_cache.bump(permission.permissions.project_id, 'project')
 
 
 @router.get('/{project_permission_id}', response_model=ProjectPermissionsModel)
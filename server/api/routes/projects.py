@@ -10,7 +10,9 @@ from sqlalchemy import select, func, text
 
 from server.api.errors import MissingInformationError
 from server.data import db_engine
+from server.data.projects import invalidate_project
 from server.util.security import get_current_active_user, get_current_active_superuser
+from server.util.conditional import conditional
 from server.util.logging import get_logger
 
 if TYPE_CHECKING:
@@ -27,6 +29,7 @@ class ProjectInfo(ProjectModel):
 
 
 @router.get('/list', response_model=list[ProjectInfo])
+@conditional
 async def get_all_projects(current_user: UserModel = Depends(get_current_active_user)) -> list[ProjectInfo]:
     """
     This endpoint returns all projects the currently logged-in user can see.
@@ -73,4 +76,5 @@ async def create_project(project: ProjectModel, superuser: UserModel = Depends(g
             project.project_id = str(uuid.uuid4())
         session.add(Project(**project.model_dump()))
         await session.commit()
+        invalidate_project(project.project_id)
         return str(project.project_id)
@@ -1,6 +1,5 @@
 from typing import Any
 
-import httpx
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, Body
 from sqlalchemy import text
@@ -77,6 +76,8 @@ async def term_expansion(term_prefix: str, limit: int = 20, permissions: UserPer
         f'&useParams='
     )
 
+    import httpx
+
     async with httpx.AsyncClient() as client:
         response = await client.get(url)
         terms = response.json()['terms']['title_abstract']
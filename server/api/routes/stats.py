@@ -15,7 +15,6 @@ from nacsos_data.db.schemas import (
     AssignmentScope,
     Annotation,
     User,
-    Project,
     ItemType,
     AcademicItem,
     TwitterItem,
@@ -30,6 +29,8 @@ from server.api.errors import ProjectNotFoundError
 from server.util.security import UserPermissionChecker
 from server.util.logging import get_logger
 from server.data import db_engine
+from server.data.projects import read_project_type
+from server.data.response_cache import response_cache
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession  # noqa F401
@@ -50,6 +51,7 @@ class BasicProjectStats(BaseModel):
 
 
 @router.get('/basics', response_model=BasicProjectStats)
+@response_cache.cached('stats.basics', tags=('items', 'imports', 'schemes', 'annotations'))
 async def get_basic_stats(permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read'))) -> BasicProjectStats:
     project_id = permissions.permissions.project_id
 
@@ -105,6 +107,7 @@ class RankEntry(BaseModel):
 
 
 @router.get('/rank', response_model=list[RankEntry])
+@response_cache.cached('stats.rank', tags=('project', 'annotations'))
 async def get_annotator_ranking(permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read'))) -> list[RankEntry]:
     project_id = permissions.permissions.project_id
 
@@ -136,6 +139,7 @@ class HistogramEntry(BaseModel):
 
 
 @router.get('/histogram/years', response_model=list[HistogramEntry])
+@response_cache.cached('stats.histogram', tags=('items',))
 async def get_publication_year_histogram(
     from_year: int = Query(default=1990), to_year: int = Query(default=2025), permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read'))
 ) -> list[HistogramEntry]:
@@ -143,21 +147,20 @@ async def get_publication_year_histogram(
     from_date = datetime.datetime(year=from_year, month=1, day=1, hour=0, minute=0, second=0)
     to_date = datetime.datetime(year=to_year, month=12, day=31, hour=23, minute=59, second=59)
 
-    async with db_engine.session() as session:  # type: AsyncSession
-        project = await session.get(Project, project_id)
-
-        if project is None:
-            raise ProjectNotFoundError('This error should never happen.')
+    item_type = await read_project_type(project_id)
+    if item_type is None:
+        raise ProjectNotFoundError('This error should never happen.')
 
-        if project.type == ItemType.academic:
+    async with db_engine.session() as session:  # type: AsyncSession
+        if item_type == ItemType.academic:
             alias = 'itm'
             from_stmt = f'{AcademicItem.__tablename__} itm'
             column = f'make_timestamp(itm.{AcademicItem.publication_year.name},2,2,2,2,2)'
-        elif project.type == ItemType.twitter:
+        elif item_type == ItemType.twitter:
             alias = 'itm'
             from_stmt = f'{TwitterItem.__tablename__} itm'
             column = TwitterItem.created_at.name
-        elif project.type == ItemType.lexis:
+        elif item_type == ItemType.lexis:
             alias = 'jn'
             from_stmt = f'{LexisNexisItemSource.__tablename__} itm LEFT JOIN {LexisNexisItem.__tablename__} jn ON itm.item_id = jn.item_id'
             column = f'itm.{LexisNexisItemSource.published_at.name}'
@@ -192,6 +195,7 @@ class LabelCount(BaseModel):
 
 
 @router.post('/labels/human', response_model=list[LabelCount])
+@response_cache.cached('stats.labels.human', tags=('items', 'annotations'))
 async def label_stats_raw(
     query: NQLFilter | None = Body(default=None), permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read'))
 ) -> list[LabelCount]:
@@ -223,6 +227,7 @@ async def label_stats_raw(
 
 
 @router.post('/labels/resolved', response_model=list[LabelCount])
+@response_cache.cached('stats.labels.resolved', tags=('items', 'annotations'))
 async def label_stats_res(
     query: NQLFilter | None = Body(default=None), permissions: UserPermissions = Depends(UserPermissionChecker('dataset_read'))
 ) -> list[LabelCount]:
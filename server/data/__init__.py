@@ -2,6 +2,7 @@ from typing import Any
 
 from nacsos_data.db import DatabaseEngineAsync
 from ..util.config import settings
+from ..util.dbstats import instrument_engine
 
 kw_engine: dict[str, Any] | None = None
 
@@ -17,3 +18,6 @@ db_engine = DatabaseEngineAsync(
     debug=settings.SERVER.DEBUG_MODE,
     kw_engine=kw_engine,
 )
+
+# collect per-request query counts and times, and log slow queries
+instrument_engine(db_engine.engine.sync_engine)
@@ -0,0 +1,115 @@
+from typing import Any, Sequence, TYPE_CHECKING
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psa
+from nacsos_data.db.schemas import Annotation, Assignment, BotAnnotation
+
+from ..util.inclusion import InvalidRuleError, compile_rule
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession  # noqa: F401
+
+
+def _value(Schema: Any) -> Any:
+    return sa.func.coalesce(Schema.value_int, sa.cast(Schema.value_bool, sa.Integer))
+
+
+async def read_label_rows(session: 'AsyncSession', source_ids: Sequence[str]) -> list[Any]:
+    """
+    Read the labels of all sources (assignment scopes and resolutions) in one query.
+    Rows are `(source_id, item_id, annotator, key, value)`, ordered by source and the time an item was first labelled in that source.
+    Multi-labels are unnested into one row per value, labels without a boolean or integer value are skipped.
+    """
+    source_ids = [str(sid) for sid in source_ids]
+    human = (
+        sa.select(
+            Assignment.assignment_scope_id.cast(sa.String).label('source_id'),
+            Annotation.item_id.cast(sa.String).label('item_id'),
+            Annotation.user_id.cast(sa.String).label('annotator'),
+            Annotation.time_created.label('time'),
+            Annotation.key,
+            sa.func.unnest(sa.func.coalesce(Annotation.multi_int, psa.array([_value(Annotation)]))).label('value'),
+        )
+        .join(Assignment, Assignment.assignment_id == Annotation.assignment_id)
+        .where(Assignment.assignment_scope_id.in_(source_ids))
+    )
+    resolved = sa.select(
+        BotAnnotation.bot_annotation_metadata_id.cast(sa.String).label('source_id'),
+        BotAnnotation.item_id.cast(sa.String).label('item_id'),
+        sa.literal('resolution', type_=sa.String).label('annotator'),
+        BotAnnotation.time_created.label('time'),
+        BotAnnotation.key,
+        sa.func.unnest(sa.func.coalesce(BotAnnotation.multi_int, psa.array([_value(BotAnnotation)]))).label('value'),
+    ).where(BotAnnotation.bot_annotation_metadata_id.in_(source_ids))
+
+    labels = sa.union_all(human, resolved).subquery()
+    first_seen = sa.func.min(labels.c.time).over(partition_by=(labels.c.source_id, labels.c.item_id))
+    stmt = (
+        sa.select(labels.c.source_id, labels.c.item_id, labels.c.annotator, labels.c.key, labels.c.value)
+        .where(labels.c.value.is_not(None))
+        .order_by(labels.c.source_id, first_seen, labels.c.item_id)
+    )
+    return list((await session.execute(stmt)).all())
+
+
+def _sequence(items: np.ndarray, annotators: np.ndarray, labels: np.ndarray, rule: str, majority: bool) -> list[int]:
+    """
+    Inclusion label (0/1) per item of one source, in order of first appearance.
+    """
+    item_ids, first, item_idx = np.unique(items, return_index=True, return_inverse=True)
+    label_ids, label_idx = np.unique(labels, return_inverse=True)
+    _, annotator_idx = np.unique(annotators, return_inverse=True)
+    n_items, n_labels, n_annotators = len(item_ids), len(label_ids), annotator_idx.max() + 1
+
+    # each annotator counts once per item and label, even if it was assigned repeatedly
+    votes = np.unique((item_idx * n_annotators + annotator_idx) * n_labels + label_idx)
+    counts = np.bincount(votes // (n_annotators * n_labels) * n_labels + votes % n_labels, minlength=n_items * n_labels).reshape(n_items, n_labels)
+
+    if majority:
+        per_item = np.bincount(np.unique(item_idx * n_annotators + annotator_idx) // n_annotators, minlength=n_items)
+        assigned = 2 * counts > per_item[:, None]
+    else:
+        assigned = counts > 0
+
+    mask = compile_rule(rule)({label: assigned[:, j] for j, label in enumerate(label_ids)}, n_items)
+    return mask[np.argsort(first, kind='stable')].astype(int).tolist()  # type: ignore[no-any-return]
+
+
+def label_sequences(rows: Sequence[Any], source_ids: Sequence[str], rule: str, majority: bool) -> list[list[int]]:
+    """
+    Turn the rows from `read_label_rows()` into one inclusion sequence per source (in the order of `source_ids`).
+    With `majority`, a label counts for an item if more than half of its annotators assigned it, otherwise if anyone did.
+    Sources without labels are skipped.
+    """
+    if len(rows) == 0:
+        return []
+    sources, items, annotators, keys, values = (np.asarray(column) for column in zip(*rows, strict=True))
+    labels = np.char.add(np.char.add(keys.astype(str), ':'), values.astype(np.int64).astype(str))
+
+    sequences = []
+    for source_id in source_ids:
+        mask = sources == str(source_id)
+        if mask.any():
+            sequences.append(_sequence(items[mask], annotators[mask], labels[mask], rule=rule, majority=majority))
+    return sequences
+
+
+async def tracker_sequences(session: 'AsyncSession', source_ids: Sequence[str], rule: str, majority: bool) -> list[list[int]]:
+    """
+    Inclusion sequence per source (sources without labels are skipped) for an annotation tracker.
+    Rules the compiled evaluator does not understand are left to the reference implementation of nacsos_data (one query per source).
+    """
+    try:
+        compile_rule(rule)
+    except InvalidRuleError:
+        from nacsos_data.util.annotations.label_transform import annotations_to_sequence, get_annotations
+
+        batched_annotations = [await get_annotations(session=session, source_ids=[sid]) for sid in source_ids]
+        return [annotations_to_sequence(rule, annotations=annotations, majority=majority) for annotations in batched_annotations if len(annotations) > 0]
+
+    rows = await read_label_rows(session=session, source_ids=source_ids)
+    return label_sequences(rows, source_ids=source_ids, rule=rule, majority=majority)
+
+
+__all__ = ['read_label_rows', 'label_sequences', 'tracker_sequences']
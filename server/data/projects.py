@@ -0,0 +1,40 @@
+import uuid
+
+from nacsos_data.db.crud.projects import read_project_by_id
+from nacsos_data.db.schemas import ItemType
+from nacsos_data.models.projects import ProjectModel
+
+from ..util.cache import TTLCache
+from ..util.config import settings
+from . import db_engine
+
+# Project metadata (name, type, settings) is read by many handlers but rarely changes
+project_cache: TTLCache[str, ProjectModel] = TTLCache(ttl=settings.SERVER.PROJECT_CACHE_TTL, maxsize=512)
+
+
+async def read_project_cached(project_id: str | uuid.UUID) -> ProjectModel | None:
+    """
+    Same as `read_project_by_id`, but served from the per-process project cache when possible.
+    Make sure to call `invalidate_project()` after changing a project.
+    """
+    key = str(project_id)
+    project = project_cache.get(key)
+    if project is None:
+        project = await read_project_by_id(project_id=key, engine=db_engine)
+        if project is not None:
+            project_cache.set(key, project)
+    return project
+
+
+async def read_project_type(project_id: str | uuid.UUID) -> ItemType | None:
+    project = await read_project_cached(project_id)
+    if project is None:
+        return None
+    return project.type
+
+
+def invalidate_project(project_id: str | uuid.UUID) -> None:
+    project_cache.invalidate(str(project_id))
+
+
+__all__ = ['project_cache', 'read_project_cached', 'read_project_type', 'invalidate_project']
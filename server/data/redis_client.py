@@ -0,0 +1,30 @@
+from typing import TYPE_CHECKING
+
+from ..util.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_client: 'Redis | None' = None
+
+
+def get_redis() -> 'Redis':
+    """
+    Shared asyncio redis client of this process, connected to the redis at `PIPES.REDIS_URL`.
+    This is a separate `redis.asyncio` client with its own connection pool, not the (synchronous) connection of the dramatiq broker;
+    the pool is only created on first use, so importing this module is cheap.
+    """
+    global _client
+    if _client is None:
+        from redis.asyncio import Redis
+
+        # short timeouts, so that a hanging redis makes callers fall back (e.g. bypass the cache) instead of hanging with it
+        _client = Redis.from_url(
+            settings.PIPES.REDIS_URL,
+            socket_timeout=settings.PIPES.REDIS_TIMEOUT,
+            socket_connect_timeout=settings.PIPES.REDIS_TIMEOUT,
+        )
+    return _client
+
+
+__all__ = ['get_redis']
@@ -0,0 +1,178 @@
+import json
+import uuid
+import hashlib
+import logging
+import functools
+from typing import Any, Awaitable, Callable, Literal, ParamSpec, get_type_hints
+
+from fastapi import Request
+from pydantic import BaseModel, TypeAdapter
+
+from ..util.config import settings
+from ..util.cache import TTLCache
+from ..util.conditional import REQUEST_PARAM, with_request, make_etag, etag_matches, not_modified, json_response
+from .redis_client import get_redis
+
+logger = logging.getLogger('nacsos.data.response_cache')
+
+P = ParamSpec('P')
+
+# Parts of a project that cached responses depend on; writes bump the version of the respective tag
+CacheTag = Literal['project', 'items', 'imports', 'schemes', 'annotations', 'highlighters']
+
+PREFIX = 'nacsos:cache'
+
+
+def _version_key(project_id: str, tag: CacheTag) -> str:
+    return f'{PREFIX}:{project_id}:v:{tag}'
+
+
+def _fingerprint(kwargs: dict[str, Any]) -> str:
+    def encode(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode='json')
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    payload = json.dumps({key: encode(value) for key, value in sorted(kwargs.items())}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Response cache shared by all API workers via redis, with a small in-process L1 in front of it.
+
+    Keys are namespaced per project and embed the current version of every tag the response depends on
+    (e.g. `nacsos:cache:<project_id>:stats.basics:items=3,annotations=17:<args hash>`).
+    Writes call `bump()`, which increments the tag versions, so all dependent entries are skipped from then on
+    and simply expire in redis. Tag versions are cached locally for `RESPONSE_CACHE_VERSION_TTL` seconds,
+    so other workers may serve stale responses for at most that long.
+
+    Redis being unavailable is not fatal: the cache is bypassed and a warning is logged.
+    """
+
+    def __init__(self, ttl: int, l1_size: int, version_ttl: float):
+        self.ttl = ttl
+        self.l1: TTLCache[str, bytes] = TTLCache(ttl=ttl, maxsize=l1_size)
+        self.versions: TTLCache[str, int] = TTLCache(ttl=version_ttl, maxsize=4 * l1_size)
+
+    async def get_versions(self, project_id: str, tags: tuple[CacheTag, ...]) -> list[int]:
+        keys = [_version_key(project_id, tag) for tag in tags]
+        versions = [self.versions.get(key) for key in keys]
+        missing = [key for key, version in zip(keys, versions, strict=True) if version is None]
+        if missing:
+            fetched = dict(zip(missing, await get_redis().mget(missing), strict=True))
+            for i, key in enumerate(keys):
+                if versions[i] is None:
+                    versions[i] = int(fetched[key] or 0)
+                    self.versions.set(key, versions[i])  # type: ignore[arg-type]
+        return versions  # type: ignore[return-value]
+
+    async def bump(self, project_id: str | uuid.UUID, *tags: CacheTag) -> None:
+        """
+        Invalidate all cached responses of a project that depend on any of the `tags`.
+        """
+        project_id = str(project_id)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(_version_key(project_id, tag))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f'Failed to invalidate cache tags {tags} for project {project_id}: {e}')
+        for tag in tags:
+            self.versions.invalidate(_version_key(project_id, tag))
+        self.l1.invalidate_where(lambda key, _: key.startswith(f'{PREFIX}:{project_id}:'))
+
+    async def get(self, key: str) -> bytes | None:
+        value = self.l1.get(key)
+        if value is None:
+            value = await get_redis().get(key)
+            if value is not None:
+                self.l1.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int | None = None) -> None:
+        self.l1.set(key, value)
+        await get_redis().set(key, value, ex=ttl or self.ttl)
+
+    def cached(
+        self,
+        namespace: str,
+        tags: tuple[CacheTag, ...],
+        per_user: bool = False,
+        ttl: int | None = None,
+    ) -> Callable[[Callable[P, Awaitable[Any]]], Callable[P, Awaitable[Any]]]:
+        """
+        Decorator for route handlers that have a `permissions: UserPermissions` parameter.
+        The JSON-serialised response is cached under the project of the user and the remaining parameters of the handler.
+        Responses carry an ETag derived from the cache key (i.e. the tag versions), so conditional requests
+        with a matching `If-None-Match` are answered with `304 Not Modified` without touching the database or the cache.
+
+        :param namespace: unique name of the cached route
+        :param tags: parts of the project the response depends on
+        :param per_user: whether the response differs between users of the same project
+        :param ttl: seconds to keep entries in redis (defaults to `RESPONSE_CACHE_TTL`)
+        """
+
+        def decorator(fn: Callable[P, Awaitable[Any]]) -> Callable[P, Awaitable[Any]]:
+            adapter: TypeAdapter[Any] | None = None
+
+            @functools.wraps(fn)
+            async def wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                nonlocal adapter
+                request: Request = kwargs.pop(REQUEST_PARAM)  # type: ignore[assignment]
+                if adapter is None:
+                    adapter = TypeAdapter(get_type_hints(fn)['return'])
+
+                if self.ttl <= 0:
+                    content = adapter.dump_json(await fn(*args, **kwargs), by_alias=True)
+                    etag = make_etag(content)
+                    return not_modified(etag) if etag_matches(request, etag) else json_response(content, etag)
+
+                permissions = kwargs['permissions']
+                project_id = str(permissions.permissions.project_id)  # type: ignore[attr-defined]
+                params = {key: value for key, value in kwargs.items() if key != 'permissions'}
+                if per_user:
+                    params['__user_id'] = permissions.user.user_id  # type: ignore[attr-defined]
+
+                key = None
+                try:
+                    versions = await self.get_versions(project_id, tags)
+                    version = ','.join(f'{tag}={v}' for tag, v in zip(tags, versions, strict=True))
+                    key = f'{PREFIX}:{project_id}:{namespace}:{version}:{_fingerprint(params)}'
+                    etag = make_etag(key)
+                    if etag_matches(request, etag):
+                        return not_modified(etag)
+                    cached = await self.get(key)
+                    if cached is not None:
+                        return json_response(cached, etag)
+                except Exception as e:
+                    logger.warning(f'Response cache unavailable, bypassing it: {e}')
+
+                content = adapter.dump_json(await fn(*args, **kwargs), by_alias=True)
+
+                if key is None:
+                    etag = make_etag(content)
+                    return not_modified(etag) if etag_matches(request, etag) else json_response(content, etag)
+
+                try:
+                    await self.set(key, content, ttl=ttl)
+                except Exception as e:
+                    logger.warning(f'Failed to write to response cache: {e}')
+                return json_response(content, make_etag(key))
+
+            with_request(fn, wrapper)
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache(
+    ttl=settings.SERVER.RESPONSE_CACHE_TTL,
+    l1_size=settings.SERVER.RESPONSE_CACHE_L1_SIZE,
+    version_ttl=settings.SERVER.RESPONSE_CACHE_VERSION_TTL,
+)
+
+__all__ = ['ResponseCache', 'CacheTag', 'response_cache']
@@ -18,6 +18,7 @@ from nacsos_data.db.schemas import Task
 
 from server.util.config import settings, DatabaseConfig
 from server.util.logging import get_file_logger, LogRedirector
+from server.util.profiling import TaskProfileWatcher, request_task_profile
 
 logger = logging.getLogger('nacsos.pipelines.actor')
 
@@ -55,6 +56,7 @@ class NacsosActor(Actor[P, R]):
         *args: P.args,
         user_id: str | None = None,
         comment: str | None = None,
+        profile: bool = False,
         **kwargs: P.kwargs,
     ) -> Message[R]:
         from nacsos_data.db import get_engine
@@ -67,6 +69,10 @@ class NacsosActor(Actor[P, R]):
 
         fingerprint = compute_fingerprint(full_name=self.actor_name, params=params)
 
+        if profile:
+            # profile the entire run, the worker picks this up once it starts the task
+            request_task_profile(self.task_id)
+
         message = super().send_with_options(
             args=args, kwargs=kwargs, nacsos_actor_name=self.actor_name, nacsos_task_id=self.task_id, max_retries=0, time_limit=129600000
         )  # 24h in ms => 24*60*60*1000
@@ -134,6 +140,7 @@ class NacsosActor(Actor[P, R]):
             TemporaryDirectory(dir=settings.PIPES.WORKING_DIR) as work_dir,
             LogRedirector(task_logger, level='INFO', stream='stdout'),
             LogRedirector(task_logger, level='ERROR', stream='stderr'),
+            TaskProfileWatcher(target_dir=target_dir),
         ):
             try:
                 # Yielding this info implicitly executes everything in the `with:` context.
@@ -0,0 +1,64 @@
+import os
+import shutil
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from server.util.config import settings
+
+
+class ImportCheckpoint(BaseModel):
+    """
+    Progress of a (long-running) OpenAlex Solr import, so that a failed import can be resumed instead of restarted.
+    Pages of Solr results are written to disk first and then imported at once.
+    """
+
+    import_id: str
+    # Hash of the import config, checkpoints are only resumed for the same query
+    fingerprint: str
+    # Task that wrote the checkpoint last
+    task_id: str | None = None
+
+    # Solr cursor to continue fetching from
+    cursor_mark: str = '*'
+    num_found: int | None = None
+    pages_fetched: int = 0
+    docs_fetched: int = 0
+    # True once the cursor is exhausted
+    fetched: bool = False
+
+    # True once the importer ran on all fetched documents (and committed)
+    imported: bool = False
+
+
+def checkpoint_dir(import_id: str) -> Path:
+    return settings.PIPES.imports_dir / str(import_id)
+
+
+def page_file(import_id: str, page: int) -> Path:
+    return checkpoint_dir(import_id) / f'page-{page:06d}.jsonl'
+
+
+def read_checkpoint(import_id: str) -> ImportCheckpoint | None:
+    path = checkpoint_dir(import_id) / 'checkpoint.json'
+    if not path.is_file():
+        return None
+    return ImportCheckpoint.model_validate_json(path.read_text())
+
+
+def write_checkpoint(checkpoint: ImportCheckpoint) -> None:
+    """
+    Replace the checkpoint atomically, so that a crash never leaves a half-written one behind.
+    """
+    path = checkpoint_dir(checkpoint.import_id) / 'checkpoint.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(checkpoint.model_dump_json(indent=2))
+    os.replace(tmp, path)
+
+
+def drop_checkpoint(import_id: str) -> None:
+    """
+    Delete the checkpoint and all fetched pages of an import.
+    """
+    shutil.rmtree(checkpoint_dir(import_id), ignore_errors=True)
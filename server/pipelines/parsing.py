@@ -0,0 +1,80 @@
+# Parsing of import source files in worker processes.
+# Workers are spawned and unpickle `parse_source()` from here, so this module must stay free of side effects
+# (no broker, database, or settings) and only import what parsing needs.
+
+import json
+import importlib
+from pathlib import Path
+from typing import Any, Callable
+
+# Parsers of a single source file per import kind, used to parse the sources of an import in parallel
+READERS = {
+    'wos': ('nacsos_data.util.academic.readers.wos', 'read_wos_file'),
+    'scopus': ('nacsos_data.util.academic.readers.scopus', 'read_scopus_csv_file'),
+}
+
+# Identifiers that mark two parsed records as the same item
+ID_FIELDS = ('doi', 'wos_id', 'scopus_id', 'openalex_id', 'pubmed_id', 's2_id', 'dimensions_id')
+
+
+def load_reader(kind: str) -> Callable[..., Any] | None:
+    """
+    Parser of a single source file for this import kind, or None if there is none (in the installed nacsos_data).
+    """
+    if kind not in READERS:
+        return None
+    module, name = READERS[kind]
+    try:
+        return getattr(importlib.import_module(module), name, None)
+    except ImportError:
+        return None
+
+
+def parse_source(kind: str, source: Path, target: Path, project_id: str) -> tuple[Path, int]:
+    """
+    Parse one source file into normalised `AcademicItemModel` records, written as JSON lines to `target`.
+    Runs in a worker process.
+    """
+    reader = load_reader(kind)
+    if reader is None:
+        raise ValueError(f'No parser for {kind} files.')
+    n_items = 0
+    try:
+        with open(target, 'w') as f:
+            for item in reader(filepath=str(source), project_id=project_id):
+                f.write(item.model_dump_json() + '\n')
+                n_items += 1
+    except Exception as e:
+        raise ValueError(f'Failed to parse {source.name}: {e}') from e
+    return source, n_items
+
+
+def item_keys(record: dict[str, Any]) -> list[str]:
+    keys = [f'{field}:{str(record[field]).strip().lower()}' for field in ID_FIELDS if record.get(field)]
+    if not keys and record.get('title_slug'):
+        keys.append(f'title_slug:{record["title_slug"]}')
+    return keys
+
+
+def merge_sources(parts: list[Path], target: Path) -> tuple[int, int]:
+    """
+    Concatenate parsed records into `target`, dropping records that share an identifier with an earlier one.
+    Duplicates of items already in the project are handled by the importer.
+
+    :return: number of parsed and of written records
+    """
+    seen: set[str] = set()
+    n_parsed = 0
+    n_written = 0
+    with open(target, 'w') as f_out:
+        for part in parts:
+            with open(part) as f_in:
+                for line in f_in:
+                    n_parsed += 1
+                    keys = item_keys(json.loads(line))
+                    if any(key in seen for key in keys):
+                        continue
+                    seen.update(keys)
+                    f_out.write(line)
+                    n_written += 1
+    return n_parsed, n_written
@@ -35,4 +35,7 @@ broker.add_middleware(AsyncIO())
 
 
 from . import imports  # noqa: F401, E402
+from . import priority  # noqa: F401, E402
+from . import quality  # noqa: F401, E402
 from . import sleepy  # noqa: F401, E402
+from . import tracker  # noqa: F401, E402
@@ -1,4 +1,10 @@
+import os
+import json
+import asyncio
+import hashlib
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import cast
 
@@ -14,14 +20,190 @@ from sqlalchemy import select
 
 from server.util.config import settings, conf_file
 from server.pipelines.actor import NacsosActor
+from server.pipelines.parsing import load_reader, merge_sources, parse_source
+from server.pipelines.checkpoints import ImportCheckpoint, checkpoint_dir, drop_checkpoint, page_file, read_checkpoint, write_checkpoint
+
+
+# Documents per Solr request, each page is one file on disk
+SOLR_PAGE_SIZE = 1000
 
 
 def prefix_sources(sources: list[Path]) -> list[Path]:
     return [settings.PIPES.user_data_dir / path for path in sources]
 
 
+async def import_files_parallel(
+    kind: str,
+    sources: list[Path],
+    project_id: str,
+    import_id: str,
+    task_id: str | None,
+    work_dir: Path,
+    workers: int,
+    logger: logging.Logger,
+) -> None:
+    """
+    Parse all source files in a process pool, merge and deduplicate the records, and import them in one writer stage.
+    """
+    parts = [work_dir / f'part-{i:04d}.jsonl' for i in range(len(sources))]
+    loop = asyncio.get_running_loop()
+    # worker processes are spawned, forking the (multi-threaded) dramatiq worker is not safe
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    futures = [loop.run_in_executor(pool, parse_source, kind, source, part, project_id) for source, part in zip(sources, parts, strict=True)]
+    try:
+        for i, future in enumerate(asyncio.as_completed(futures), start=1):
+            source, n_items = await future
+            logger.info(f'[{i}/{len(sources)}] Parsed {n_items:,} items from {source.name}')
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        # do not wait for files that are still being parsed, and never block the event loop while shutting down
+        await asyncio.to_thread(pool.shutdown, wait=False, cancel_futures=True)
+        raise
+    await asyncio.to_thread(pool.shutdown)
+
+    merged = work_dir / 'merged.jsonl'
+    n_parsed, n_written = await asyncio.to_thread(merge_sources, parts, merged)
+    logger.info(f'Merged {n_parsed:,} parsed items into {n_written:,} unique items, importing...')
+
+    await import_academic_db(
+        sources=[merged],
+        project_id=project_id,
+        import_id=import_id,
+        pipeline_task_id=task_id,
+        db_config=Path(conf_file),
+        logger=logger.getChild(kind),
+    )
+
+
+def config_fingerprint(config: ImportConfig) -> str:
+    return hashlib.sha1(config.model_dump_json().encode()).hexdigest()
+
+
+async def fetch_solr_pages(config: ImportConfig, checkpoint: ImportCheckpoint, logger: logging.Logger) -> None:
+    """
+    Page through all results of the Solr query with a cursor and write every page to disk,
+    updating the checkpoint after each page, so that fetching continues where it stopped.
+    """
+    import httpx
+
+    params = {
+        **(config.params or {}),
+        'q': config.query,
+        'defType': config.def_type,
+        'df': config.field,
+        'q.op': config.op,
+        'rows': SOLR_PAGE_SIZE,
+        # cursors require a sort on the unique key
+        'sort': 'id asc',
+        'wt': 'json',
+    }
+    params = {key: value for key, value in params.items() if value is not None}
+
+    # also creates the directory for the pages
+    write_checkpoint(checkpoint)
+    async with httpx.AsyncClient(timeout=300) as client:
+        while not checkpoint.fetched:
+            response = await client.post(f'{settings.OPENALEX.solr_url}/select', data={**params, 'cursorMark': checkpoint.cursor_mark})
+            response.raise_for_status()
+            result = response.json()
+            docs = result['response']['docs']
+
+            if docs:
+                # a page that was written before a crash (but not checkpointed) is fetched and replaced again
+                target = page_file(checkpoint.import_id, checkpoint.pages_fetched)
+                tmp = target.with_suffix('.tmp')
+                with open(tmp, 'w') as f:
+                    f.writelines(json.dumps(doc) + '\n' for doc in docs)
+                os.replace(tmp, target)
+                checkpoint.pages_fetched += 1
+                checkpoint.docs_fetched += len(docs)
+
+            checkpoint.num_found = result['response']['numFound']
+            checkpoint.fetched = not docs or result['nextCursorMark'] == checkpoint.cursor_mark
+            checkpoint.cursor_mark = result['nextCursorMark']
+            write_checkpoint(checkpoint)
+            logger.info(f'Fetched {checkpoint.docs_fetched:,} / {checkpoint.num_found:,} documents ({checkpoint.pages_fetched:,} pages)')
+
+
+def solr_translation_available() -> bool:
+    try:
+        from nacsos_data.models.openalex.solr import WorkSolr  # noqa: F401
+        from nacsos_data.util.academic.openalex import translate_doc  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def translate_solr_pages(checkpoint: ImportCheckpoint, target: Path) -> int:
+    """
+    Translate all fetched Solr documents into `AcademicItemModel` records (JSON lines in `target`),
+    using the same translation as the OpenAlex importer of nacsos_data.
+
+    :return: number of translated documents
+    """
+    from nacsos_data.models.openalex.solr import WorkSolr
+    from nacsos_data.util.academic.openalex import translate_doc
+
+    n_docs = 0
+    with open(target, 'w') as f_out:
+        for page in range(checkpoint.pages_fetched):
+            with open(page_file(checkpoint.import_id, page)) as f_in:
+                for line in f_in:
+                    f_out.write(translate_doc(WorkSolr.model_validate_json(line)).model_dump_json() + '\n')
+                    n_docs += 1
+    return n_docs
+
+
+async def import_solr_pages(checkpoint: ImportCheckpoint, project_id: str, task_id: str | None, logger: logging.Logger) -> None:
+    """
+    Import all fetched pages in a single importer run, so that the import gets exactly one new revision.
+    """
+    if checkpoint.imported:
+        logger.info('Fetched documents were imported already.')
+        return
+
+    translated = checkpoint_dir(checkpoint.import_id) / 'items.jsonl'
+    n_docs = await asyncio.to_thread(translate_solr_pages, checkpoint, translated)
+    logger.info(f'Importing {n_docs:,} documents from {checkpoint.pages_fetched:,} pages...')
+    await import_academic_db(
+        sources=[translated],
+        project_id=project_id,
+        import_id=checkpoint.import_id,
+        pipeline_task_id=task_id,
+        db_config=Path(conf_file),
+        logger=logger.getChild('oa-solr'),
+    )
+    checkpoint.imported = True
+    write_checkpoint(checkpoint)
+
+
+async def import_solr(config: ImportConfig, import_id: str, project_id: str, task_id: str | None, resume: bool, logger: logging.Logger) -> None:
+    """
+    Fetch all results of the Solr query to disk and import them, continuing from the checkpoint of a previous (failed) task if `resume` is set.
+    """
+    fingerprint = config_fingerprint(config)
+    checkpoint = read_checkpoint(import_id) if resume else None
+    if checkpoint is not None and checkpoint.fingerprint == fingerprint:
+        logger.info(
+            f'Resuming from checkpoint of task {checkpoint.task_id}: '
+            f'{checkpoint.docs_fetched:,} documents in {checkpoint.pages_fetched:,} pages fetched, imported: {checkpoint.imported}'
+        )
+    else:
+        if resume:
+            logger.warning('No checkpoint for this query, starting from the beginning.')
+        drop_checkpoint(import_id)
+        checkpoint = ImportCheckpoint(import_id=import_id, fingerprint=fingerprint)
+    checkpoint.task_id = task_id
+
+    await fetch_solr_pages(config=config, checkpoint=checkpoint, logger=logger)
+    await import_solr_pages(checkpoint=checkpoint, project_id=project_id, task_id=task_id, logger=logger)
+    # fetched pages are only needed to resume, free the disk space
+    drop_checkpoint(import_id)
+
+
 @dramatiq.actor(actor_class=NacsosActor, max_retries=0)
-async def import_task(import_id: str | None = None) -> None:
+async def import_task(import_id: str | None = None, resume: bool = False) -> None:
     logging.info('Received import task')
     async with NacsosActor.exec_context() as (db_settings, logger, target_dir, work_dir, task_id, message_id):
         logger.info('Preparing import task!')
@@ -40,7 +222,20 @@ async def import_task(import_id: str | None = None) -> None:
         user_id, project_id, config = cast(tuple[str, str, ImportConfig], ensure_values(import_details, 'user_id', 'project_id', 'config'))
         logger.info(f'Task config: {config.kind}')
 
-        if config.kind == 'wos':
+        workers = min(settings.PIPES.IMPORT_WORKERS, len(config.sources or []))
+        if workers > 1 and load_reader(config.kind) is not None:
+            logger.info(f'Proceeding with {config.kind} import of {len(config.sources):,} files in {workers} processes...')
+            await import_files_parallel(
+                kind=config.kind,
+                sources=prefix_sources(config.sources),
+                project_id=project_id,
+                import_id=import_id,
+                task_id=task_id,
+                work_dir=Path(work_dir),
+                workers=workers,
+                logger=logger,
+            )
+        elif config.kind == 'wos':
             logger.info('Proceeding with Web of Science import...')
             await import_wos_files(
                 sources=prefix_sources(config.sources),
@@ -88,17 +283,26 @@ async def import_task(import_id: str | None = None) -> None:
             logger.warning('Checking connection to solr')
             logger.warning(httpx.get(f'{settings.OPENALEX.solr_url}/select').json())
 
-            await import_openalex(
-                query=config.query,
-                nacsos_config=Path(conf_file),
-                def_type=config.def_type,
-                field=config.field,
-                op=config.op,
-                params=config.params,
-                project_id=project_id,
-                import_id=import_id,
-                pipeline_task_id=task_id,
-                logger=logger.getChild('oa-solr'),
-            )
+            if solr_translation_available():
+                await import_solr(config=config, import_id=import_id, project_id=project_id, task_id=task_id, resume=resume, logger=logger)
+            else:
+                logger.warning('Solr translation of nacsos_data not available, importing without checkpoints.')
+                await import_openalex(
+                    query=config.query,
+                    nacsos_config=Path(conf_file),
+                    def_type=config.def_type,
+                    field=config.field,
+                    op=config.op,
+                    params=config.params,
+                    project_id=project_id,
+                    import_id=import_id,
+                    pipeline_task_id=task_id,
+                    logger=logger.getChild('oa-solr'),
+                )
+
+        # let API workers drop cached stats etc. of this project
+        from server.data.response_cache import response_cache
+
+        await response_cache.bump(project_id, 'items', 'imports')
 
         logger.info('Done, yo!')
@@ -0,0 +1,203 @@
+import json
+import asyncio
+import logging
+import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, TYPE_CHECKING
+
+import dramatiq
+from nacsos_data.db import get_engine_async
+from nacsos_data.db.schemas import Item, AcademicItem
+from nacsos_data.db.schemas.priority import Priority
+from nacsos_data.util.errors import NotFoundError
+from sqlalchemy import select, func as F, any_, bindparam
+from sqlalchemy.dialects import postgresql as psa
+
+from server.util.config import settings
+from server.pipelines.actor import NacsosActor
+
+if TYPE_CHECKING:
+    import numpy as np
+    from sqlalchemy.ext.asyncio import AsyncSession  # noqa: F401
+    from sklearn.pipeline import Pipeline
+
+# Cross-validated recall within the top share of the ranking
+RECALL_AT = (0.05, 0.1, 0.2, 0.5)
+# Candidates fetched (and scored) at once
+SCORE_BATCH_SIZE = 5000
+
+
+def _text_columns() -> list[Any]:
+    return [Item.item_id.cast(psa.VARCHAR).label('item_id'), F.concat_ws('\n', AcademicItem.title, Item.text).label('text')]
+
+
+async def read_texts_by_id(session: 'AsyncSession', item_ids: list[str]) -> dict[str, str]:
+    stmt = (
+        select(*_text_columns())
+        .outerjoin(AcademicItem, AcademicItem.item_id == Item.item_id)
+        .where(Item.item_id == any_(bindparam('item_ids', value=item_ids, type_=psa.ARRAY(psa.UUID(as_uuid=False)))))
+    )
+    return {row.item_id: row.text for row in await session.execute(stmt)}
+
+
+async def stream_candidate_texts(
+    session: 'AsyncSession', project_id: str, query: Any, exclude: set[str], batch_size: int = SCORE_BATCH_SIZE
+) -> AsyncGenerator[tuple[list[str], list[str]], None]:
+    """
+    Texts of all items of the project (matching the NQL `query`, if any) that are not in `exclude`.
+    Rows are fetched through a server-side cursor (`yield_per`) and yielded as `(item_ids, texts)` batches,
+    so that large projects never have to be held in memory at once.
+    """
+    from nacsos_data.util.nql import NQLQuery
+
+    nql = await NQLQuery.get_query(session=session, query=query, project_id=project_id)
+    stmt_items = nql.stmt.subquery()
+    stmt = (
+        select(*_text_columns())
+        .join(stmt_items, stmt_items.c.item_id == Item.item_id)
+        .outerjoin(AcademicItem, AcademicItem.item_id == Item.item_id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        rows = [row for row in partition if row.item_id not in exclude]
+        if rows:
+            yield [row.item_id for row in rows], [row.text or '' for row in rows]
+
+
+def train_model(
+    texts: list[str],
+    labels: 'np.ndarray',
+    max_features: int = 100_000,
+    folds: int = 5,
+    n_jobs: int | None = None,
+    seed: int = 42,
+) -> tuple['Pipeline', dict[str, Any]]:
+    """
+    Fit a sparse TF-IDF + logistic regression model on the labelled texts.
+    The model is evaluated by stratified cross-validation first; folds are fitted in parallel.
+
+    :return: fitted model, evaluation metrics
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import average_precision_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+    from sklearn.pipeline import make_pipeline
+
+    n_incl = int(labels.sum())
+    n_excl = labels.shape[0] - n_incl
+    if min(n_incl, n_excl) < 2:
+        raise ValueError(f'Need at least two included and two excluded items to train a model, got {n_incl} and {n_excl}.')
+
+    model = make_pipeline(
+        TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), min_df=2 if len(texts) >= 50 else 1, max_features=max_features, dtype=np.float32),
+        LogisticRegression(class_weight='balanced', max_iter=1000),
+    )
+
+    cv = StratifiedKFold(n_splits=min(folds, n_incl, n_excl), shuffle=True, random_state=seed)
+    cv_scores = cross_val_predict(model, texts, labels, cv=cv, method='predict_proba', n_jobs=n_jobs)[:, 1]
+    ranked = labels[np.argsort(-cv_scores, kind='stable')]
+    metrics = {
+        'n_train': int(labels.shape[0]),
+        'n_incl': n_incl,
+        'folds': cv.n_splits,
+        'roc_auc': float(roc_auc_score(labels, cv_scores)),
+        'average_precision': float(average_precision_score(labels, cv_scores)),
+        'recall_at': {str(share): float(ranked[: max(1, int(share * len(ranked)))].sum() / n_incl) for share in RECALL_AT},
+    }
+
+    model.fit(texts, labels)
+    return model, metrics
+
+
+def score_texts(model: 'Pipeline', texts: list[str]) -> 'np.ndarray':
+    return model.predict_proba(texts)[:, 1]
+
+
+def write_artefacts(out_dir: Path, model: 'Pipeline', metrics: dict[str, Any], candidate_ids: 'np.ndarray', scores: 'np.ndarray', order: 'np.ndarray') -> None:
+    import joblib
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, out_dir / 'model.joblib')
+    (out_dir / 'metrics.json').write_text(json.dumps(metrics, indent=2))
+    with open(out_dir / 'scores.csv', 'w') as f:
+        f.write('item_id,score\n')
+        f.writelines(f'{item_id},{score:.6f}\n' for item_id, score in zip(candidate_ids[order], scores[order], strict=True))
+
+
+@dramatiq.actor(actor_class=NacsosActor, max_retries=0)
+async def train_priority_task(
+    priority_id: str | None = None,
+    scope_ids: list[str] | None = None,
+    incl: str = 'incl:1',
+    query: dict[str, Any] | None = None,
+    n_predictions: int = 1000,
+    max_features: int = 100_000,
+) -> None:
+    logging.info('Received priority training task')
+    async with NacsosActor.exec_context() as (db_settings, logger, target_dir, work_dir, task_id, message_id):
+        if priority_id is None or not scope_ids:
+            raise ValueError('priority_id and scope_ids are required here.')
+
+        # pandas/scikit-learn-backed, only imported on first use to keep startup fast
+        import numpy as np
+        from pydantic import TypeAdapter
+        from nacsos_data.models.nql import NQLFilter
+        from nacsos_data.util.annotations.export import wide_export_table
+        from server.util.inclusion import inclusion_mask, labelled_mask
+
+        db_engine = get_engine_async(settings=db_settings)
+        async with db_engine.session() as session:
+            priority = await session.get(Priority, priority_id)
+            if priority is None:
+                raise NotFoundError(f'No priority setup for id={priority_id}')
+            project_id = str(priority.project_id)
+            priority.time_started = datetime.datetime.now()
+            await session.commit()
+
+            logger.info('Building training frame...')
+            _, label_cols, df = await wide_export_table(session=session, project_id=project_id, nql_filter=None, scope_ids=scope_ids, limit=None)
+            # items that were never annotated for this rule are no negatives, they are ranked as candidates instead
+            df = df[labelled_mask(rule=incl, df=df, label_cols=label_cols)]
+            labels = np.asarray(inclusion_mask(rule=incl, df=df, label_cols=label_cols), dtype=np.int8)
+            train_ids = df['item_id'].astype(str).tolist()
+            train_texts = await read_texts_by_id(session, train_ids)
+        logger.info(f'Training on {len(train_ids):,} labelled items ({labels.sum():,} included)')
+
+        # CPU-bound, keep the event loop that is shared by all async actors of this worker responsive
+        model, metrics = await asyncio.to_thread(
+            train_model,
+            texts=[train_texts.get(item_id) or '' for item_id in train_ids],
+            labels=labels,
+            max_features=max_features,
+            n_jobs=settings.PIPES.PRIORITY_TRAINING_JOBS,
+        )
+        logger.info(f'Model metrics: {metrics}')
+        del train_texts
+
+        nql_filter = None if query is None else TypeAdapter(NQLFilter).validate_python(query)
+        batch_ids: list[list[str]] = []
+        batch_scores: list[np.ndarray] = []
+        async with db_engine.session() as session:
+            async for item_ids, texts in stream_candidate_texts(session, project_id=project_id, query=nql_filter, exclude=set(train_ids)):
+                batch_ids.append(item_ids)
+                batch_scores.append(await asyncio.to_thread(score_texts, model, texts))
+        candidate_ids = np.array([item_id for item_ids in batch_ids for item_id in item_ids], dtype=object)
+        scores = np.concatenate(batch_scores) if batch_scores else np.zeros(0)
+        logger.info(f'Ranked {len(candidate_ids):,} candidates')
+
+        order = np.argsort(-scores, kind='stable')
+        prioritised_ids = candidate_ids[order[:n_predictions]].tolist()
+
+        out_dir = settings.PIPES.priority_dir / priority_id
+        metrics = {**metrics, 'n_candidates': len(candidate_ids), 'incl': incl, 'scope_ids': scope_ids, 'task_id': task_id}
+        await asyncio.to_thread(write_artefacts, out_dir, model=model, metrics=metrics, candidate_ids=candidate_ids, scores=scores, order=order)
+
+        async with db_engine.session() as session:
+            priority = await session.get(Priority, priority_id)
+            priority.prioritised_ids = prioritised_ids  # type: ignore[union-attr]
+            priority.time_ready = datetime.datetime.now()  # type: ignore[union-attr]
+            await session.commit()
+        logger.info(f'Stored {len(prioritised_ids):,} prioritised items and artefacts in {out_dir}')
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any
+
+import dramatiq
+from nacsos_data.db import get_engine_async
+from nacsos_data.db.schemas import AnnotationQuality, AnnotationScheme, AssignmentScope
+from nacsos_data.util.errors import NotFoundError
+from sqlalchemy import select, delete
+
+from server.pipelines.actor import NacsosActor
+
+# Annotator name of resolved labels (see `server.data.labels.read_label_rows()`)
+RESOLUTION = 'resolution'
+
+
+def _fingerprint_key(assignment_scope_id: str) -> str:
+    return f'nacsos:irr:{assignment_scope_id}:fingerprint'
+
+
+def fingerprint(rows: list[Any], bot_annotation_metadata_id: str | None) -> str:
+    """
+    Order-independent hash of the labels of a scope (and the resolution it is compared to), so that unchanged scopes are not recomputed.
+    """
+    labels = sorted('|'.join(str(v) for v in row) for row in rows)
+    return hashlib.sha1('\n'.join([str(bot_annotation_metadata_id), *labels]).encode()).hexdigest()
+
+
+# Columns of `AnnotationQuality` that are filled from the scores of `server.util.irr.irr_scores()` (or the task)
+QUALITY_FIELDS = frozenset(
+    [
+        'project_id',
+        'assignment_scope_id',
+        'bot_annotation_metadata_id',
+        'label_key',
+        'label_value',
+        'user_base',
+        'user_target',
+        'annotations_base',
+        'annotations_target',
+        'num_items',
+        'num_overlap',
+        'num_agree',
+        'num_disagree',
+        'perc_agree',
+        'cohen',
+        'fleiss',
+        'randolph',
+        'krippendorff',
+        'pearson',
+        'kendall',
+        'kendall_p',
+        'spearman',
+        'spearman_p',
+    ]
+)
+
+
+def to_orm(score: dict[str, Any], **fields: Any) -> AnnotationQuality:
+    values = {**score, **fields}
+    unknown = values.keys() - QUALITY_FIELDS
+    if unknown:
+        # never drop metrics silently, they would end up as NULL
+        raise KeyError(f'No column for IRR metric(s): {", ".join(sorted(unknown))}')
+    for user_field in ['user_base', 'user_target']:
+        if values.get(user_field) == RESOLUTION:
+            values[user_field] = None
+    return AnnotationQuality(**values)
+
+
+@dramatiq.actor(actor_class=NacsosActor, max_retries=0)
+async def compute_irr_task(assignment_scope_id: str | None = None, bot_annotation_metadata_id: str | None = None, force: bool = False) -> None:
+    logging.info('Received IRR task')
+    async with NacsosActor.exec_context() as (db_settings, logger, target_dir, work_dir, task_id, message_id):
+        if assignment_scope_id is None:
+            raise ValueError('assignment_scope_id is required here.')
+
+        # numpy-backed, only imported on first use to keep startup fast
+        from server.data.labels import read_label_rows
+        from server.data.redis_client import get_redis
+        from server.util.irr import irr_scores
+
+        db_engine = get_engine_async(settings=db_settings)
+        async with db_engine.session() as session:
+            project_id = (
+                await session.execute(
+                    select(AnnotationScheme.project_id)
+                    .join(AssignmentScope, AssignmentScope.annotation_scheme_id == AnnotationScheme.annotation_scheme_id)
+                    .where(AssignmentScope.assignment_scope_id == assignment_scope_id)
+                )
+            ).scalar_one_or_none()
+            if project_id is None:
+                raise NotFoundError(f'No assignment scope for id={assignment_scope_id}')
+
+            source_ids = [assignment_scope_id] + ([bot_annotation_metadata_id] if bot_annotation_metadata_id else [])
+            rows = [(annotator, item_id, key, value) for _, item_id, annotator, key, value in await read_label_rows(session=session, source_ids=source_ids)]
+
+            key = _fingerprint_key(assignment_scope_id)
+            current = fingerprint(rows, bot_annotation_metadata_id)
+            previous = await get_redis().get(key)
+            if not force and previous is not None and previous.decode() == current:
+                logger.info('Labels did not change since the last computation, keeping existing scores.')
+                return
+
+            logger.info(f'Computing IRR scores for {len(rows):,} labels')
+            # CPU-bound, keep the event loop that is shared by all async actors of this worker responsive
+            scores = await asyncio.to_thread(irr_scores, rows, pairwise_only=[RESOLUTION])
+
+            await session.execute(delete(AnnotationQuality).where(AnnotationQuality.assignment_scope_id == assignment_scope_id))
+            session.add_all(
+                [
+                    to_orm(
+                        score,
+                        project_id=project_id,
+                        assignment_scope_id=assignment_scope_id,
+                        bot_annotation_metadata_id=bot_annotation_metadata_id,
+                    )
+                    for score in scores
+                ]
+            )
+            await session.commit()
+            await get_redis().set(key, current)
+            logger.info(f'Stored {len(scores):,} IRR scores.')
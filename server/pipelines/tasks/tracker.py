@@ -0,0 +1,180 @@
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, TYPE_CHECKING
+
+import dramatiq
+from nacsos_data.db import get_engine_async
+from nacsos_data.db.schemas import AnnotationTracker
+from nacsos_data.util.errors import NotFoundError
+from sqlalchemy import select
+
+from server.pipelines.actor import NacsosActor
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Previous scores are only extended if none of these tracker parameters changed
+SCORE_PARAMS = ('n_items_total', 'recall_target', 'bias', 'batch_size', 'confidence_level')
+
+
+def _state_key(tracker_id: str) -> str:
+    return f'nacsos:tracker:{tracker_id}:state'
+
+
+def labels_hash(labels: 'np.ndarray') -> str:
+    import numpy as np
+
+    return hashlib.sha1(labels.astype(np.int8).tobytes()).hexdigest()
+
+
+def buscar_positions(n_labels: int, batch_size: int, start: int = 0) -> list[int]:
+    """
+    Positions after `start` that BUSCAR scores are reported for (as by `retrospective_h0()`): after every full batch and after the last label.
+    """
+    positions = list(range((start // batch_size + 1) * batch_size, n_labels + 1, batch_size))
+    if n_labels > start and (not positions or positions[-1] != n_labels):
+        positions.append(n_labels)
+    return positions
+
+
+def buscar_scores(
+    labels: 'np.ndarray',
+    n_docs: int,
+    recall_target: float,
+    bias: float,
+    batch_size: int,
+    confidence_level: float,
+    start: int = 0,
+) -> list[tuple[int, float | None]]:
+    """
+    BUSCAR scores (`retrospective_h0()` of nacsos_data) for all positions after `start`.
+    Scores at a position only depend on the labels up to it, so a longer sequence with the same prefix only needs the new positions.
+    """
+    from nacsos_data.util.annotations.evaluation.buscar import retrospective_h0
+
+    scores = []
+    for n_seen in buscar_positions(labels.shape[0], batch_size=batch_size, start=start):
+        # one batch spanning all labels up to `n_seen` yields the score at exactly this position
+        _, ps = retrospective_h0(
+            labels_=labels[:n_seen].tolist(),
+            n_docs=n_docs,
+            recall_target=recall_target,
+            bias=bias,
+            batch_size=n_seen,
+            confidence_level=confidence_level,
+        )
+        scores.append((n_seen, ps[-1]))
+    return scores
+
+
+def score_labels(
+    labels: 'np.ndarray',
+    n_docs: int,
+    recall_target: float,
+    bias: float,
+    batch_size: int,
+    confidence_level: float,
+    previous: list[tuple[int, float | None]] | None = None,
+    frontier: list[Any] | None = None,
+) -> tuple[Any, list[tuple[int, float | None]], list[Any]]:
+    """
+    Recall curve, BUSCAR stopping scores, and recall frontier for the flat label sequence of a tracker.
+    If the `previous` BUSCAR scores belong to a prefix of `labels` (and the same parameters), only scores for new positions are computed;
+    `previous` must only contain scores of full batches.
+    A `frontier` is returned as is, pass it only if it was computed for exactly these labels and parameters.
+
+    :return: (recall, buscar, buscar_frontier) as stored in `AnnotationTracker`
+    """
+    # numpy/scipy-backed, only imported on first use to keep startup fast
+    from nacsos_data.util.annotations.evaluation.buscar import compute_recall, recall_frontier
+
+    flat_labels = labels.tolist()
+    # recall is relative to the current number of includes, so it changes everywhere anyway (and is a cheap cumulative sum)
+    recall = compute_recall(labels_=flat_labels)
+
+    kept = [(int(pos), p) for pos, p in previous or []]
+    start = kept[-1][0] if kept else 0
+    buscar = kept + buscar_scores(
+        labels, n_docs=n_docs, recall_target=recall_target, bias=bias, batch_size=batch_size, confidence_level=confidence_level, start=start
+    )
+
+    if frontier is None:
+        # every point of the frontier tests a recall target against the full sequence, so it cannot be extended for new labels
+        # and is recomputed whenever the labels changed
+        frontier = list(zip(*recall_frontier(labels_=flat_labels, n_docs=n_docs, bias=bias), strict=False))
+
+    return recall, buscar, frontier
+
+
+async def read_previous_scores(tracker: AnnotationTracker, labels: 'np.ndarray', params: list[Any]) -> tuple[list[tuple[int, float | None]], bool] | None:
+    """
+    BUSCAR scores of the tracker that are still valid for `labels` and whether the labels are unchanged since they were computed,
+    or None if everything has to be recomputed.
+    """
+    from server.data.redis_client import get_redis
+
+    state = await get_redis().get(_state_key(str(tracker.annotation_tracking_id)))
+    if state is None or not tracker.buscar:
+        return None
+    state = json.loads(state)
+    n_labels = state['n_labels']
+    if state['params'] != params or n_labels > labels.shape[0] or state['labels_hash'] != labels_hash(labels[:n_labels]):
+        return None
+    # the score after the last (partial) batch changes once that batch fills up, so only scores of full batches are kept
+    return [(pos, p) for pos, p in tracker.buscar if pos <= n_labels and pos % tracker.batch_size == 0], n_labels == labels.shape[0]
+
+
+async def write_scores_state(tracker_id: str, labels: 'np.ndarray', params: list[Any]) -> None:
+    from server.data.redis_client import get_redis
+
+    state = {'n_labels': int(labels.shape[0]), 'labels_hash': labels_hash(labels), 'params': params}
+    await get_redis().set(_state_key(tracker_id), json.dumps(state), ex=90 * 24 * 60 * 60)
+
+
+@dramatiq.actor(actor_class=NacsosActor, max_retries=0)
+async def populate_tracker_task(tracker_id: str | None = None, incremental: bool = True) -> None:
+    logging.info('Received tracker task')
+    async with NacsosActor.exec_context() as (db_settings, logger, target_dir, work_dir, task_id, message_id):
+        if tracker_id is None:
+            raise ValueError('tracker_id is required here.')
+
+        db_engine = get_engine_async(settings=db_settings)
+        async with db_engine.session() as session:
+            tracker = (await session.scalars(select(AnnotationTracker).where(AnnotationTracker.annotation_tracking_id == tracker_id))).one_or_none()
+            if tracker is None:
+                raise NotFoundError(f'No tracker for id={tracker_id}')
+
+            if not tracker.labels:
+                logger.info('Tracker has no labels, nothing to score.')
+                return
+
+            import numpy as np
+
+            labels = np.array([lab for batch in tracker.labels for lab in batch], dtype=np.int8)
+            params = [getattr(tracker, param) for param in SCORE_PARAMS]
+            state = await read_previous_scores(tracker, labels=labels, params=params) if incremental else None
+            previous, unchanged = state if state is not None else (None, False)
+            frontier = tracker.buscar_frontier if unchanged and tracker.buscar_frontier else None
+            if previous is None:
+                logger.info(f'Scoring {labels.shape[0]:,} labels from scratch')
+            else:
+                logger.info(f'Scoring {labels.shape[0]:,} labels, reusing {len(previous):,} BUSCAR scores' + (' and the recall frontier' if frontier else ''))
+
+            # scoring is CPU-bound, keep the event loop that is shared by all async actors of this worker responsive
+            tracker.recall, tracker.buscar, tracker.buscar_frontier = await asyncio.to_thread(
+                score_labels,
+                labels=labels,
+                n_docs=tracker.n_items_total,
+                recall_target=tracker.recall_target,
+                bias=tracker.bias,
+                batch_size=tracker.batch_size,
+                confidence_level=tracker.confidence_level,
+                previous=previous,
+                frontier=frontier,
+            )
+            await session.commit()
+            await write_scores_state(tracker_id, labels=labels, params=params)
+            logger.info('Stored tracker scores.')
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar, Hashable
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Small in-process cache where entries expire after `ttl` seconds.
+    Once more than `maxsize` entries are stored, the least recently used ones are dropped.
+
+    Note, that every worker process has its own instance, so `invalidate()` only affects the
+    current process; the `ttl` is the upper bound for how long other workers may serve stale data.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Store `value`, for at most `ttl` seconds if given (e.g. until the value itself expires), never longer than the cache's `ttl`.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K, V], bool]) -> None:
+        for key in [key for key, (_, value) in self._data.items() if predicate(key, value)]:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+__all__ = ['TTLCache']
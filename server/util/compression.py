@@ -0,0 +1,147 @@
+import zlib
+from typing import Any, Protocol
+
+try:
+    # standard library from Python 3.14 on
+    from compression import zstd
+except ImportError:  # pragma: no cover
+    zstd = None  # type: ignore[assignment]
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Server-side preference if the client accepts several encodings equally
+PREFERENCE = ('zstd', 'br', 'gzip')
+
+# Media types that are compressed already (or do not compress well), matched by prefix
+INCOMPRESSIBLE = (
+    'application/zip',
+    'application/gzip',
+    'application/x-gzip',
+    'application/zstd',
+    'application/x-bzip2',
+    'application/x-7z-compressed',
+    'application/vnd.apache.parquet',
+    'application/x-parquet',
+    'application/pdf',
+    'application/octet-stream',
+    'image/',
+    'audio/',
+    'video/',
+    'font/woff',
+)
+
+
+# Compression levels per encoding and content type (prefix), `*` is the fallback
+DEFAULT_LEVELS: dict[str, dict[str, int]] = {
+    'gzip': {'*': 6, 'application/x-ndjson': 4, 'text/csv': 6},
+    'br': {'*': 4, 'application/x-ndjson': 3},
+    'zstd': {'*': 3, 'application/json': 6},
+}
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes, flush: bool = False) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        out = self._compressor.compress(data)
+        if flush:
+            out += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        out: bytes = self._compressor.process(data)
+        if flush:
+            out += self._compressor.flush()
+        return out
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()  # type: ignore[no-any-return]
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstd.ZstdCompressor(level=level)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        mode = zstd.ZstdCompressor.FLUSH_BLOCK if flush else zstd.ZstdCompressor.CONTINUE
+        return self._compressor.compress(data, mode=mode)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(mode=zstd.ZstdCompressor.FLUSH_FRAME)
+
+
+ENCODERS: dict[str, type[Any]] = {'gzip': GzipEncoder}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+if zstd is not None:
+    ENCODERS['zstd'] = ZstdEncoder
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """
+    Pick the best encoding from an `Accept-Encoding` header that we support.
+
+    :return: name of the encoding, or None if the response should not be compressed
+    """
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+
+    wildcard = accepted.get('*', 0.0)
+    candidates = [(accepted.get(name, wildcard), -i, name) for i, name in enumerate(PREFERENCE) if name in ENCODERS]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return not any(content_type.startswith(prefix) for prefix in INCOMPRESSIBLE)
+
+
+def get_level(levels: dict[str, dict[str, int]], encoding: str, content_type: str) -> int:
+    """
+    Compression level for a response, the most specific matching content type (prefix) wins.
+    """
+    by_type = levels.get(encoding, {})
+    content_type = content_type.split(';')[0].strip().lower()
+    matches = [prefix for prefix in by_type if prefix != '*' and content_type.startswith(prefix)]
+    if matches:
+        return by_type[max(matches, key=len)]
+    return by_type.get('*', DEFAULT_LEVELS[encoding]['*'])
+
+
+def make_encoder(encoding: str, level: int) -> Encoder:
+    return ENCODERS[encoding](level)  # type: ignore[no-any-return]
+
+
+def compress(encoding: str, data: bytes, level: int) -> bytes:
+    encoder = make_encoder(encoding, level)
+    return encoder.compress(data) + encoder.finish()
+
+
+__all__ = ['negotiate', 'is_compressible', 'get_level', 'make_encoder', 'compress', 'Encoder', 'ENCODERS', 'DEFAULT_LEVELS']
@@ -0,0 +1,80 @@
+import hashlib
+import inspect
+import functools
+from typing import Any, Awaitable, Callable, ParamSpec, get_type_hints
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+P = ParamSpec('P')
+
+# Responses depend on the logged-in user, so only the browser may keep them, and it has to revalidate every time.
+CACHE_CONTROL = 'private, no-cache'
+
+# Name of the parameter that `with_request()` adds to route handlers
+REQUEST_PARAM = 'conditional_request_'
+
+
+def make_etag(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode()
+    return f'"{hashlib.sha1(data).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Checks the `If-None-Match` header of the request against `etag` (weak comparison, as mandated for GET/HEAD).
+    """
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+
+def json_response(content: bytes, etag: str) -> Response:
+    return Response(content=content, media_type='application/json', headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+
+def with_request(fn: Callable[..., Any], wrapper: Callable[..., Any]) -> None:
+    """
+    Expose the signature of `fn` plus a keyword-only `Request` parameter on `wrapper`, so that FastAPI injects the request.
+    The wrapper has to pop `REQUEST_PARAM` from its keyword arguments before calling `fn`.
+    """
+    signature = inspect.signature(fn)
+    parameters = [*signature.parameters.values(), inspect.Parameter(REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request)]
+    wrapper.__signature__ = signature.replace(parameters=parameters)  # type: ignore[attr-defined]
+
+
+def conditional(fn: Callable[P, Awaitable[Any]]) -> Callable[P, Awaitable[Any]]:
+    """
+    Decorator for route handlers to answer with `304 Not Modified` if the client already has the current response.
+    The ETag is a hash of the serialised response, so this only saves the transfer; for routes that use
+    the shared response cache, `response_cache.cached()` derives ETags from versions instead, which also saves the work.
+    """
+    adapter: TypeAdapter[Any] | None = None
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> Response:
+        nonlocal adapter
+        request: Request = kwargs.pop(REQUEST_PARAM)  # type: ignore[assignment]
+        result = await fn(*args, **kwargs)
+        if adapter is None:
+            adapter = TypeAdapter(get_type_hints(fn)['return'])
+        content = adapter.dump_json(result, by_alias=True)
+        etag = make_etag(content)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return json_response(content, etag)
+
+    with_request(fn, wrapper)
+    return wrapper
+
+
+__all__ = ['conditional', 'with_request', 'make_etag', 'etag_matches', 'not_modified', 'json_response', 'REQUEST_PARAM']
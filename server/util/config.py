@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 import secrets
 import json
 import toml
@@ -21,14 +21,35 @@ class ServerConfig(BaseModel):
     OPENAPI_PREFIX: str = ''  # see https://fastapi.tiangolo.com/advanced/behind-a-proxy/
     ROOT_PATH: str = ''  # see https://fastapi.tiangolo.com/advanced/behind-a-proxy/
 
-    HASH_ALGORITHM: str = 'HS256'
+    HASH_ALGORITHM: Literal['HS256', 'HS384', 'HS512'] = 'HS256'  # HMAC used to sign access tokens
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # = 8 days
+    # Issue signed (JWT) access tokens that are validated without a database lookup.
+    # Requires a fixed SECRET_KEY, otherwise every worker signs with its own random key (checked at startup)!
+    SIGNED_TOKENS: bool = False
+    TOKEN_REVOCATION_REFRESH: int = 10  # seconds between syncs of the token revocation list from redis
+    TOKEN_REVOCATION_MAX_AGE: int = 300  # signed tokens are rejected if the revocation list could not be synced for this long
 
     HEADER_CORS: bool = False  # set to true to allow CORS
     HEADER_TRUSTED_HOST: bool = False  # set to true to allow hosts from any origin
     CORS_ORIGINS: list[str] = []  # list of trusted hosts
 
+    PROJECT_CACHE_TTL: int = 300  # seconds to keep project metadata in the per-process cache (0 to disable)
+    AUTH_CACHE_TTL: int = 60  # seconds to keep authenticated users and their project permissions cached (0 to disable)
+    METRICS_TOKEN: str | None = None  # bearer token for scraping `/api/metrics` (superusers can always read them)
+    SLOW_QUERY_THRESHOLD: float = 1.0  # log SQL statements taking longer than this many seconds (negative to disable)
+    PROFILING: bool = True  # allow superusers to profile single requests (`X-Profile` header or `_profile` query flag)
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # seconds between stack samples of the profiler
+    RESPONSE_CACHE_TTL: int = 3600  # seconds to keep cached responses in redis (0 to disable the shared response cache)
+    RESPONSE_CACHE_L1_SIZE: int = 256  # number of cached responses each worker keeps in memory
+    RESPONSE_CACHE_VERSION_TTL: float = 2.0  # seconds each worker may use a cache tag version before checking redis again
+    COMPRESSION_MINIMUM_SIZE: int = 1000  # responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_OFFLOAD_SIZE: int = 262144  # bodies (or chunks) larger than this many bytes are compressed in a worker thread
+    # compression levels per encoding and content type, e.g. {"gzip": {"text/csv": 9}}; merged with the defaults
+    COMPRESSION_LEVELS: dict[str, dict[str, int]] = {}
+    PRIORITY_FRAME_CACHE_TTL: int = 900  # seconds each worker keeps wide export frames of priority previews (0 to disable)
+    PRIORITY_FRAME_CACHE_SIZE: int = 16  # number of wide export frames each worker keeps in memory
+
     @field_validator('CORS_ORIGINS', mode='before')
     @classmethod
     def assemble_cors_origins(cls, v: str | list[str]) -> str | list[str]:
@@ -42,6 +63,12 @@ class ServerConfig(BaseModel):
             return v
         raise ValueError(v)
 
+    @model_validator(mode='after')
+    def check_secret_key(self) -> 'ServerConfig':
+        if self.SIGNED_TOKENS and 'SECRET_KEY' not in self.model_fields_set:
+            raise ValueError('SIGNED_TOKENS requires an explicitly configured SECRET_KEY shared by all workers.')
+        return self
+
 
 class EmailConfig(BaseModel):
     ENABLED: bool = False
@@ -69,10 +96,14 @@ class PipelinesConfig(BaseModel):
     USERNAME: str | None = None
     USER_ID: str | None = None
     REDIS_URL: str = 'redis://localhost:6379/0'
+    REDIS_TIMEOUT: float = 2.0  # seconds until a redis command (or connecting) of the shared client fails, so that callers can bypass redis
 
     DATA_PATH: Path = Path('.tasks')  # Where results and the job database will be stored.
     WORKING_DIR: Path = Path('.tasks/tmp')  # Directory for temporary files
 
+    IMPORT_WORKERS: int = 4  # Processes that parse the source files of an import in parallel (1 to parse them one after another)
+    PRIORITY_TRAINING_JOBS: int = 2  # Processes that fit the cross-validation folds of a priority model in parallel (1 to fit them one after another)
+
     @property
     def target_dir(self) -> Path:
         return (self.DATA_PATH / 'artefacts').resolve()
@@ -85,6 +116,14 @@ class PipelinesConfig(BaseModel):
     def priority_dir(self) -> Path:
         return (self.DATA_PATH / 'priority').resolve()
 
+    @property
+    def imports_dir(self) -> Path:
+        return (self.DATA_PATH / 'imports').resolve()
+
+    @property
+    def profiles_dir(self) -> Path:
+        return (self.DATA_PATH / 'profiles').resolve()
+
     @model_validator(mode='before')
     @classmethod
     def fix_paths(cls, data: Any) -> Any:
@@ -123,6 +162,8 @@ class Settings(BaseSettings):
 
     LOG_CONF_FILE: str = 'config/logging.toml'
     LOGGING_CONF: dict[str, Any] | None = None
+    # Hand log records to background threads (QueueHandler/QueueListener), so that slow sinks never block the event loop
+    LOG_QUEUE: bool = False
 
     @field_validator('LOGGING_CONF', mode='before')
     @classmethod
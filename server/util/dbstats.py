@@ -0,0 +1,87 @@
+import re
+import json
+import time
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from server.util.config import settings
+
+logger = logging.getLogger('nacsos.sql.slow')
+
+
+@dataclass
+class QueryStats:
+    """
+    Database usage of a single request, filled by the engine event hooks below.
+    """
+
+    queries: int = 0
+    time: float = 0.0  # seconds
+    path: str | None = None  # request path, for the slow query log
+
+
+# Stats of the request currently being processed (set by the TimingMiddleware)
+current_query_stats: ContextVar[QueryStats | None] = ContextVar('current_query_stats', default=None)
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r'(?<![\w$])\d+(?:\.\d+)?\b')
+_RE_LIST = re.compile(r'\((?:\s*(?:\?|%\([^)]+\)s|\$\d+)\s*,)+\s*(?:\?|%\([^)]+\)s|\$\d+)\s*\)')
+_RE_WHITESPACE = re.compile(r'\s+')
+
+
+def normalise_statement(statement: str) -> str:
+    """
+    Reduce a statement to its shape, so that the same query with different values groups together:
+    literals become `?`, lists of placeholders become `(...)`, and whitespace is collapsed.
+    """
+    statement = _RE_STRING.sub('?', statement)
+    statement = _RE_NUMBER.sub('?', statement)
+    statement = _RE_LIST.sub('(...)', statement)
+    return _RE_WHITESPACE.sub(' ', statement).strip()
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.time += duration
+
+    threshold = settings.SERVER.SLOW_QUERY_THRESHOLD
+    if 0 <= threshold <= duration:
+        logger.warning(
+            json.dumps(
+                {
+                    'event': 'slow_query',
+                    'duration_ms': round(duration * 1000, 2),
+                    'path': stats.path if stats is not None else None,
+                    'executemany': executemany,
+                    'statement': normalise_statement(statement),
+                }
+            )
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Attach query timing hooks to a (sync) engine; for async engines pass `engine.sync_engine`.
+    """
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+__all__ = ['QueryStats', 'current_query_stats', 'normalise_statement', 'instrument_engine']
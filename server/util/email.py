@@ -1,25 +1,12 @@
 import logging
 from email.message import EmailMessage
-
-from aiosmtplib import (
-    SMTP,
-    SMTPResponseException,
-    SMTPSenderRefused,
-    SMTPRecipientsRefused,
-    SMTPException,
-    SMTPAuthenticationError,
-    SMTPNotSupported,
-    SMTPConnectTimeoutError,
-    SMTPConnectError,
-    SMTPConnectResponseError,
-    SMTPServerDisconnected,
-    SMTPHeloError,
-    SMTPTimeoutError,
-    SMTPResponse,
-)
+from typing import TYPE_CHECKING
 
 from server.util.config import settings
 
+if TYPE_CHECKING:
+    from aiosmtplib import SMTPResponse
+
 logger = logging.getLogger('server.util.email')
 
 
@@ -56,12 +43,12 @@ async def send_message(
     subject: str,
     message: str,
     sender: str | None = None,
-) -> tuple[dict[str, SMTPResponse], str]:
+) -> tuple[dict[str, 'SMTPResponse'], str]:
     email = construct_email(sender=sender, recipients=recipients, bcc=bcc, subject=subject, message=message)
     return await send_email(email)
 
 
-async def send_email(email: EmailMessage, fail_on_error: bool = False) -> tuple[dict[str, SMTPResponse], str]:
+async def send_email(email: EmailMessage, fail_on_error: bool = False) -> tuple[dict[str, 'SMTPResponse'], str]:
     if not settings.EMAIL.ENABLED:
         raise EmailNotSentError(f'Mailing system inactive, email with subject "{email["Subject"]}" not sent to {email["To"]} (Bcc: {email["Bcc"]})')
 
@@ -69,6 +56,22 @@ async def send_email(email: EmailMessage, fail_on_error: bool = False) -> tuple[
         del email['From']
         email['From'] = settings.EMAIL.SENDER
 
+    from aiosmtplib import (
+        SMTP,
+        SMTPResponseException,
+        SMTPSenderRefused,
+        SMTPRecipientsRefused,
+        SMTPException,
+        SMTPAuthenticationError,
+        SMTPNotSupported,
+        SMTPConnectTimeoutError,
+        SMTPConnectError,
+        SMTPConnectResponseError,
+        SMTPServerDisconnected,
+        SMTPHeloError,
+        SMTPTimeoutError,
+    )
+
     client = SMTP(
         hostname=settings.EMAIL.SMTP_HOST,
         port=settings.EMAIL.SMTP_PORT,
@@ -81,7 +84,7 @@ async def send_email(email: EmailMessage, fail_on_error: bool = False) -> tuple[
 
     logger.debug(f'Trying to send email to {email["To"]} with subject "{email["Subject"]}"')
     async with client as connection:
-        status: tuple[dict[str, SMTPResponse], str] | None = None
+        status: tuple[dict[str, 'SMTPResponse'], str] | None = None
         try:
             status = await connection.send_message(email)
             logger.debug(status)
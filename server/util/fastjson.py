@@ -0,0 +1,60 @@
+import functools
+from typing import Any, Iterable, Mapping, Sequence
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialise plain python data (dicts, lists, UUIDs, datetimes, enums, ...) to JSON in one go.
+    Uses orjson (a dependency, but optional here) if it is installed, pydantic-core otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(obj)
+
+
+class FastJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+@functools.cache
+def _list_adapter(Model: type[BaseModel]) -> TypeAdapter[list[Any]]:
+    return TypeAdapter(list[Model])  # type: ignore[valid-type]
+
+
+@functools.cache
+def _defaults(Model: type[BaseModel]) -> dict[str, Any]:
+    return {name: field.get_default(call_default_factory=True) for name, field in Model.model_fields.items() if not field.is_required()}
+
+
+def models_response(Model: type[BaseModel], models: Sequence[BaseModel]) -> Response:
+    """
+    Serialise a list of (already valid) models in bulk.
+    Returning a `Response` skips FastAPI's `response_model` handling, which would dump every model to a dict,
+    validate it again, and only then serialise it.
+    """
+    return Response(content=_list_adapter(Model).dump_json(list(models), by_alias=True, warnings=False), media_type='application/json')
+
+
+def rows_response(Model: type[BaseModel], rows: Iterable[Mapping[str, Any]]) -> Response:
+    """
+    Serialise SQL result mappings straight to JSON in the shape of `Model`, without creating any model instances.
+    Only use this where the database types already match the model (no validators or computed fields).
+    """
+    fields = list(Model.model_fields.keys())
+    defaults = _defaults(Model)
+    return FastJSONResponse([{**defaults, **{key: row[key] for key in fields if key in row}} for row in rows])
+
+
+__all__ = ['json_dumps', 'FastJSONResponse', 'models_response', 'rows_response']
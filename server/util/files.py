@@ -1,7 +1,13 @@
 import os
 from pathlib import Path
+from typing import Any, TypedDict
 from zipfile import ZipFile
 
+from fastapi import status as http_status
+
+# Upper bound of rows in a table preview
+PREVIEW_MAX_ROWS = 1000
+
 
 class MissingFileError(FileNotFoundError):
     """
@@ -11,6 +17,17 @@ class MissingFileError(FileNotFoundError):
     pass
 
 
+class InvalidPreviewError(ValueError):
+    status = http_status.HTTP_400_BAD_REQUEST
+
+
+class TablePreview(TypedDict):
+    columns: list[str]
+    rows: list[list[Any]]
+    # Total number of rows, if known without reading the whole file (Parquet only)
+    num_rows: int | None
+
+
 def get_outputs_flat(root: Path, base: Path, include_fsize: bool = True) -> list[tuple[str, int] | str]:
     """
     Get a list of all files associated with task `task_id`—optionally including the filesize.
@@ -70,3 +87,65 @@ def zip_folder(path: Path, target_file: str) -> None:
         for file in files:
             files_.append(f'{root}/{file}')
     zip_files(files_, target_file=target_file)
+
+
+def resolve_file(root: Path, filename: str, base: Path | None = None) -> Path:
+    """
+    Absolute path of `filename` (relative to `base`, as listed by `get_outputs_flat()`), which has to be a file within `root`.
+    """
+    path = ((root if base is None else base) / filename).resolve()
+    if not path.is_relative_to(root.resolve()) or not path.is_file():
+        raise MissingFileError(f'No file named {filename}')
+    return path
+
+
+def _check_columns(requested: list[str] | None, available: list[str]) -> list[str]:
+    if not requested:
+        return available
+    missing = [column for column in requested if column not in available]
+    if missing:
+        raise InvalidPreviewError(f'Unknown columns {missing}, available are {available}')
+    return requested
+
+
+def read_table_preview(path: Path, limit: int = 20, columns: list[str] | None = None) -> TablePreview:
+    """
+    First `limit` rows of a CSV or Parquet file (optionally only some `columns`) without reading the rest of it.
+    Parquet files are memory-mapped and only decoded up to the row group that contains the last requested row.
+    """
+    # pandas/pyarrow are heavy, only imported on first use to keep startup fast
+    import pandas as pd
+
+    kind = next((suffix for suffix in reversed(path.suffixes) if suffix in {'.csv', '.tsv', '.parquet', '.pq'}), None)
+    num_rows: int | None = None
+    if kind in {'.parquet', '.pq'}:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise InvalidPreviewError(f'Previews of Parquet files are not available on this server (pyarrow is not installed), cannot read {path.name}')
+
+        pf = pq.ParquetFile(path, memory_map=True)
+        num_rows = pf.metadata.num_rows
+        columns = _check_columns(columns, pf.schema_arrow.names)
+        batches = []
+        n_read = 0
+        for batch in pf.iter_batches(batch_size=limit, columns=columns):
+            batches.append(batch)
+            n_read += batch.num_rows
+            if n_read >= limit:
+                break
+        table = pa.Table.from_batches(batches) if batches else pf.schema_arrow.empty_table()
+        df = table.select(columns).slice(0, limit).to_pandas()
+    elif kind in {'.csv', '.tsv'}:
+        sep = '\t' if kind == '.tsv' else ','
+        columns = _check_columns(columns, [str(column) for column in pd.read_csv(path, sep=sep, nrows=0).columns])
+        df = pd.read_csv(path, sep=sep, nrows=limit, usecols=columns)[columns]
+    else:
+        raise InvalidPreviewError(f'Previews are only available for CSV and Parquet files, not for {path.name}')
+
+    return TablePreview(
+        columns=columns,
+        rows=df.astype(object).where(df.notna(), None).to_numpy().tolist(),
+        num_rows=num_rows,
+    )
@@ -0,0 +1,226 @@
+import re
+import difflib
+import functools
+from typing import Any, Callable, Mapping, Sequence
+
+import numpy as np
+from fastapi import status as http_status
+
+# `key:value` terms, combined with `&`/`AND`, `|`/`OR`, `!`/`NOT`, and parentheses, e.g. `incl:1 & (topic:2 | topic:3)`
+RE_TOKEN = re.compile(r'\s*(?:(?P<term>[\w\-]+:[\w\-]+)|(?P<op>&|\||!|\(|\)|\bAND\b|\bOR\b|\bNOT\b))', re.IGNORECASE)
+
+OPERATORS = {'and': '&', 'or': '|', 'not': '!'}
+
+Columns = Mapping[str, np.ndarray]
+Evaluator = Callable[[Columns, int], np.ndarray]
+
+
+class InvalidRuleError(ValueError):
+    status = http_status.HTTP_400_BAD_REQUEST
+
+
+def normalise_term(term: str) -> str:
+    """
+    `incl:true` -> `incl:1`, `incl:false` -> `incl:0`, everything else as is.
+    """
+    key, _, value = term.partition(':')
+    value = {'true': '1', 'false': '0'}.get(value.lower(), value)
+    return f'{key}:{value}'
+
+
+def tokenise(rule: str) -> list[str]:
+    tokens = []
+    pos = 0
+    rule = rule.strip()
+    while pos < len(rule):
+        match = RE_TOKEN.match(rule, pos)
+        if match is None:
+            raise InvalidRuleError(f'Unexpected `{rule[pos:].strip()[:20]}` at position {pos} in inclusion rule `{rule}`')
+        if match['term']:
+            tokens.append(normalise_term(match['term']))
+        else:
+            tokens.append(OPERATORS.get(match['op'].lower(), match['op']))
+        pos = match.end()
+    if not tokens:
+        raise InvalidRuleError('Inclusion rule is empty')
+    return tokens
+
+
+def _combine(op: np.ufunc, parts: list[Evaluator]) -> Evaluator:
+    def evaluate(cols: Columns, n: int) -> np.ndarray:
+        # accumulate in place instead of stacking all operands into one 2D array
+        out = np.array(parts[0](cols, n), dtype=bool, copy=True)
+        for part in parts[1:]:
+            op(out, part(cols, n), out=out)
+        return out
+
+    return evaluate
+
+
+class _Parser:
+    """
+    Recursive descent parser, precedence from low to high: `|`, `&`, `!`.
+    """
+
+    def __init__(self, rule: str):
+        self.rule = rule
+        self.tokens = tokenise(rule)
+        self.pos = 0
+        self.terms: list[str] = []
+
+    def peek(self) -> str | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise InvalidRuleError(f'Unexpected end of inclusion rule `{self.rule}`')
+        self.pos += 1
+        return token
+
+    def parse(self) -> Evaluator:
+        fn = self.parse_or()
+        if self.peek() is not None:
+            raise InvalidRuleError(f'Unexpected `{self.peek()}` in inclusion rule `{self.rule}`')
+        return fn
+
+    def parse_or(self) -> Evaluator:
+        parts = [self.parse_and()]
+        while self.peek() == '|':
+            self.take()
+            parts.append(self.parse_and())
+        if len(parts) == 1:
+            return parts[0]
+        return _combine(np.logical_or, parts)
+
+    def parse_and(self) -> Evaluator:
+        parts = [self.parse_not()]
+        while self.peek() == '&':
+            self.take()
+            parts.append(self.parse_not())
+        if len(parts) == 1:
+            return parts[0]
+        return _combine(np.logical_and, parts)
+
+    def parse_not(self) -> Evaluator:
+        if self.peek() == '!':
+            self.take()
+            inner = self.parse_not()
+            return lambda cols, n: ~inner(cols, n)
+        return self.parse_atom()
+
+    def parse_atom(self) -> Evaluator:
+        token = self.take()
+        if token == '(':
+            inner = self.parse_or()
+            if self.take() != ')':
+                raise InvalidRuleError(f'Missing `)` in inclusion rule `{self.rule}`')
+            return inner
+        if ':' not in token:
+            raise InvalidRuleError(f'Unexpected `{token}` in inclusion rule `{self.rule}`')
+        self.terms.append(token)
+
+        def term(cols: Columns, n: int) -> np.ndarray:
+            column = cols.get(token)
+            if column is None:
+                return np.zeros(n, dtype=bool)
+            return np.asarray(column, dtype=bool)
+
+        return term
+
+
+class InclusionRule:
+    """
+    Compiled inclusion rule that evaluates to a boolean mask over columns of `key:value` label flags.
+    Terms without a column (label never assigned) are all-False.
+    """
+
+    def __init__(self, rule: str):
+        parser = _Parser(rule)
+        self.rule = rule
+        self._evaluate = parser.parse()
+        self.terms = tuple(dict.fromkeys(parser.terms))
+
+    def __call__(self, columns: Columns, n: int) -> np.ndarray:
+        return self._evaluate(columns, n)
+
+    def resolve(self, columns: Sequence[str]) -> dict[str, tuple[str, str | None]]:
+        """
+        Find the column for every term of the rule: either a flag column named `key:value`,
+        or a column named `key` that has to equal `value`.
+
+        :return: term -> (column, value to compare to or None for flag columns)
+        """
+        available = set(columns)
+        resolved: dict[str, tuple[str, str | None]] = {}
+        for term in self.terms:
+            key, _, value = term.partition(':')
+            if term in available:
+                resolved[term] = (term, None)
+            elif key in available:
+                resolved[term] = (key, value)
+            else:
+                suggestions = difflib.get_close_matches(term, list(columns), n=3) or sorted(columns)[:10]
+                raise InvalidRuleError(f'No label column for `{term}` in inclusion rule `{self.rule}`, did you mean: {", ".join(suggestions)}?')
+        return resolved
+
+    def mask(self, df: Any, label_cols: Sequence[str]) -> np.ndarray:
+        """
+        Evaluate the rule on the label columns of a data frame (e.g. from `wide_export_table()`).
+        Flag columns count as True where they are positive, missing values count as False.
+        """
+        columns = {}
+        for term, (column, value) in self.resolve(label_cols).items():
+            values = df[column].to_numpy()
+            try:
+                if values.dtype.kind != 'f':
+                    values = values.astype(np.float64)
+                # NaN compares False
+                columns[term] = (values > 0) if value is None else (values == float(value))
+            except (TypeError, ValueError):
+                columns[term] = values.astype(str) == (value or 'True')
+        return self(columns, df.shape[0])
+
+    def labelled(self, df: Any, label_cols: Sequence[str]) -> np.ndarray:
+        """
+        Rows of a data frame that have a value in any of the columns the rule refers to,
+        other rows were never annotated for this rule and are neither included nor excluded.
+        """
+        columns = list(dict.fromkeys(column for column, _ in self.resolve(label_cols).values()))
+        return df[columns].notna().any(axis=1).to_numpy()
+
+
+@functools.lru_cache(maxsize=256)
+def compile_rule(rule: str) -> InclusionRule:
+    return InclusionRule(rule)
+
+
+def inclusion_mask(rule: str, df: Any, label_cols: Sequence[str]) -> np.ndarray:
+    """
+    Evaluate an inclusion rule on a wide export frame.
+    Rules the compiled evaluator does not understand are left to the (slower) reference implementation of nacsos_data;
+    if that fails as well, the error of the compiled rule is raised, as it is more helpful.
+    """
+    try:
+        return compile_rule(rule).mask(df, label_cols=label_cols)
+    except InvalidRuleError as e:
+        from nacsos_data.util.priority.mask import get_inclusion_mask
+
+        try:
+            return np.asarray(get_inclusion_mask(rule=rule, df=df, label_cols=label_cols))
+        except Exception:
+            raise e from None
+
+
+def labelled_mask(rule: str, df: Any, label_cols: Sequence[str]) -> np.ndarray:
+    """
+    Rows of a wide export frame that carry the labels of an inclusion rule (see `InclusionRule.labelled()`).
+    For rules the compiled evaluator does not understand, rows with any label count.
+    """
+    try:
+        return compile_rule(rule).labelled(df, label_cols=label_cols)
+    except InvalidRuleError:
+        return df[list(label_cols)].notna().any(axis=1).to_numpy()
+
+
+__all__ = ['InclusionRule', 'InvalidRuleError', 'compile_rule', 'inclusion_mask', 'labelled_mask', 'tokenise']
@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+import numpy as np
+
+
+@dataclass
+class LabelTensor:
+    """
+    Labels of a scope as annotator × item × label tensors, where labels are `key:value` pairs.
+    `rated[a, i, l]` is True if annotator `a` labelled item `i` for the key of label `l` (with any value),
+    `assigned[a, i, l]` is True if that value was `l`.
+    """
+
+    annotators: np.ndarray
+    items: np.ndarray
+    keys: np.ndarray
+    values: np.ndarray
+    rated: np.ndarray
+    assigned: np.ndarray
+
+
+def label_tensor(rows: Sequence[Any]) -> LabelTensor:
+    """
+    :param rows: `(annotator, item_id, key, value)` per label
+    """
+    annotators, items, keys, values = (np.asarray(column) for column in zip(*rows, strict=True))
+    values = values.astype(np.int64)
+    annotator_ids, annotator_idx = np.unique(annotators, return_inverse=True)
+    item_ids, item_idx = np.unique(items, return_inverse=True)
+    key_ids, key_idx = np.unique(keys, return_inverse=True)
+    labels, label_idx = np.unique(np.stack([key_idx, values], axis=1), axis=0, return_inverse=True)
+    label_idx = label_idx.reshape(-1)
+
+    shape_labels = (len(annotator_ids), len(item_ids), len(labels))
+    assigned = np.zeros(shape_labels, dtype=bool)
+    assigned[annotator_idx, item_idx, label_idx] = True
+
+    rated_keys = np.zeros((len(annotator_ids), len(item_ids), len(key_ids)), dtype=bool)
+    rated_keys[annotator_idx, item_idx, key_idx] = True
+
+    return LabelTensor(
+        annotators=annotator_ids,
+        items=item_ids,
+        keys=key_ids[labels[:, 0]],
+        values=labels[:, 1],
+        rated=rated_keys[:, :, labels[:, 0]],
+        assigned=assigned,
+    )
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+
+def _correlation_p(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Two-sided p-value of a correlation coefficient `r` of `n` observations (t-test with `n - 2` degrees of freedom, as `scipy.stats.spearmanr`).
+    """
+    from scipy.special import betainc
+
+    valid = (n > 2) & ~np.isnan(r)
+    df = np.where(valid, n - 2, 1)
+    return np.where(valid, betainc(df / 2, 0.5, np.clip(1 - np.where(valid, r, 0) ** 2, 0, 1)), np.nan)
+
+
+def _tie_sums(n: np.ndarray, n_1: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # sums of t(t-1)/2, t(t-1)(t-2), and t(t-1)(2t+5) over the two groups of tied binary values (of sizes t)
+    groups = [n_1, n - n_1]
+    return (
+        sum(t * (t - 1) / 2 for t in groups),
+        sum(t * (t - 1) * (t - 2) for t in groups),
+        sum(t * (t - 1) * (2 * t + 5) for t in groups),
+    )
+
+
+def _kendall_p(n: np.ndarray, con_minus_dis: np.ndarray, n_1x: np.ndarray, n_x1: np.ndarray) -> np.ndarray:
+    """
+    Two-sided p-value of Kendall's tau-b for binary labels, using the normal approximation with tie correction (as `scipy.stats.kendalltau`).
+    """
+    from scipy.special import erfc
+
+    x_tie, x_0, x_1 = _tie_sums(n, n_1x)
+    y_tie, y_0, y_1 = _tie_sums(n, n_x1)
+    m = n * (n - 1)
+    constant = (n_1x == 0) | (n_1x == n) | (n_x1 == 0) | (n_x1 == n)
+    var = (m * (2 * n + 5) - x_1 - y_1) / 18 + _ratio(2 * x_tie * y_tie, m) + _ratio(x_0 * y_0, 9 * m * (n - 2))
+    return np.where(constant | (n <= 2), np.nan, erfc(np.abs(_ratio(con_minus_dis, np.sqrt(var))) / np.sqrt(2)))
+
+
+def pairwise_agreement(tensor: LabelTensor) -> dict[str, np.ndarray]:
+    """
+    Agreement between every pair of annotators for every label, each metric as an annotator × annotator × label array.
+    Only items both annotators labelled (for the respective key) count.
+    """
+    n_annotators, _, n_labels = tensor.rated.shape
+    # contingency counts per label, so only one annotator × item slice at a time is converted for the matrix products
+    counts = np.zeros((4, n_annotators, n_annotators, n_labels), dtype=np.float64)
+    for li in range(n_labels):
+        rated = tensor.rated[:, :, li].astype(np.float64)
+        assigned = tensor.assigned[:, :, li].astype(np.float64)
+        counts[0, :, :, li] = rated @ rated.T
+        counts[1, :, :, li] = assigned @ assigned.T
+        counts[2, :, :, li] = assigned @ rated.T  # base assigned the label
+        counts[3, :, :, li] = rated @ assigned.T  # target assigned the label
+    n_overlap, n_11, n_1x, n_x1 = counts
+    n_10 = n_1x - n_11
+    n_01 = n_x1 - n_11
+    n_00 = n_overlap - n_11 - n_10 - n_01
+
+    n_agree = n_11 + n_00
+    p_observed = _ratio(n_agree, n_overlap)
+    p_base = _ratio(n_1x, n_overlap)
+    p_target = _ratio(n_x1, n_overlap)
+    p_expected = p_base * p_target + (1 - p_base) * (1 - p_target)
+
+    # phi coefficient, which for binary labels equals Pearson's r, Spearman's rho, and Kendall's tau-b
+    phi = _ratio(n_11 * n_00 - n_10 * n_01, np.sqrt(n_1x * (n_overlap - n_1x) * n_x1 * (n_overlap - n_x1)))
+
+    return {
+        'num_overlap': n_overlap.astype(np.int64),
+        'num_agree': n_agree.astype(np.int64),
+        'num_disagree': (n_10 + n_01).astype(np.int64),
+        'perc_agree': p_observed,
+        'cohen': _ratio(p_observed - p_expected, 1 - p_expected),
+        'pearson': phi,
+        'kendall': phi,
+        'kendall_p': _kendall_p(n_overlap, n_11 * n_00 - n_10 * n_01, n_1x, n_x1),
+        'spearman': phi,
+        'spearman_p': _correlation_p(phi, n_overlap),
+    }
+
+
+def multi_rater_agreement(tensor: LabelTensor, raters: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """
+    Agreement of all annotators (or those selected by the boolean mask `raters`) for every label, each metric as an array over labels.
+    Only items labelled by at least two of them (for the respective key) count.
+    """
+    rated = tensor.rated if raters is None else tensor.rated[raters]
+    assigned = tensor.assigned if raters is None else tensor.assigned[raters]
+    n = rated.sum(axis=0).astype(np.float64)  # raters per item and label
+    k = assigned.sum(axis=0).astype(np.float64)  # raters that assigned the label
+    overlap = n >= 2
+    n = np.where(overlap, n, 0)
+    k = np.where(overlap, k, 0)
+    n_items = overlap.sum(axis=0)
+
+    # Fleiss' kappa (generalised to a varying number of raters per item) and Randolph's free-marginal kappa
+    pairs = n * (n - 1)
+    p_item = _ratio(k * (k - 1) + (n - k) * (n - k - 1), pairs)
+    p_observed = _ratio(np.where(overlap, p_item, 0).sum(axis=0), n_items)
+    p_1 = _ratio(k.sum(axis=0), n.sum(axis=0))
+    p_expected = p_1**2 + (1 - p_1) ** 2
+
+    # Krippendorff's alpha (nominal) from the coincidence matrix
+    n_total = n.sum(axis=0)
+    o_10 = _ratio(k * (n - k), n - 1).sum(axis=0, where=overlap)
+    n_1 = k.sum(axis=0)
+    n_0 = n_total - n_1
+
+    return {
+        'num_items': n_items,
+        'num_agree': (overlap & ((k == 0) | (k == n))).sum(axis=0),
+        'perc_agree': _ratio((overlap & ((k == 0) | (k == n))).sum(axis=0), n_items),
+        'fleiss': _ratio(p_observed - p_expected, 1 - p_expected),
+        'randolph': (p_observed - 0.5) / 0.5,
+        'krippendorff': 1 - _ratio((n_total - 1) * o_10, n_1 * n_0),
+    }
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def irr_scores(rows: Sequence[Any], pairwise_only: Sequence[str] = ()) -> list[dict[str, Any]]:
+    """
+    Inter-rater reliability for every label (`key:value`), once per pair of annotators and once for all of them.
+    Pairwise entries have `user_base`/`user_target`, multi-rater entries have neither.
+
+    :param rows: `(annotator, item_id, key, value)` per label
+    :param pairwise_only: annotators that are not raters themselves (e.g. resolved labels), only compared pairwise
+    """
+    if len(rows) == 0:
+        return []
+    tensor = label_tensor(rows)
+    pairwise = pairwise_agreement(tensor)
+    multi = multi_rater_agreement(tensor, raters=~np.isin(tensor.annotators, list(pairwise_only)))
+    n_annotated = tensor.rated.any(axis=0).sum(axis=0)
+
+    scores = []
+    for li, (key, value) in enumerate(zip(tensor.keys, tensor.values, strict=True)):
+        label = {'label_key': str(key), 'label_value': int(value)}
+        scores.append({**label, **{metric: _value(values[li]) for metric, values in multi.items()}})
+
+        for ai, bi in zip(*np.triu_indices(len(tensor.annotators), k=1), strict=True):
+            if pairwise['num_overlap'][ai, bi, li] == 0:
+                continue
+            scores.append(
+                {
+                    **label,
+                    'user_base': str(tensor.annotators[ai]),
+                    'user_target': str(tensor.annotators[bi]),
+                    'annotations_base': int(tensor.rated[ai, :, li].sum()),
+                    'annotations_target': int(tensor.rated[bi, :, li].sum()),
+                    'num_items': int(n_annotated[li]),
+                    **{metric: _value(values[ai, bi, li]) for metric, values in pairwise.items()},
+                }
+            )
+    return scores
+
+
+__all__ = ['LabelTensor', 'label_tensor', 'pairwise_agreement', 'multi_rater_agreement', 'irr_scores']
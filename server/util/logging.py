@@ -1,10 +1,14 @@
 import math
+import atexit
+import threading
 import traceback
 import logging
 import logging.config
+import logging.handlers
+from copy import deepcopy
 from pathlib import Path
 from types import TracebackType
-from typing import Literal, Type
+from typing import Literal, Type, Any
 from contextlib import redirect_stdout, redirect_stderr
 
 from uvicorn.logging import DefaultFormatter
@@ -12,9 +16,68 @@ from uvicorn.logging import DefaultFormatter
 from server.util.config import settings
 
 
+_configured = False
+_configure_lock = threading.Lock()
+_listeners: list[logging.handlers.QueueListener] = []
+
+
+def queued_logging_conf(conf: dict[str, Any]) -> dict[str, Any]:
+    """
+    Rewrite a logging config so that every handler is fronted by a `QueueHandler`.
+    Loggers keep referring to the same handler names, the original handlers are renamed to `<name>_sink`
+    and are served by a `QueueListener` thread each.
+    """
+    conf = deepcopy(conf)
+    handlers = conf.get('handlers', {})
+    conf['handlers'] = {}
+    for name, handler in handlers.items():
+        conf['handlers'][f'{name}_sink'] = handler
+        conf['handlers'][name] = {
+            'class': 'logging.handlers.QueueHandler',
+            'handlers': [f'{name}_sink'],
+            'respect_handler_level': True,
+        }
+    return conf
+
+
+def _stop_listeners() -> None:
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+def configure_logging(force: bool = False) -> None:
+    """
+    Apply `settings.LOGGING_CONF` once per process; later calls are no-ops unless `force` is set.
+    """
+    global _configured
+    if _configured and not force:
+        return
+
+    with _configure_lock:
+        if _configured and not force:
+            return
+        if settings.LOGGING_CONF is not None:
+            _stop_listeners()
+            if settings.LOG_QUEUE:
+                conf = queued_logging_conf(settings.LOGGING_CONF)
+                logging.config.dictConfig(conf)
+                for name in settings.LOGGING_CONF.get('handlers', {}):
+                    handler = logging.getHandlerByName(name)
+                    if isinstance(handler, logging.handlers.QueueHandler) and handler.listener is not None:
+                        handler.listener.start()
+                        _listeners.append(handler.listener)
+            else:
+                logging.config.dictConfig(settings.LOGGING_CONF)
+        _configured = True
+
+
+# make sure queued records are written before the process exits
+atexit.register(_stop_listeners)
+
+
 def get_logger(name: str | None = None) -> logging.Logger:
-    if settings.LOGGING_CONF is not None:
-        logging.config.dictConfig(settings.LOGGING_CONF)
+    configure_logging()
     return logging.getLogger(name)
 
 
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+from collections import Counter
+from typing import Any
+
+from starlette.types import Scope
+
+# Redis hash (worker -> snapshot) that every worker publishes its metrics to, so one scrape covers all workers
+KEY_WORKER_METRICS = 'nacsos:metrics:workers'
+# Seconds between publishing the local metrics to redis
+PUBLISH_INTERVAL = 5.0
+# Snapshots of workers that missed a few publishes (e.g. after a restart or crash) are dropped, so they do not linger in scrapes
+STALE_AFTER = 3 * PUBLISH_INTERVAL
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RouteStats:
+    """
+    Aggregated timings for one route (method + templated path).
+    """
+
+    __slots__ = ('buckets', 'bucket_counts', 'count', 'wall_sum', 'cpu_sum', 'db_sum', 'db_queries', 'statuses')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.wall_sum = 0.0
+        self.cpu_sum = 0.0
+        self.db_sum = 0.0
+        self.db_queries = 0
+        self.statuses: Counter[int] = Counter()
+
+    def observe(self, status: int, wall_time: float, cpu_time: float, db_time: float = 0.0, db_queries: int = 0) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, wall_time)] += 1
+        self.count += 1
+        self.wall_sum += wall_time
+        self.cpu_sum += cpu_time
+        self.db_sum += db_time
+        self.db_queries += db_queries
+        self.statuses[status] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the `q`-quantile by linear interpolation within the histogram bucket it falls into
+        (same approach as Prometheus' `histogram_quantile()`).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'bucket_counts': self.bucket_counts,
+            'count': self.count,
+            'wall_sum': self.wall_sum,
+            'cpu_sum': self.cpu_sum,
+            'db_sum': self.db_sum,
+            'db_queries': self.db_queries,
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, buckets: tuple[float, ...], snapshot: dict[str, Any]) -> 'RouteStats':
+        stats = cls(buckets)
+        stats.bucket_counts = list(snapshot['bucket_counts'])
+        stats.count = snapshot['count']
+        stats.wall_sum = snapshot['wall_sum']
+        stats.cpu_sum = snapshot['cpu_sum']
+        stats.db_sum = snapshot['db_sum']
+        stats.db_queries = snapshot['db_queries']
+        stats.statuses = Counter({int(status): count for status, count in snapshot['statuses'].items()})
+        return stats
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Templated path of the matched route (e.g. `/api/project/items/detail/{item_id}`), so that
+    metrics are not split up by path parameters. Requests that matched no API route are grouped.
+    """
+    # Newer FastAPI versions keep included routers nested, so the matched route only knows its relative path
+    fastapi_scope = scope.get('fastapi')
+    if isinstance(fastapi_scope, dict):
+        path = getattr(fastapi_scope.get('effective_route_context'), 'path', None)
+        if path is not None:
+            return str(path)
+
+    path = getattr(scope.get('route'), 'path', None)
+    if path is None:
+        return '<unmatched>'
+    return str(path)
+
+
+def _labels(**labels: Any) -> str:
+    def esc(value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    return '{' + ','.join(f'{key}="{esc(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """
+    In-process request metrics, exported in the Prometheus text format via `render()`.
+
+    Every worker process keeps its own registry (the `worker` label tells them apart) and publishes it to redis every `PUBLISH_INTERVAL` seconds
+    (between `start()` and `stop()`), so that `collect()` can render the metrics of all live workers, no matter which worker handles the scrape.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.routes: dict[tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        self.worker = str(os.getpid())
+        self._publishing: asyncio.Task[None] | None = None
+
+    def observe(self, method: str, route: str, status: int, wall_time: float, cpu_time: float, db_time: float = 0.0, db_queries: int = 0) -> None:
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats(self.buckets)
+        stats.observe(status=status, wall_time=wall_time, cpu_time=cpu_time, db_time=db_time, db_queries=db_queries)
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'time': time.time(),
+            'in_flight': self.in_flight,
+            'routes': [[method, route, stats.snapshot()] for (method, route), stats in self.routes.items()],
+        }
+
+    @classmethod
+    def from_snapshot(cls, worker: str, snapshot: dict[str, Any], buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> 'MetricsRegistry':
+        registry = cls(buckets)
+        registry.worker = worker
+        registry.in_flight = snapshot['in_flight']
+        registry.routes = {(method, route): RouteStats.from_snapshot(buckets, stats) for method, route, stats in snapshot['routes']}
+        return registry
+
+    async def publish(self) -> None:
+        from server.data.redis_client import get_redis
+
+        await get_redis().hset(KEY_WORKER_METRICS, self.worker, json.dumps(self.snapshot()))
+
+    def start(self) -> None:
+        """
+        Publish the local metrics in the background every `PUBLISH_INTERVAL` seconds, also while idle, so live workers never look stale.
+        """
+        if self._publishing is None:
+            self._publishing = asyncio.get_running_loop().create_task(self._publish_regularly())
+
+    async def stop(self) -> None:
+        from server.data.redis_client import get_redis
+
+        if self._publishing is not None:
+            self._publishing.cancel()
+            await asyncio.gather(self._publishing, return_exceptions=True)
+            self._publishing = None
+        try:
+            # leave the scrape right away instead of after `STALE_AFTER`
+            await get_redis().hdel(KEY_WORKER_METRICS, self.worker)
+        except Exception:
+            pass
+
+    async def _publish_regularly(self) -> None:
+        while True:
+            try:
+                await self.publish()
+            except Exception:
+                pass  # metrics are best effort, the next interval tries again
+            await asyncio.sleep(PUBLISH_INTERVAL)
+
+    async def collect(self) -> list['MetricsRegistry']:
+        """
+        Registries of all live workers (this one included); only the local one if redis is unavailable.
+        """
+        from server.data.redis_client import get_redis
+
+        try:
+            await self.publish()
+            snapshots = await get_redis().hgetall(KEY_WORKER_METRICS)
+        except Exception:
+            return [self]
+
+        registries = [self]
+        for worker, raw in snapshots.items():
+            worker = worker.decode()
+            snapshot = json.loads(raw)
+            if worker == self.worker:
+                continue
+            if (time.time() - snapshot['time']) > STALE_AFTER:
+                await get_redis().hdel(KEY_WORKER_METRICS, worker)
+                continue
+            registries.append(MetricsRegistry.from_snapshot(worker, snapshot, buckets=self.buckets))
+        return registries
+
+    def render(self, registries: list['MetricsRegistry'] | None = None) -> str:
+        """
+        Metrics of this registry (or of all given `registries`) in the Prometheus text format.
+        """
+        registries = [self] if registries is None else registries
+        lines = [
+            '# HELP nacsos_http_requests_in_flight Number of requests currently being processed.',
+            '# TYPE nacsos_http_requests_in_flight gauge',
+            *(f'nacsos_http_requests_in_flight{_labels(worker=registry.worker)} {registry.in_flight}' for registry in registries),
+            '# HELP nacsos_http_requests_total Number of handled requests by route and status code.',
+            '# TYPE nacsos_http_requests_total counter',
+        ]
+        routes = sorted(((registry.worker, method, route), stats) for registry in registries for (method, route), stats in registry.routes.items())
+        for (w, method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'nacsos_http_requests_total{_labels(worker=w, method=method, route=route, status=status)} {count}')
+
+        lines += [
+            '# HELP nacsos_http_request_duration_seconds Wall time per request by route.',
+            '# TYPE nacsos_http_request_duration_seconds histogram',
+        ]
+        for (w, method, route), stats in routes:
+            cumulative = 0
+            for le, bucket_count in zip([*stats.buckets, '+Inf'], stats.bucket_counts, strict=True):
+                cumulative += bucket_count
+                lines.append(f'nacsos_http_request_duration_seconds_bucket{_labels(worker=w, method=method, route=route, le=le)} {cumulative}')
+            lines.append(f'nacsos_http_request_duration_seconds_sum{_labels(worker=w, method=method, route=route)} {stats.wall_sum:.6f}')
+            lines.append(f'nacsos_http_request_duration_seconds_count{_labels(worker=w, method=method, route=route)} {stats.count}')
+
+        lines += [
+            '# HELP nacsos_http_request_duration_quantile_seconds Estimated latency quantiles per route (from histogram buckets).',
+            '# TYPE nacsos_http_request_duration_quantile_seconds gauge',
+        ]
+        for (w, method, route), stats in routes:
+            for q in QUANTILES:
+                lines.append(
+                    f'nacsos_http_request_duration_quantile_seconds{_labels(worker=w, method=method, route=route, quantile=q)} {stats.quantile(q):.6f}'
+                )
+
+        for name, attr, help_text in [
+            ('nacsos_http_request_cpu_seconds_total', 'cpu_sum', 'CPU time spent in requests by route.'),
+            ('nacsos_http_request_db_seconds_total', 'db_sum', 'Time spent in database queries by route.'),
+            ('nacsos_http_request_db_queries_total', 'db_queries', 'Number of database queries by route.'),
+        ]:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (w, method, route), stats in routes:
+                lines.append(f'{name}{_labels(worker=w, method=method, route=route)} {round(getattr(stats, attr), 6)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+__all__ = ['metrics', 'MetricsRegistry', 'RouteStats', 'route_template']
@@ -3,14 +3,21 @@ import json
 from typing import Literal, Any, TypeVar
 from resource import getrusage, RUSAGE_SELF
 
+import anyio.to_thread
+
 from pydantic import BaseModel
 from fastapi import HTTPException, status as http_status
 from fastapi.exception_handlers import http_exception_handler
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.datastructures import MutableHeaders, Headers, QueryParams
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from server.util.logging import get_logger
+from server.util.metrics import metrics, route_template
+from server.util.dbstats import QueryStats, current_query_stats
+from server.util.config import settings
+from server.util.profiling import SamplingProfiler, profile_filename
+from server.util.compression import DEFAULT_LEVELS, ENCODERS, Encoder, negotiate, is_compressible, get_level, make_encoder
 
 logger = get_logger('nacsos.server.middlewares')
 
@@ -29,7 +36,15 @@ class ErrorDetail(BaseModel):
 Error = TypeVar('Error', bound=Warning | Exception)
 
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
+class ErrorHandlingMiddleware:
+    """
+    Turns any exception or warning raised by a route into an `ErrorDetail` JSON response.
+    Implemented as a pure ASGI middleware, so it does not buffer or re-wrap (streaming) responses.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
     @classmethod
     def _resolve_args(cls, ew: Error) -> list[Any]:
         if hasattr(ew, 'args') and ew.args is not None and len(ew.args) > 0:
@@ -51,11 +66,26 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                 return error_status
         return http_status.HTTP_400_BAD_REQUEST
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_wrapper)
         except (Exception, Warning) as ew:
+            if response_started:
+                # Too late to send an error response, the client already received headers
+                raise
+
             error_str = 'Unknown error (very serious stuff...)'
             try:
                 # FIXME: The Pydantic Validation Error triggers an exception when logging the error.
@@ -72,8 +102,8 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
             if isinstance(ew, Warning):
                 level = 'WARNING'
 
-            return await http_exception_handler(
-                request,
+            response = await http_exception_handler(
+                Request(scope, receive),
                 exc=HTTPException(
                     status_code=self._resolve_status(ew),
                     detail=ErrorDetail(
@@ -85,27 +115,72 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     headers=headers,
                 ),
             )
+            await response(scope, receive, send)
+
+
+class TimingMiddleware:
+    """
+    Adds wall and CPU time until the response starts as `X-WallTime` and `X-CPU-Time` headers,
+    database time and query count as `X-DB-Time` and `X-DB-Queries`, and all of them as `Server-Timing`.
+    Once the response is sent completely, the request is recorded in the per-route `metrics`.
+    Implemented as a pure ASGI middleware, so it does not buffer or re-wrap (streaming) responses.
+    """
 
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
 
-class TimingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         start_time = time.time()
         start_cpu_time = self._get_cpu_time()
+        status_code = 500
+        query_stats = QueryStats(path=scope['path'])
+        stats_token = current_query_stats.set(query_stats)
 
-        response = await call_next(request)
-
-        used_cpu_time = self._get_cpu_time() - start_cpu_time
-        used_time = time.time() - start_time
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                used_cpu_time = self._get_cpu_time() - start_cpu_time
+                used_time = time.time() - start_time
 
-        response.headers['X-CPU-Time'] = f'{used_cpu_time:.8f}s'
-        response.headers['X-WallTime'] = f'{used_time:.8f}s'
+                headers = MutableHeaders(scope=message)
+                headers['X-CPU-Time'] = f'{used_cpu_time:.8f}s'
+                headers['X-WallTime'] = f'{used_time:.8f}s'
+                headers['X-DB-Time'] = f'{query_stats.time:.8f}s'
+                headers['X-DB-Queries'] = str(query_stats.queries)
+                headers.append(
+                    'Server-Timing',
+                    f'db;dur={query_stats.time * 1000:.2f};desc="{query_stats.queries} queries", '
+                    f'cpu;dur={used_cpu_time * 1000:.2f}, total;dur={used_time * 1000:.2f}',
+                )
 
-        request.scope['timing_stats'] = {
-            'cpu_time': f'{used_cpu_time:.8f}s',
-            'wall_time': f'{used_time:.8f}s',
-        }
+                scope['timing_stats'] = {
+                    'cpu_time': f'{used_cpu_time:.8f}s',
+                    'wall_time': f'{used_time:.8f}s',
+                    'db_time': f'{query_stats.time:.8f}s',
+                    'db_queries': query_stats.queries,
+                }
+            await send(message)
 
-        return response
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            current_query_stats.reset(stats_token)
+            metrics.observe(
+                method=scope['method'],
+                route=route_template(scope),
+                status=status_code,
+                wall_time=time.time() - start_time,
+                cpu_time=self._get_cpu_time() - start_cpu_time,
+                db_time=query_stats.time,
+                db_queries=query_stats.queries,
+            )
 
     @staticmethod
     def _get_cpu_time() -> float:
@@ -114,4 +189,162 @@ class TimingMiddleware(BaseHTTPMiddleware):
         return resources[0] + resources[1]
 
 
-__all__ = ['TimingMiddleware', 'ErrorHandlingMiddleware']
+class ProfilingMiddleware:
+    """
+    Profiles single requests on demand, when the `X-Profile` header or the `_profile` query flag is set.
+    Only superusers may do so; for everyone else, the flag is ignored.
+    Collapsed stacks are written to the profiles directory (see `/api/metrics/profiles`),
+    the name of the file is returned in the `X-Profile` response header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not settings.SERVER.PROFILING or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self._is_superuser(scope):
+            logger.warning(f'Ignoring profiling request for {scope["path"]} by non-superuser.')
+            await self.app(scope, receive, send)
+            return
+
+        filename = profile_filename(f'{scope["method"]}_{scope["path"]}')
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message)['X-Profile'] = filename
+            await send(message)
+
+        profiler = SamplingProfiler().start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # joining the sampler thread and writing the profile block, keep them off the event loop
+            await anyio.to_thread.run_sync(lambda: profiler.stop().write(settings.PIPES.profiles_dir / filename))
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        return 'x-profile' in Headers(scope=scope) or QueryParams(scope['query_string']).get('_profile', 'false').lower() in {'1', 'true', 'yes'}
+
+    @staticmethod
+    async def _is_superuser(scope: Scope) -> bool:
+        from server.util.security import get_current_user, get_current_active_user, get_current_active_superuser
+
+        scheme, _, token = Headers(scope=scope).get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return False
+        try:
+            get_current_active_superuser(await get_current_active_user(await get_current_user(token)))
+            return True
+        except Exception:
+            return False
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts (zstd, br, or gzip, as far as available).
+    Small responses, already encoded ones, and media types that are compressed already (zip, parquet, ...) are passed through,
+    as are partial responses (`206`, `Content-Range`), whose byte ranges refer to the uncompressed file.
+    Strong ETags of compressed responses are weakened, as the encoded body is no longer byte-identical.
+    Bodies (or streamed chunks) beyond `offload_size` are compressed in a worker thread to keep the event loop responsive.
+    Streamed responses are flushed after every chunk, so clients receive data as soon as it is produced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int | None = None,
+        offload_size: int | None = None,
+        levels: dict[str, dict[str, int]] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else settings.SERVER.COMPRESSION_MINIMUM_SIZE
+        self.offload_size = offload_size if offload_size is not None else settings.SERVER.COMPRESSION_OFFLOAD_SIZE
+        overrides = levels if levels is not None else settings.SERVER.COMPRESSION_LEVELS
+        self.levels = {encoding: {**DEFAULT_LEVELS.get(encoding, {}), **overrides.get(encoding, {})} for encoding in ENCODERS}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+
+class _CompressingSend:
+    """
+    Wraps `send` of a single response for the `CompressionMiddleware`.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Message | None = None
+        self.encoder: Encoder | None = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            headers = Headers(raw=message['headers'])
+            if message['status'] == 206 or 'content-range' in headers or 'content-encoding' in headers or not is_compressible(headers.get('content-type', '')):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                # hold back until we know the size of the body
+                self.start_message = message
+            return
+
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get('body', b'')
+        more_body: bool = message.get('more_body', False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message['headers'])
+            self.encoder = make_encoder(self.encoding, get_level(self.middleware.levels, self.encoding, headers.get('content-type', '')))
+            body = await self._encode(body, more_body)
+            headers['Content-Encoding'] = self.encoding
+            headers.add_vary_header('Accept-Encoding')
+            etag = headers.get('etag')
+            if etag is not None and not etag.startswith('W/'):
+                headers['ETag'] = f'W/{etag}'
+            if more_body:
+                del headers['Content-Length']
+            else:
+                headers['Content-Length'] = str(len(body))
+            await self.send(start_message)
+        else:
+            body = await self._encode(body, more_body)
+
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        assert self.encoder is not None
+        if more_body:
+            return self.encoder.compress(body, flush=True)
+        return self.encoder.compress(body) + self.encoder.finish()
+
+    async def _encode(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) > self.middleware.offload_size:
+            return await anyio.to_thread.run_sync(self._compress, body, more_body)
+        return self._compress(body, more_body)
+
+
+__all__ = ['TimingMiddleware', 'ErrorHandlingMiddleware', 'ProfilingMiddleware', 'CompressionMiddleware', 'ErrorDetail']
@@ -0,0 +1,162 @@
+import re
+import sys
+import time
+import uuid
+import logging
+import datetime
+import threading
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+from server.util.config import settings
+
+logger = logging.getLogger('nacsos.util.profiling')
+
+# Written into a task's artefact directory to ask the worker running it for a profile
+PROFILE_REQUEST_FILE = '.profile-request'
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    # `;` separates frames in the collapsed format, so it must not appear within a label
+    return f'{code.co_qualname} ({Path(code.co_filename).name}:{frame.f_lineno})'.replace(';', ':')
+
+
+class SamplingProfiler:
+    """
+    Minimal wall-clock sampling profiler.
+    A background thread periodically records the stack of one target thread (by default the one that created the profiler).
+    The result is in the "collapsed stacks" format (one `frame;frame;frame count` per line),
+    which can be rendered with flamegraph.pl, speedscope, or inferno.
+
+    Note, that asyncio runs all requests of a worker on the same thread, so samples
+    of concurrently running requests will show up in the profile as well.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float | None = None):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval if interval is not None else settings.SERVER.PROFILE_SAMPLE_INTERVAL
+        self.samples: Counter[str] = Counter()
+        self.started: float | None = None
+        self.duration: float = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # target thread is gone
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self) -> 'SamplingProfiler':
+        self.started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='nacsos-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.started is not None:
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+    def write(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.collapsed())
+        logger.info(f'Wrote {sum(self.samples.values()):,} samples ({self.duration:.2f}s) to {path}')
+        return path
+
+    def __enter__(self) -> 'SamplingProfiler':
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+
+def profile_filename(name: str) -> str:
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_')[:100]
+    return f'profile_{datetime.datetime.now():%Y%m%d-%H%M%S-%f}_{name}.collapsed'
+
+
+def request_task_profile(task_id: str | uuid.UUID, seconds: float | None = None) -> None:
+    """
+    Ask the worker running (or about to run) a task to profile it.
+
+    :param task_id: task to profile
+    :param seconds: how long to sample for; profile until the task finishes if not set
+    :raises ValueError if `task_id` is not a UUID (it names a directory, so it must never contain a path)
+    """
+    target_dir = settings.PIPES.target_dir / str(uuid.UUID(str(task_id)))
+    target_dir.mkdir(parents=True, exist_ok=True)
+    (target_dir / PROFILE_REQUEST_FILE).write_text('' if seconds is None else str(seconds))
+
+
+class TaskProfileWatcher:
+    """
+    Runs alongside a pipeline task and watches its artefact directory for profile requests (see `request_task_profile`).
+    Profiles are written as `profile_*.collapsed` artefacts of the task.
+    """
+
+    def __init__(self, target_dir: Path, thread_id: int | None = None, poll_interval: float = 1.0):
+        self.target_dir = target_dir
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _watch(self) -> None:
+        request_file = self.target_dir / PROFILE_REQUEST_FILE
+        profiler: SamplingProfiler | None = None
+        until: float | None = None
+
+        while not self._stop.wait(self.poll_interval):
+            if profiler is None and request_file.exists():
+                try:
+                    content = request_file.read_text().strip()
+                    request_file.unlink()
+                    until = time.perf_counter() + float(content) if content else None
+                except (OSError, ValueError) as e:
+                    logger.warning(f'Ignoring invalid profile request: {e}')
+                    continue
+                profiler = SamplingProfiler(thread_id=self.thread_id).start()
+
+            if profiler is not None and until is not None and time.perf_counter() >= until:
+                profiler.stop().write(self.target_dir / profile_filename('task'))
+                profiler = None
+
+        if profiler is not None:
+            profiler.stop().write(self.target_dir / profile_filename('task'))
+
+    def __enter__(self) -> 'TaskProfileWatcher':
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='nacsos-profile-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+__all__ = ['SamplingProfiler', 'TaskProfileWatcher', 'request_task_profile', 'profile_filename', 'PROFILE_REQUEST_FILE']
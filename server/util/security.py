@@ -1,15 +1,26 @@
+import json
+import time
+import uuid
+import asyncio
+import datetime
+
 from fastapi import Depends, status as http_status, Header
 from fastapi.security import OAuth2PasswordBearer
 from nacsos_data.db.crud.priority import read_priority_by_id
+from nacsos_data.db.crud.users import read_user_by_id
 from nacsos_data.models.priority import PriorityModel
 
+from nacsos_data.db.schemas.users import AuthToken
 from nacsos_data.models.users import UserModel
-from nacsos_data.models.projects import ProjectPermission
+from nacsos_data.models.projects import ProjectPermission, ProjectPermissionsModel
 from nacsos_data.util.auth import Authentication, InsufficientPermissionError, InvalidCredentialsError, UserPermissions
 from nacsos_data.util.errors import MissingIdError
+from sqlalchemy import select
 
 from server.data import db_engine
 from server.util.config import settings
+from server.util.cache import TTLCache
+from server.util.tokens import is_signed_token, verify_signed_token
 
 from server.util.logging import get_logger
 
@@ -37,10 +48,144 @@ auth_helper = Authentication(
 )
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='api/login/token', auto_error=False)
 
+# Short-lived caches to skip the database on every authenticated request.
+# Entries are dropped explicitly on logout, token revocation, and permission changes (see `invalidate_*` below).
+user_cache: TTLCache[str, UserModel] = TTLCache(ttl=settings.SERVER.AUTH_CACHE_TTL, maxsize=2048)
+permission_cache: TTLCache[tuple[str, str], ProjectPermissionsModel] = TTLCache(ttl=settings.SERVER.AUTH_CACHE_TTL, maxsize=8192)
+
+# Redis channel that invalidations are broadcast on, so that every worker drops the entries from its own caches
+CHANNEL_INVALIDATIONS = 'nacsos:auth:invalidations'
+
+
+def _drop_cached(message: dict[str, str | None]) -> None:
+    token_id, username, user_id, project_id = (message.get(field) for field in ['token_id', 'username', 'user_id', 'project_id'])
+    if token_id is not None:
+        user_cache.invalidate(token_id)
+    if username is not None or user_id is not None:
+        user_cache.invalidate_where(
+            lambda _, user: (username is not None and user.username == username) or (user_id is not None and str(user.user_id) == user_id)
+        )
+    if user_id is not None:
+        permission_cache.invalidate_where(lambda key, _: key[0] == user_id)
+    if project_id is not None:
+        permission_cache.invalidate_where(lambda key, _: key[1] == project_id)
+
+
+class CacheInvalidations:
+    """
+    Keeps the auth caches of all workers in sync: invalidations are published on a redis channel that every worker listens to.
+    The caches are only used while this worker is subscribed, a worker that could miss invalidations always asks the database.
+    """
+
+    def __init__(self, retry_interval: float = 5.0) -> None:
+        self.retry_interval = retry_interval
+        self.live = False
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if settings.SERVER.AUTH_CACHE_TTL > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.live = False
+
+    async def _listen(self) -> None:
+        from server.data.redis_client import get_redis
+
+        while True:
+            try:
+                async with get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL_INVALIDATIONS)
+                    # invalidations that were published while not subscribed are lost
+                    user_cache.clear()
+                    permission_cache.clear()
+                    self.live = True
+                    while True:
+                        # polling with a timeout, the shared client's socket timeout would end a blocking `listen()` otherwise
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None and message['type'] == 'message':
+                            _drop_cached(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'Lost subscription to auth cache invalidations, bypassing the caches until it is back: {e}')
+            finally:
+                self.live = False
+            await asyncio.sleep(self.retry_interval)
+
+    async def publish(self, **message: str | None) -> None:
+        from server.data.redis_client import get_redis
+
+        _drop_cached(message)
+        try:
+            await get_redis().publish(CHANNEL_INVALIDATIONS, json.dumps(message))
+        except Exception as e:
+            logger.error(f'Failed to broadcast auth cache invalidation {message}, other workers may serve it for {settings.SERVER.AUTH_CACHE_TTL}s: {e}')
+
+
+cache_invalidations = CacheInvalidations()
+
+
+async def invalidate_token(token_id: str) -> None:
+    await cache_invalidations.publish(token_id=token_id)
+
+
+async def invalidate_user(username: str | None = None, user_id: str | uuid.UUID | None = None) -> None:
+    await cache_invalidations.publish(username=username, user_id=None if user_id is None else str(user_id))
+
+
+async def invalidate_project_permissions(project_id: str | uuid.UUID) -> None:
+    await cache_invalidations.publish(project_id=str(project_id))
+
+
+async def _token_lifetime(token_id: str) -> float | None:
+    # seconds until a database token expires, cached users must not outlive their token
+    async with db_engine.session() as session:
+        valid_till = await session.scalar(select(AuthToken.valid_till).where(AuthToken.token_id == token_id))
+    if valid_till is None:
+        return None
+    return (valid_till - datetime.datetime.now(valid_till.tzinfo)).total_seconds()
+
+
+async def get_user_from_signed_token(token: str) -> UserModel:
+    claims = await verify_signed_token(token)
+
+    user = user_cache.get(token) if cache_invalidations.live else None
+    if user is None:
+        user_db = await read_user_by_id(user_id=claims.sub, engine=db_engine)
+        if user_db is None:
+            raise InvalidCredentialsError('User from token does not exist.')
+        user = UserModel.model_validate(user_db.model_dump(exclude={'password'}))
+        if cache_invalidations.live:
+            user_cache.set(token, user, ttl=claims.exp - time.time())
+
+    # Never grant more privileges than the token was issued with
+    if user.is_superuser and not claims.su:
+        user = user.model_copy(update={'is_superuser': False})
+    return user
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserModel:
+    if token and settings.SERVER.SIGNED_TOKENS and is_signed_token(token):
+        try:
+            return await get_user_from_signed_token(token)
+        except InvalidCredentialsError as e:
+            raise NotAuthenticated(str(e))
+
+    if token and cache_invalidations.live:
+        user = user_cache.get(token)
+        if user is not None:
+            return user
     try:
-        return await auth_helper.get_user(token_id=token)
+        user = await auth_helper.get_user(token_id=token)
+        if token and cache_invalidations.live:
+            lifetime = await _token_lifetime(token)
+            if lifetime is not None:
+                user_cache.set(token, user, ttl=lifetime)
+        return user
     except InvalidCredentialsError as e:
         raise NotAuthenticated(str(e))
     except InsufficientPermissionError as e:
@@ -85,13 +230,26 @@ class UserPermissionChecker:
         :return: `ProjectPermissions` if permissions are fulfilled, exception otherwise
         :raises HTTPException if permissions are not fulfilled
         """
-        try:
-            return await auth_helper.check_permissions(
-                project_id=x_project_id, user=current_user, required_permissions=self.permissions, fulfill_all=self.fulfill_all
-            )
-
-        except (InvalidCredentialsError, InsufficientPermissionError) as e:
-            raise InsufficientPermissions(repr(e))
+        key = (str(current_user.user_id), str(x_project_id))
+        permissions = permission_cache.get(key) if cache_invalidations.live else None
+        if permissions is None:
+            try:
+                # Fetch the user's permissions without requirements, so we can cache them for all checkers
+                user_permissions = await auth_helper.check_permissions(project_id=x_project_id, user=current_user, required_permissions=None)
+                permissions = user_permissions.permissions
+                if cache_invalidations.live:
+                    permission_cache.set(key, permissions)
+            except (InvalidCredentialsError, InsufficientPermissionError) as e:
+                raise InsufficientPermissions(repr(e))
+
+        if self.permissions:
+            fulfilled = [bool(getattr(permissions, permission, False)) for permission in self.permissions]
+            if (self.fulfill_all and not all(fulfilled)) or (not self.fulfill_all and not any(fulfilled)):
+                raise InsufficientPermissions(
+                    repr(InsufficientPermissionError(f'User does not have permission {self.permissions} for project {x_project_id}.'))
+                )
+
+        return UserPermissions(user=current_user, permissions=permissions)
 
 
 class UserPriorityPermissionChecker(UserPermissionChecker):
@@ -134,4 +292,8 @@ __all__ = [
     'get_current_active_superuser',
     'UserPriorityPermissionChecker',
     'UserPriorityPermissions',
+    'cache_invalidations',
+    'invalidate_token',
+    'invalidate_user',
+    'invalidate_project_permissions',
 ]
@@ -0,0 +1,180 @@
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from pydantic import BaseModel, ValidationError
+from nacsos_data.models.users import UserModel, AuthTokenModel
+from nacsos_data.util.auth import InvalidCredentialsError
+
+from server.data.redis_client import get_redis
+from server.util.config import settings
+from server.util.logging import get_logger
+
+logger = get_logger('nacsos.util.tokens')
+
+ALGORITHMS = {'HS256': hashlib.sha256, 'HS384': hashlib.sha384, 'HS512': hashlib.sha512}
+
+# Redis keys shared by all workers
+KEY_REVOKED_TOKENS = 'nacsos:auth:revoked-tokens'  # sorted set: jti -> expiry
+KEY_REVOKED_USERS = 'nacsos:auth:revoked-users'  # hash: user_id -> tokens issued before this timestamp are invalid
+
+
+class SignedTokenClaims(BaseModel):
+    sub: str  # user_id
+    name: str  # username
+    su: bool  # superuser flag at the time of issuing
+    iat: float  # issued at (unix timestamp with sub-second precision, so that revocations only hit earlier tokens)
+    exp: int  # expires at (unix timestamp)
+    jti: str  # unique token id, used for revocation
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(message: bytes) -> bytes:
+    digest = ALGORITHMS[settings.SERVER.HASH_ALGORITHM]
+    return hmac.new(settings.SERVER.SECRET_KEY.encode(), message, digest).digest()
+
+
+def is_signed_token(token: str) -> bool:
+    # Database tokens are UUIDs, signed tokens are JWTs (header.payload.signature)
+    return token.count('.') == 2
+
+
+def create_signed_token(user: UserModel) -> AuthTokenModel:
+    """
+    Issue a signed access token (JWT) for `user`.
+    The token can be validated without a database lookup, see `verify_signed_token()`.
+    """
+    if user.user_id is None or user.username is None:
+        raise InvalidCredentialsError('Cannot issue token for user without id or username.')
+
+    now = time.time()
+    claims = SignedTokenClaims(
+        sub=str(user.user_id),
+        name=user.username,
+        su=bool(user.is_superuser),
+        iat=now,
+        exp=int(now) + settings.SERVER.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        jti=str(uuid.uuid4()),
+    )
+    header = _b64encode(json.dumps({'alg': settings.SERVER.HASH_ALGORITHM, 'typ': 'JWT'}, separators=(',', ':')).encode())
+    payload = _b64encode(claims.model_dump_json().encode())
+    signature = _b64encode(_sign(f'{header}.{payload}'.encode()))
+
+    return AuthTokenModel(
+        token_id=f'{header}.{payload}.{signature}',
+        username=user.username,
+        valid_till=datetime.datetime.fromtimestamp(claims.exp),
+        time_created=datetime.datetime.fromtimestamp(claims.iat),
+    )
+
+
+def decode_signed_token(token: str) -> SignedTokenClaims:
+    """
+    Check signature and expiry of a signed token and return its claims.
+    Note, that this does not check the revocation list.
+
+    :raises InvalidCredentialsError if the token is malformed, tampered with, or expired
+    """
+    try:
+        header, payload, signature = token.split('.')
+        if not hmac.compare_digest(_b64decode(signature), _sign(f'{header}.{payload}'.encode())):
+            raise InvalidCredentialsError('Invalid token signature.')
+        claims = SignedTokenClaims.model_validate_json(_b64decode(payload))
+    except (ValueError, ValidationError) as e:
+        raise InvalidCredentialsError(f'Malformed token: {e}')
+
+    if claims.exp < time.time():
+        raise InvalidCredentialsError('Token expired.')
+    return claims
+
+
+class RevocationList:
+    """
+    Compact list of revoked signed tokens.
+    Revocations are written to redis so all workers see them; each worker keeps a local copy
+    that is refreshed every `refresh_interval` seconds, so regular checks stay in memory.
+    If the local copy was never loaded or is older than `max_age` seconds (redis unavailable), all tokens count as revoked.
+    """
+
+    def __init__(self, refresh_interval: float, max_age: float) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._tokens: dict[str, int] = {}  # jti -> expiry
+        self._users: dict[str, float] = {}  # user_id -> not-before timestamp
+        self._last_refresh = 0.0
+        self._loaded_at: float | None = None
+
+    async def refresh(self, force: bool = False) -> None:
+        if not force and (time.monotonic() - self._last_refresh) < self.refresh_interval:
+            return
+        self._last_refresh = time.monotonic()
+        now = int(time.time())
+        try:
+            redis = get_redis()
+            await redis.zremrangebyscore(KEY_REVOKED_TOKENS, '-inf', now)
+            tokens = await redis.zrange(KEY_REVOKED_TOKENS, 0, -1, withscores=True)
+            users = await redis.hgetall(KEY_REVOKED_USERS)
+        except Exception as e:
+            logger.warning(f'Failed to refresh token revocation list, keeping local copy for now: {e}')
+            return
+
+        self._tokens = {jti.decode(): int(exp) for jti, exp in tokens}
+        self._users = {user_id.decode(): float(ts) for user_id, ts in users.items()}
+        self._loaded_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.max_age
+
+    async def is_revoked(self, claims: SignedTokenClaims) -> bool:
+        await self.refresh()
+        if self.is_stale():
+            # fail closed, a revoked token must not become valid just because redis is unreachable
+            logger.warning('Token revocation list is unavailable or outdated, rejecting signed token.')
+            return True
+        return claims.jti in self._tokens or claims.iat <= self._users.get(claims.sub, -1)
+
+    async def revoke_token(self, claims: SignedTokenClaims) -> None:
+        self._tokens[claims.jti] = claims.exp
+        await get_redis().zadd(KEY_REVOKED_TOKENS, {claims.jti: claims.exp})
+
+    async def revoke_user(self, user_id: str | uuid.UUID) -> None:
+        # invalidates all tokens issued for this user up until now
+        now = time.time()
+        self._users[str(user_id)] = now
+        await get_redis().hset(KEY_REVOKED_USERS, str(user_id), now)
+
+
+revocation_list = RevocationList(refresh_interval=settings.SERVER.TOKEN_REVOCATION_REFRESH, max_age=settings.SERVER.TOKEN_REVOCATION_MAX_AGE)
+
+
+async def verify_signed_token(token: str) -> SignedTokenClaims:
+    """
+    Fully validate a signed token (signature, expiry, revocation).
+
+    :raises InvalidCredentialsError if the token is not valid
+    """
+    claims = decode_signed_token(token)
+    if await revocation_list.is_revoked(claims):
+        raise InvalidCredentialsError('Token was revoked.')
+    return claims
+
+
+__all__ = [
+    'SignedTokenClaims',
+    'is_signed_token',
+    'create_signed_token',
+    'decode_signed_token',
+    'verify_signed_token',
+    'revocation_list',
+]